@@ -39,6 +39,7 @@ class ArchiveToggleResult {
 
 class ArchiveService {
   static const Duration _timeout = Duration(seconds: 15);
+  static const int _pageSize = 200;
 
   /// Parse a millisecond epoch value (int or numeric string) into a
   /// [DateTime], returning null when the value is missing or malformed.
@@ -51,35 +52,45 @@ class ArchiveService {
 
   static Future<List<ArchiveEntry>?> fetchArchives(String userId) async {
     if (userId.isEmpty) return null;
-    final uri = BackendApi.uri('/archives', queryParameters: {
-      'user_id': userId,
-    });
+    final entries = <ArchiveEntry>[];
+    String? cursor;
     try {
-      final response =
-          await http.get(uri, headers: BackendApi.headers()).timeout(_timeout);
-      if (response.statusCode != 200) {
-        return null;
-      }
-      final data = jsonDecode(response.body) as Map<String, dynamic>;
-      final items = (data['items'] as List<dynamic>? ?? [])
-          .whereType<Map<String, dynamic>>();
-      final entries = <ArchiveEntry>[];
-      for (final item in items) {
-        final videoId = item['video_id'] as String?;
-        final archivedAt = _parseEpochMillis(item['archived_at']);
-        if (videoId == null || archivedAt == null) continue;
-        entries.add(
-          ArchiveEntry(
-            videoId: videoId,
-            archivedAt: archivedAt,
-            title: item['title'] as String?,
-            thumbnailUrl: item['thumbnail_url'] as String?,
-            channelId: item['channel_id'] as String?,
-            channelTitle: item['channel_title'] as String?,
-            channelThumbnailUrl: item['channel_thumbnail_url'] as String?,
-          ),
-        );
-      }
+      do {
+        final uri = BackendApi.uri('/archives', queryParameters: {
+          'user_id': userId,
+          'limit': '$_pageSize',
+          if (cursor != null) 'cursor': cursor,
+        });
+        final response = await http
+            .get(uri, headers: BackendApi.headers())
+            .timeout(_timeout);
+        if (response.statusCode != 200) {
+          return null;
+        }
+        final data = jsonDecode(response.body) as Map<String, dynamic>;
+        final items = (data['items'] as List<dynamic>? ?? [])
+            .whereType<Map<String, dynamic>>();
+        for (final item in items) {
+          final videoId = item['video_id'] as String?;
+          final archivedAt = _parseEpochMillis(item['archived_at']);
+          if (videoId == null || archivedAt == null) continue;
+          entries.add(
+            ArchiveEntry(
+              videoId: videoId,
+              archivedAt: archivedAt,
+              title: item['title'] as String?,
+              thumbnailUrl: item['thumbnail_url'] as String?,
+              channelId: item['channel_id'] as String?,
+              channelTitle: item['channel_title'] as String?,
+              channelThumbnailUrl: item['channel_thumbnail_url'] as String?,
+            ),
+          );
+        }
+        final nextCursor = data['next_cursor'];
+        cursor = nextCursor is String && nextCursor.isNotEmpty
+            ? nextCursor
+            : null;
+      } while (cursor != null);
       return entries;
     } catch (_) {
       return null;
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Measure compression ratio and codec latency for cached transcripts.
+
+Reads cache entries from CACHE_DIR (or a directory given on the command
+line, in either file layout) and reports how much smaller the stored text
+becomes and how long encoding and decoding take per entry.
+``--train-dict`` writes a preset dictionary built from the most frequent
+words in the sample, which can be pointed to with
+TRANSCRIPT_CACHE_ZDICT_PATH.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_WORD_PATTERN = re.compile(r'\S+')
+_MAX_DICT_BYTES = 32 * 1024
+
+
+def _load_samples(cache_dir: Path, limit: int) -> list[str]:
+    # pylint: disable=import-outside-toplevel
+    from server.cache_codec import decode_cached_text
+    from server.file_cache import TRANSCRIPT_DIR_NAME, read_record
+
+    entries = []
+    for path in sorted((cache_dir / TRANSCRIPT_DIR_NAME).glob('*/*.ttc')):
+        record = read_record(path)
+        if record is not None:
+            entries.append(record)
+    for path in sorted(cache_dir.glob('*.json')):
+        if path.name.startswith('archive_'):
+            continue
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            continue
+        entries.append({
+            'text': decode_cached_text(data.get('text')),
+            'summary': decode_cached_text(data.get('summary')),
+        })
+
+    samples = []
+    for entry in entries[:limit]:
+        for field in ('text', 'summary'):
+            value = entry.get(field)
+            if value:
+                samples.append(value)
+    return samples
+
+
+def _train_dictionary(samples: list[str]) -> bytes:
+    counts = Counter(
+        word for sample in samples for word in _WORD_PATTERN.findall(sample)
+    )
+    # zlib favours matches near the end of the dictionary, so the most
+    # frequent words go last.
+    words = [word for word, _ in counts.most_common()]
+    selected: list[bytes] = []
+    size = 0
+    for word in words:
+        encoded = word.encode('utf-8') + b' '
+        if size + len(encoded) > _MAX_DICT_BYTES:
+            break
+        selected.append(encoded)
+        size += len(encoded)
+    return b''.join(reversed(selected))
+
+
+def _measure(samples: list[str], level: int, zdict: bytes | None) -> dict:
+    from server.cache_codec import (  # pylint: disable=import-outside-toplevel
+        decode_cached_text,
+        encode_cached_text,
+    )
+
+    raw_bytes = 0
+    stored_bytes = 0
+    encode_seconds = 0.0
+    decode_seconds = 0.0
+    for sample in samples:
+        started = time.perf_counter()
+        encoded = encode_cached_text(
+            sample, enabled=True, level=level, min_bytes=0, zdict=zdict,
+        )
+        encode_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        decoded = decode_cached_text(encoded, zdict=zdict)
+        decode_seconds += time.perf_counter() - started
+        if decoded != sample:
+            raise RuntimeError('Round trip mismatch.')
+        raw_bytes += len(sample.encode('utf-8'))
+        stored_bytes += len(encoded.encode('utf-8'))
+    count = max(1, len(samples))
+    return {
+        'entries': len(samples),
+        'raw_bytes': raw_bytes,
+        'stored_bytes': stored_bytes,
+        'ratio': round(raw_bytes / max(1, stored_bytes), 2),
+        'encode_us': round(encode_seconds / count * 1e6, 1),
+        'decode_us': round(decode_seconds / count * 1e6, 1),
+    }
+
+
+def main() -> int:
+    """Print codec measurements for the sampled cache entries."""
+    from server.config import (  # pylint: disable=import-outside-toplevel
+        CACHE_DIR,
+        TRANSCRIPT_CACHE_COMPRESSION_LEVEL,
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('cache_dir', nargs='?', type=Path, default=CACHE_DIR)
+    parser.add_argument('--limit', type=int, default=500)
+    parser.add_argument(
+        '--level', type=int, default=TRANSCRIPT_CACHE_COMPRESSION_LEVEL,
+    )
+    parser.add_argument('--train-dict', type=Path)
+    args = parser.parse_args()
+
+    samples = _load_samples(args.cache_dir, args.limit)
+    if not samples:
+        print(f'No cache entries found in {args.cache_dir}.', file=sys.stderr)
+        return 1
+
+    print('zlib:', json.dumps(_measure(samples, args.level, None)))
+    if args.train_dict:
+        zdict = _train_dictionary(samples)
+        args.train_dict.write_bytes(zdict)
+        print('zlib+dict:', json.dumps(_measure(samples, args.level, zdict)))
+        print(f'Dictionary written to {args.train_dict} ({len(zdict)} bytes).')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
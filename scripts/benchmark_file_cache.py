@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Compare the flat JSON file cache with the sharded binary layout.
+
+Writes the same synthetic transcripts in both layouts under a temporary
+directory, then reports write time, random read latency and the time to
+look up entries in a directory with many siblings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_WORDS = ('오늘', '영상', '자막', '요약', 'the', 'video', 'summary', 'today')
+
+
+def _payload(rng: random.Random, words: int) -> dict:
+    text = ' '.join(rng.choice(_WORDS) for _ in range(words))
+    return {
+        'text': text,
+        'summary': '• 첫 줄\n• 둘째 줄\n• 셋째 줄',
+        'source': 'captions',
+        'partial': False,
+    }
+
+
+def _write_flat(cache_dir: Path, key: str, payload: dict) -> None:
+    # pylint: disable=import-outside-toplevel
+    from server.cache_codec import encode_cached_text
+
+    data = {
+        'text': encode_cached_text(payload['text']),
+        'summary': encode_cached_text(payload['summary']),
+        'source': payload['source'],
+        'partial': payload['partial'],
+        'created_at': time.time(),
+    }
+    (cache_dir / f'{key}.json').write_text(
+        json.dumps(data, ensure_ascii=False),
+        encoding='utf-8',
+    )
+
+
+def _read_flat(cache_dir: Path, key: str) -> str:
+    # pylint: disable=import-outside-toplevel
+    from server.cache_codec import decode_cached_text
+
+    data = json.loads((cache_dir / f'{key}.json').read_text(encoding='utf-8'))
+    return decode_cached_text(data['text'])
+
+
+def _timed(label: str, func, keys: list[str]) -> None:
+    started = time.perf_counter()
+    for key in keys:
+        func(key)
+    elapsed = time.perf_counter() - started
+    per_entry_us = elapsed / max(1, len(keys)) * 1e6
+    print(f'{label:<18} {elapsed * 1000:9.1f} ms  {per_entry_us:8.1f} us/op')
+
+
+def main() -> int:
+    """Run the benchmark and print a timing table."""
+    # pylint: disable=import-outside-toplevel
+    from server.file_cache import (
+        read_record,
+        transcript_record_path,
+        write_record,
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--reads', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=1500)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = [f'{rng.getrandbits(128):032x}' for _ in range(args.entries)]
+    payloads = [_payload(rng, args.words) for _ in range(32)]
+    reads = [rng.choice(keys) for _ in range(args.reads)]
+
+    with tempfile.TemporaryDirectory() as flat_name, \
+            tempfile.TemporaryDirectory() as sharded_name:
+        flat_dir = Path(flat_name)
+        sharded_dir = Path(sharded_name)
+        print(f'{args.entries} entries, {args.reads} random reads')
+        _timed(
+            'flat write',
+            lambda key: _write_flat(
+                flat_dir, key, payloads[hash(key) % len(payloads)],
+            ),
+            keys,
+        )
+        _timed(
+            'sharded write',
+            lambda key: write_record(
+                transcript_record_path(sharded_dir, key),
+                payloads[hash(key) % len(payloads)],
+            ),
+            keys,
+        )
+        _timed('flat read', lambda key: _read_flat(flat_dir, key), reads)
+        _timed(
+            'sharded read',
+            lambda key: read_record(transcript_record_path(sharded_dir, key)),
+            reads,
+        )
+        flat_bytes = sum(path.stat().st_size for path in flat_dir.iterdir())
+        sharded_bytes = sum(
+            path.stat().st_size
+            for path in sharded_dir.rglob('*')
+            if path.is_file()
+        )
+        print(f'flat bytes         {flat_bytes}')
+        print(f'sharded bytes      {sharded_bytes}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
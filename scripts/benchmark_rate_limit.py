@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Compare deque-based rate-limit buckets with the GCRA in-memory backend.
+
+Fills both structures with the same number of saturated keys, then reports
+the memory they hold (measured with ``tracemalloc``) and the average cost
+of one allow/deny check.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import deque
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+class _DequeLimiter:
+    """The per-key timestamp log the server used before GCRA."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[str, deque[float]] = {}
+
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> bool:
+        """Admit the request when fewer than ``limit`` fall in the window."""
+        now = time.monotonic()
+        cutoff = now - max(1, window_seconds)
+        with self._lock:
+            bucket = self._buckets.setdefault(key, deque())
+            while bucket and bucket[0] < cutoff:
+                bucket.popleft()
+            if len(bucket) >= limit:
+                return False
+            bucket.append(now)
+        return True
+
+
+def _fill(limiter, keys: list[str], limit: int, window: int) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for key in keys:
+        for _ in range(limit):
+            limiter.hit(key, limit=limit, window_seconds=window)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used
+
+
+def _time_calls(limiter, keys: list[str], limit: int, window: int) -> float:
+    calls = 0
+    started = time.perf_counter()
+    for key in keys:
+        limiter.hit(key, limit=limit, window_seconds=window)
+        calls += 1
+    return (time.perf_counter() - started) / max(1, calls)
+
+
+def main() -> int:
+    """Run the benchmark and print one line per measurement."""
+    # pylint: disable=import-outside-toplevel
+    from server.rate_limit import InMemoryRateLimitBackend, RateLimitBuckets
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--keys', type=int, default=8192)
+    parser.add_argument('--limit', type=int, default=45)
+    parser.add_argument('--window', type=int, default=60)
+    args = parser.parse_args()
+
+    keys = [f'transcript:10.0.{i // 256}.{i % 256}' for i in range(args.keys)]
+    limiters = {
+        'deque': _DequeLimiter(),
+        # Leave headroom so uneven shard sizes never trigger eviction.
+        'gcra': InMemoryRateLimitBackend(
+            RateLimitBuckets(max_buckets=args.keys * 4),
+        ),
+    }
+    for name, limiter in limiters.items():
+        used = _fill(limiter, keys, args.limit, args.window)
+        per_call = _time_calls(limiter, keys, args.limit, args.window)
+        print(f'{name:<6} memory {used / 1024:10.1f} KiB')
+        print(f'{name:<6} check  {per_call * 1e6:10.2f} us')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Move flat CACHE_DIR entries into the sharded binary file cache layout."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _migrate_transcript(path: Path, cache_dir: Path, dry_run: bool) -> bool:
+    # pylint: disable=import-outside-toplevel
+    from server.cache_codec import decode_cached_text
+    from server.file_cache import transcript_record_path, write_record
+
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError):
+        return False
+    text = decode_cached_text(data.get('text', ''))
+    if text is None:
+        return False
+    created_at = data.get('created_at')
+    if dry_run:
+        return True
+    target = transcript_record_path(cache_dir, path.stem)
+    payload = {
+        'text': text,
+        'summary': decode_cached_text(data.get('summary')),
+        'source': data.get('source', 'captions'),
+        'partial': data.get('partial', False),
+    }
+    if not write_record(target, payload, created_at):
+        return False
+    if isinstance(created_at, (int, float)):
+        # The sweeper treats mtime as the creation time.
+        os.utime(target, (created_at, created_at))
+    path.unlink()
+    return True
+
+
+def _migrate_archive(path: Path, cache_dir: Path, dry_run: bool) -> bool:
+    # pylint: disable=import-outside-toplevel
+    from server.file_cache import archive_record_path
+
+    safe = path.stem[len('archive_'):]
+    if not safe:
+        return False
+    if dry_run:
+        return True
+    # Flat names are already filesystem-safe, so they map to themselves.
+    target = archive_record_path(cache_dir, safe)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        path.replace(target)
+    except OSError:
+        return False
+    return True
+
+
+def main() -> int:
+    """Migrate every flat transcript and archive file under CACHE_DIR."""
+    from server.config import (  # pylint: disable=import-outside-toplevel
+        CACHE_DIR,
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('cache_dir', nargs='?', type=Path, default=CACHE_DIR)
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Report what would be migrated without touching files.',
+    )
+    args = parser.parse_args()
+
+    migrated = {'transcripts': 0, 'archives': 0, 'skipped': 0}
+    for path in sorted(args.cache_dir.glob('*.json')):
+        if path.name.startswith('archive_'):
+            ok = _migrate_archive(path, args.cache_dir, args.dry_run)
+            kind = 'archives'
+        else:
+            ok = _migrate_transcript(path, args.cache_dir, args.dry_run)
+            kind = 'transcripts'
+        migrated[kind if ok else 'skipped'] += 1
+
+    prefix = 'Would migrate' if args.dry_run else 'Migrated'
+    print(
+        f"{prefix} {migrated['transcripts']} transcript and "
+        f"{migrated['archives']} archive files "
+        f"({migrated['skipped']} skipped)."
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
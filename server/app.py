@@ -1,19 +1,26 @@
 """FastAPI backend for YouTube Summary."""
 
-from collections import deque
 from contextlib import asynccontextmanager, contextmanager
 import hmac
-import json
+import logging
+import math
 import os
 import re
 import threading
 import time
-import uuid
-from typing import Any, NoReturn, Optional
+from typing import Any, Callable, NoReturn, Optional
 
-import requests
 import jwt
-from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from yt_dlp import YoutubeDL
@@ -23,41 +30,40 @@ from .config import (
     ALLOWED_ORIGINS,
     ALLOW_CLIENT_PLAN_UPDATES,
     ALLOW_CREDENTIALS,
-    ARCHIVE_PLACEHOLDER_CHANNEL_ID,
-    ARCHIVE_PLACEHOLDER_CHANNEL_TITLE,
-    ARCHIVE_PLACEHOLDER_VIDEO_TITLE,
-    ARCHIVE_VIDEO_ID_PATTERN,
-    AUTH_CACHE_MAX_ITEMS,
+    ARCHIVE_BATCH_ITEMS_PER_WRITE,
     AUTH_CLOCK_SKEW_SECONDS,
+    AUTH_NEGATIVE_CACHE_MAX_ITEMS,
+    AUTH_NEGATIVE_CACHE_TTL_SECONDS,
     BACKEND_REQUIRE_AUTH,
-    CHANNEL_ID_PATTERN,
+    CACHE_SWEEPER_ENABLED,
     CONFIGURED_CLIENT_IDS,
     ENABLE_API_DOCS,
+    ENABLE_METRICS_ENDPOINT,
     FAIL_CLOSED_WITHOUT_DB,
     GOOGLE_ID_TOKEN_ALGORITHMS,
-    GOOGLE_JWKS_CACHE_TTL_SECONDS,
     GOOGLE_JWKS_ISSUERS,
-    GOOGLE_JWKS_TIMEOUT_SECONDS,
-    GOOGLE_JWKS_URL,
-    MAX_CHANNEL_THUMBNAIL_LENGTH,
-    MAX_CHANNEL_TITLE_LENGTH,
     MAX_OPENED_VIDEO_IDS,
-    MAX_SELECTION_CHANGE_DAY,
-    MAX_SELECTION_CHANGES_TODAY,
     OPENAI_API_KEY,
     OPENAI_SUMMARY_INPUT_CHARS,
     OPENAI_SUMMARY_MAX_TOKENS,
     OPENAI_SUMMARY_MODEL,
-    PLAN_CHANNEL_LIMITS,
-    PLAN_TIER_PATTERN,
     PLAN_UPDATE_SHARED_SECRET,
-    RATE_LIMIT_MAX_BUCKETS,
+    PREWARM_ENABLED,
+    PREWARM_MAX_CONCURRENCY,
+    SESSION_TOKEN_PREVIOUS_SECRET,
+    SESSION_TOKEN_SECRET,
+    SESSION_TOKEN_TTL_SECONDS,
+    SUMMARY_MAX_LINES,
     TRANSCRIPT_DEFAULT_MAX_CHARS,
     TRANSCRIPT_MAX_MAX_CHARS,
     TRANSCRIPT_MIN_MAX_CHARS,
     TRANSCRIPT_MAX_CONCURRENCY,
+    TRANSCRIPT_PENDING_RETRY_SECONDS,
     TRANSCRIPT_QUEUE_TIMEOUT,
-    TRANSCRIPT_RATE_LIMIT_PER_WINDOW,
+    TRANSCRIPT_RATE_BUDGET_PER_WINDOW,
+    TRANSCRIPT_RATE_COST_CACHE_HIT,
+    TRANSCRIPT_RATE_COST_CAPTIONS,
+    TRANSCRIPT_RATE_COST_WHISPER,
     TRANSCRIPT_RATE_LIMIT_WINDOW_SECONDS,
     TRUST_PROXY_HEADERS,
     USER_ID_PATTERN,
@@ -69,26 +75,68 @@ from .config import (
     YTDLP_PLAYER_CLIENT_LIST,
     YTDLP_SOCKET_TIMEOUT_SECONDS,
 )
-from .db import check_db, get_session, is_db_enabled, validate_schema
-from .models import (
-    Archive,
-    Channel,
-    User,
-    UserChannel,
-    UserState,
-    Video,
+from .async_db import (
+    async_pool_stats,
+    dispose_async_db,
+    get_async_session,
+    is_async_db_enabled,
+)
+from .async_persistence import (
+    fetch_archive_calendar,
+    fetch_archive_page,
+    fetch_data_version,
+    fetch_selection,
+    fetch_user,
+    fetch_user_state,
+)
+from .auth_cache import AuthCache
+from .cache_sweeper import CacheSweeper
+from .conditional import ConditionalGet
+from .cursors import (
+    count_archive_file_days,
+    decode_archive_cursor,
+    paginate_archive_file_items,
 )
+from .db import (
+    check_db,
+    get_session,
+    is_db_enabled,
+    pool_stats,
+    validate_schema,
+)
+from .google_jwks import GoogleJwksStore, JwksUnavailableError
+from .models import Archive, User
 from .persistence import (
-    ensure_user_exists,
+    apply_archive_batch,
+    build_db_archive_response,
+    bump_data_version,
+    ensure_user_plan_tier,
+    load_archive_calendar,
+    load_archive_page,
+    load_data_version,
+    load_selection,
+    load_user_state,
     normalize_selection_request,
-    serialize_archive_items,
+    selection_response,
     sync_user_channel_links,
-    upsert_archive_video,
+    toggle_archive_row,
+    touch_user,
     upsert_channels,
     upsert_user_profile,
     upsert_user_state_row,
+    user_response,
+    user_state_response,
+)
+from .prewarm import PrewarmScheduler, YouTubeFeedSource
+from .rate_limit import (
+    InMemoryRateLimitBackend,
+    RateLimitBuckets,
+    RateLimiter,
+    build_rate_limit_backend,
 )
+from .revalidation import CacheRevalidator
 from .schemas import (
+    ArchiveBatchRequest,
     ArchiveClearRequest,
     ArchiveToggleRequest,
     SelectionRequest,
@@ -97,34 +145,75 @@ from .schemas import (
     UserStateUpsertRequest,
     UserUpsertRequest,
 )
-from . import transcript_utils
+from .session_tokens import (
+    SessionTokenError,
+    is_session_token,
+    issue_session_token,
+    verify_session_token,
+)
+from .single_flight import AdvisoryLockSingleFlight, SingleFlightPending
+from . import security_headers, transcript_utils
 from .transcript_utils import (
+    audio_download_error_detail,
+    audio_download_error_status,
     build_transcript_cache_key,
     load_archives_file,
     load_cache,
     normalize_summary,
     parse_caption_payload,
     parse_json3,
+    render_transcript_response,
     save_archives_file,
     save_cache,
     sanitize_max_chars,
+    sanitize_summary_lines,
     toggle_archive_file,
     trim_text,
 )
+from .validation import (
+    channel_limit_for_plan_tier,
+    enforce_selection_plan_limit,
+    normalize_archive_batch,
+    normalize_opened_video_ids,
+    sanitize_archive_metadata,
+    sanitize_archive_page_limit,
+    sanitize_archive_range,
+    sanitize_calendar_range,
+    sanitize_archive_video_id,
+    sanitize_email,
+    sanitize_plan_tier,
+    sanitize_selection_change_day,
+    sanitize_selection_changes_today,
+    sanitize_user_id,
+    sanitize_utc_offset_minutes,
+    sanitize_video_id,
+)
 
 TRANSCRIPT_SEMAPHORE = threading.Semaphore(max(1, TRANSCRIPT_MAX_CONCURRENCY))
-AUTH_CACHE_LOCK = threading.Lock()
-AUTH_CACHE: dict[str, tuple[float, str]] = {}
-TRANSCRIPT_RATE_LOCK = threading.Lock()
-TRANSCRIPT_RATE_BUCKETS: dict[str, deque[float]] = {}
-WRITE_RATE_LOCK = threading.Lock()
-WRITE_RATE_BUCKETS: dict[str, deque[float]] = {}
-GOOGLE_JWKS_LOCK = threading.Lock()
-GOOGLE_JWKS_BY_KID: dict[str, Any] = {}
-GOOGLE_JWKS_STATE = {'expires_at': 0.0}
+# Pre-warm jobs get their own slots so they never queue ahead of users.
+PREWARM_SEMAPHORE = threading.Semaphore(max(1, PREWARM_MAX_CONCURRENCY))
+AUTH_CACHE = AuthCache()
+AUTH_FAILURE_CACHE = AuthCache(max_items=AUTH_NEGATIVE_CACHE_MAX_ITEMS)
+TRANSCRIPT_RATE_BUCKETS = RateLimitBuckets()
+WRITE_RATE_BUCKETS = RateLimitBuckets()
+SHARED_RATE_LIMIT_BACKEND = build_rate_limit_backend()
+TRANSCRIPT_RATE_LIMITER = RateLimiter(
+    SHARED_RATE_LIMIT_BACKEND,
+    InMemoryRateLimitBackend(TRANSCRIPT_RATE_BUCKETS),
+)
+WRITE_RATE_LIMITER = RateLimiter(
+    SHARED_RATE_LIMIT_BACKEND,
+    InMemoryRateLimitBackend(WRITE_RATE_BUCKETS),
+)
+GOOGLE_JWKS = GoogleJwksStore()
 # Backward-compatible test seam while config moved into server.config.
 _configured_client_ids = CONFIGURED_CLIENT_IDS
+# Backward-compatible test seams for helpers moved into server.validation.
+_channel_limit_for_plan_tier = channel_limit_for_plan_tier
+_enforce_selection_plan_limit = enforce_selection_plan_limit
+_normalize_opened_video_ids = normalize_opened_video_ids
 PUBLIC_TEST_SEAMS = (
+    MAX_OPENED_VIDEO_IDS,
     normalize_summary,
     parse_caption_payload,
     parse_json3,
@@ -159,7 +248,24 @@ async def app_lifespan(_: FastAPI):
                 '데이터베이스 스키마가 준비되지 않았습니다. '
                 f'scripts/migrate_db.py를 먼저 실행하세요. ({detail})'
             )
-    yield
+    if BACKEND_REQUIRE_AUTH:
+        try:
+            GOOGLE_JWKS.refresh()
+        except JwksUnavailableError:
+            logging.warning('Google JWKS prefetch failed; retrying later.')
+        GOOGLE_JWKS.start()
+    if PREWARM_ENABLED:
+        PREWARM_SCHEDULER.start()
+    if CACHE_SWEEPER_ENABLED:
+        CACHE_SWEEPER.start()
+    try:
+        yield
+    finally:
+        GOOGLE_JWKS.stop()
+        CACHE_SWEEPER.stop()
+        PREWARM_SCHEDULER.stop()
+        TRANSCRIPT_REVALIDATOR.shutdown()
+        await dispose_async_db()
 
 
 app = FastAPI(
@@ -186,40 +292,19 @@ app.add_middleware(
 @app.middleware('http')
 async def apply_security_headers(request: Request, call_next):
     """Apply basic security headers and correlation id."""
-    response = await call_next(request)
-    raw_request_id = request.headers.get('X-Request-Id')
-    if raw_request_id and re.fullmatch(
-        r'[A-Za-z0-9_\-\.]{1,128}', raw_request_id
-    ):
-        request_id = raw_request_id
-    else:
-        request_id = str(uuid.uuid4())
-    response.headers.setdefault('X-Request-Id', request_id)
-    response.headers.setdefault('X-Content-Type-Options', 'nosniff')
-    response.headers.setdefault('X-Frame-Options', 'DENY')
-    response.headers.setdefault('Referrer-Policy', 'no-referrer')
-    response.headers.setdefault(
-        'Content-Security-Policy',
-        "default-src 'none'; frame-ancestors 'none'; base-uri 'none'",
-    )
-    response.headers.setdefault(
-        'Permissions-Policy',
-        'geolocation=(), microphone=(), camera=()',
+    return security_headers.apply_security_headers(
+        request, await call_next(request),
     )
-    response.headers.setdefault('Cross-Origin-Resource-Policy', 'same-site')
-    response.headers.setdefault('Cache-Control', 'no-store')
-    if request.url.scheme == 'https':
-        response.headers.setdefault(
-            'Strict-Transport-Security',
-            'max-age=31536000; includeSubDomains',
-        )
-    return response
 
 
 @contextmanager
-def _transcript_slot(timeout: int):
+def _transcript_slot(
+    timeout: int,
+    semaphore: Optional[threading.Semaphore] = None,
+):
     """Acquire a transcript slot or raise if the queue is full."""
-    if not TRANSCRIPT_SEMAPHORE.acquire(timeout=timeout):
+    semaphore = semaphore or TRANSCRIPT_SEMAPHORE
+    if not semaphore.acquire(timeout=timeout):
         raise HTTPException(
             status_code=429,
             detail='요청이 많아 잠시 후 다시 시도해주세요.',
@@ -227,20 +312,13 @@ def _transcript_slot(timeout: int):
     try:
         yield
     finally:
-        TRANSCRIPT_SEMAPHORE.release()
+        semaphore.release()
 
 
 def _require_session(session: Any):
     """Return a DB session or raise a consistent HTTP error."""
     if session is None:
-        raise HTTPException(
-            status_code=503 if FAIL_CLOSED_WITHOUT_DB else 500,
-            detail=(
-                'database required'
-                if FAIL_CLOSED_WITHOUT_DB
-                else 'database not available'
-            ),
-        )
+        _raise_db_unavailable()
     return session
 
 
@@ -263,143 +341,24 @@ def _raise_db_unavailable(exc: Optional[Exception] = None) -> NoReturn:
     raise HTTPException(status_code=status_code, detail=detail) from exc
 
 
-def _sanitize_user_id(raw_user_id: str) -> str:
-    user_id = raw_user_id.strip()
-    if not user_id:
-        raise HTTPException(status_code=400, detail='user_id is required')
-    if not USER_ID_PATTERN.fullmatch(user_id):
-        raise HTTPException(status_code=400, detail='user_id is invalid')
-    return user_id
-
-
-def _sanitize_video_id(raw_video_id: str) -> str:
-    video_id = raw_video_id.strip()
-    if not video_id:
-        raise HTTPException(status_code=400, detail='video_id is required')
-    if not VIDEO_ID_PATTERN.fullmatch(video_id):
-        raise HTTPException(status_code=400, detail='video_id is invalid')
-    return video_id
-
-
-def _sanitize_archive_video_id(raw_video_id: str) -> str:
-    video_id = raw_video_id.strip()
-    if not video_id:
-        raise HTTPException(status_code=400, detail='video_id is required')
-    if not ARCHIVE_VIDEO_ID_PATTERN.fullmatch(video_id):
-        raise HTTPException(status_code=400, detail='video_id is invalid')
-    return video_id
-
-
-def _sanitize_plan_tier(raw_plan_tier: str) -> str:
-    plan_tier = raw_plan_tier.strip().lower()
-    if not plan_tier:
+def _degraded_read(
+    exc: SQLAlchemyError, conditional: ConditionalGet, empty: dict,
+) -> dict:
+    """Fail closed on a read error, or serve an uncacheable empty body."""
+    if FAIL_CLOSED_WITHOUT_DB:
         raise HTTPException(
-            status_code=400,
-            detail='user_id and plan_tier are required',
-        )
-    if not PLAN_TIER_PATTERN.fullmatch(plan_tier):
-        raise HTTPException(status_code=400, detail='plan_tier is invalid')
-    return plan_tier
-
-
-def _channel_limit_for_plan_tier(raw_plan_tier: Optional[str]) -> Optional[int]:
-    if not raw_plan_tier:
-        return PLAN_CHANNEL_LIMITS['free']
-    try:
-        plan_tier = _sanitize_plan_tier(raw_plan_tier)
-    except HTTPException:
-        plan_tier = 'free'
-    return PLAN_CHANNEL_LIMITS.get(plan_tier, PLAN_CHANNEL_LIMITS['free'])
+            status_code=503, detail='database required',
+        ) from exc
+    conditional.discard()
+    return empty
 
 
-def _enforce_selection_plan_limit(
-    plan_tier: Optional[str],
-    selected_ids: list[str],
-) -> None:
-    limit = _channel_limit_for_plan_tier(plan_tier)
-    if limit is not None and len(selected_ids) > limit:
+def _raise_write_failed(exc: SQLAlchemyError, detail: str) -> NoReturn:
+    if FAIL_CLOSED_WITHOUT_DB:
         raise HTTPException(
-            status_code=403,
-            detail='selected channel limit exceeded for current plan',
-        )
-
-
-def _sanitize_selection_change_day(raw_day: Optional[int]) -> int:
-    if raw_day is None:
-        return 0
-    value = int(raw_day)
-    if value < 0:
-        return 0
-    if value > MAX_SELECTION_CHANGE_DAY:
-        return MAX_SELECTION_CHANGE_DAY
-    return value
-
-
-def _sanitize_selection_changes_today(raw_count: Optional[int]) -> int:
-    if raw_count is None:
-        return 0
-    value = int(raw_count)
-    if value < 0:
-        return 0
-    if value > MAX_SELECTION_CHANGES_TODAY:
-        return MAX_SELECTION_CHANGES_TODAY
-    return value
-
-
-def _normalize_opened_video_ids(raw_ids: list[str]) -> list[str]:
-    normalized = []
-    seen = set()
-    for raw in raw_ids:
-        video_id = raw.strip()
-        if not VIDEO_ID_PATTERN.fullmatch(video_id):
-            continue
-        if video_id in seen:
-            continue
-        seen.add(video_id)
-        normalized.append(video_id)
-        if len(normalized) >= MAX_OPENED_VIDEO_IDS:
-            break
-    return normalized
-
-
-def _sanitize_archive_title(raw_title: Optional[str]) -> Optional[str]:
-    if raw_title is None:
-        return None
-    title = raw_title.strip()[:MAX_CHANNEL_TITLE_LENGTH]
-    return title or None
-
-
-def _sanitize_archive_thumbnail_url(raw_url: Optional[str]) -> Optional[str]:
-    if raw_url is None:
-        return None
-    url = raw_url.strip()[:MAX_CHANNEL_THUMBNAIL_LENGTH]
-    return url or None
-
-
-def _sanitize_archive_channel_id(
-    raw_channel_id: Optional[str],
-) -> Optional[str]:
-    if raw_channel_id is None:
-        return None
-    channel_id = raw_channel_id.strip()
-    if not channel_id:
-        return None
-    if not CHANNEL_ID_PATTERN.fullmatch(channel_id):
-        return None
-    return channel_id
-
-
-def _sanitize_email(raw_email: Optional[str]) -> Optional[str]:
-    if raw_email is None:
-        return None
-    email = raw_email.strip()
-    if not email:
-        return None
-    if len(email) > 255:
-        raise HTTPException(status_code=400, detail='email is too long')
-    if '@' not in email:
-        raise HTTPException(status_code=400, detail='email is invalid')
-    return email
+            status_code=503, detail='database required',
+        ) from exc
+    raise HTTPException(status_code=500, detail=detail) from exc
 
 
 def _extract_bearer_token(authorization: Optional[str]) -> str:
@@ -411,73 +370,6 @@ def _extract_bearer_token(authorization: Optional[str]) -> str:
     return token.strip()
 
 
-def _extract_max_age(cache_control: str) -> Optional[int]:
-    match = re.search(r'max-age=(\d+)', cache_control)
-    if not match:
-        return None
-    return int(match.group(1))
-
-
-def _refresh_google_jwks(force_refresh: bool = False) -> dict[str, Any]:
-    now = time.time()
-    with GOOGLE_JWKS_LOCK:
-        if (
-            not force_refresh
-            and GOOGLE_JWKS_BY_KID
-            and GOOGLE_JWKS_STATE['expires_at'] > now
-        ):
-            return GOOGLE_JWKS_BY_KID
-
-        try:
-            response = requests.get(
-                GOOGLE_JWKS_URL,
-                timeout=GOOGLE_JWKS_TIMEOUT_SECONDS,
-            )
-        except requests.RequestException as exc:
-            raise HTTPException(
-                status_code=401,
-                detail='invalid access token',
-            ) from exc
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=401, detail='invalid access token')
-
-        try:
-            payload = response.json()
-        except ValueError as exc:
-            raise HTTPException(
-                status_code=401,
-                detail='invalid access token',
-            ) from exc
-
-        keys = payload.get('keys')
-        if not isinstance(keys, list):
-            raise HTTPException(status_code=401, detail='invalid access token')
-
-        jwks_by_kid: dict[str, Any] = {}
-        for key_data in keys:
-            if not isinstance(key_data, dict):
-                continue
-            key_id = key_data.get('kid')
-            if not isinstance(key_id, str) or not key_id:
-                continue
-            try:
-                jwks_by_kid[key_id] = jwt.PyJWK.from_dict(key_data).key
-            except jwt.PyJWTError:
-                continue
-
-        if not jwks_by_kid:
-            raise HTTPException(status_code=401, detail='invalid access token')
-
-        max_age = _extract_max_age(response.headers.get('Cache-Control', ''))
-        ttl = max_age if max_age is not None else GOOGLE_JWKS_CACHE_TTL_SECONDS
-        ttl = max(60, ttl)
-        GOOGLE_JWKS_BY_KID.clear()
-        GOOGLE_JWKS_BY_KID.update(jwks_by_kid)
-        GOOGLE_JWKS_STATE['expires_at'] = now + ttl
-        return GOOGLE_JWKS_BY_KID
-
-
 def _resolve_google_signing_key(token: str):
     try:
         header = jwt.get_unverified_header(token)
@@ -495,11 +387,15 @@ def _resolve_google_signing_key(token: str):
     if not isinstance(key_id, str) or not key_id.strip():
         raise HTTPException(status_code=401, detail='invalid access token')
 
-    key_map = _refresh_google_jwks()
-    key = key_map.get(key_id)
-    if key is None:
-        key_map = _refresh_google_jwks(force_refresh=True)
-        key = key_map.get(key_id)
+    try:
+        key = GOOGLE_JWKS.keys().get(key_id)
+        if key is None:
+            key = GOOGLE_JWKS.refresh_for_unknown_kid().get(key_id)
+    except JwksUnavailableError as exc:
+        raise HTTPException(
+            status_code=401,
+            detail='invalid access token',
+        ) from exc
     if key is None:
         raise HTTPException(status_code=401, detail='invalid access token')
     return key
@@ -543,15 +439,9 @@ def _validate_google_token_claims(payload: dict[str, Any]) -> str:
     return subject
 
 
-def _verify_google_user(token: str) -> str:
-    now = time.time()
-    with AUTH_CACHE_LOCK:
-        cached = AUTH_CACHE.get(token)
-        if cached and cached[0] > now:
-            return cached[1]
-
+def _decode_google_token(token: str, signing_key: Any) -> tuple[str, float]:
+    """Verify the signature and claims; return ``(subject, expiry)``."""
     try:
-        signing_key = _resolve_google_signing_key(token)
         payload = jwt.decode(
             token,
             signing_key,
@@ -581,27 +471,59 @@ def _verify_google_user(token: str) -> str:
             status_code=401,
             detail='token exp invalid',
         ) from exc
+    return subject, expiry
+
+
+def _verify_google_user(token: str) -> str:
+    cached_subject = AUTH_CACHE.get(token)
+    if cached_subject is not None:
+        return cached_subject
+    # Tokens that recently failed verification are rejected without
+    # another RS256 check until the negative entry expires.
+    cached_failure = AUTH_FAILURE_CACHE.get(token)
+    if cached_failure is not None:
+        raise HTTPException(status_code=401, detail=cached_failure)
+
+    # Unknown-kid and JWKS failures are not cached: a token signed with a
+    # freshly rotated key must work as soon as the keys are refetched.
+    signing_key = _resolve_google_signing_key(token)
+    try:
+        subject, expiry = _decode_google_token(token, signing_key)
+    except HTTPException as exc:
+        if AUTH_NEGATIVE_CACHE_TTL_SECONDS > 0:
+            AUTH_FAILURE_CACHE.put(
+                token,
+                str(exc.detail),
+                time.time() + AUTH_NEGATIVE_CACHE_TTL_SECONDS,
+            )
+        raise
 
-    with AUTH_CACHE_LOCK:
-        AUTH_CACHE[token] = (expiry, subject)
-        if len(AUTH_CACHE) > AUTH_CACHE_MAX_ITEMS:
-            now_ts = time.time()
-            expired_keys = [
-                k for k, (exp, _) in AUTH_CACHE.items() if exp <= now_ts
-            ]
-            for k in expired_keys:
-                AUTH_CACHE.pop(k, None)
-            if len(AUTH_CACHE) > AUTH_CACHE_MAX_ITEMS:
-                AUTH_CACHE.pop(next(iter(AUTH_CACHE)))
+    AUTH_CACHE.put(token, subject, expiry)
     return subject
 
 
+def _verify_bearer_subject(token: str) -> str:
+    """Return the subject of a session token or a Google ID token."""
+    if not is_session_token(token):
+        return _verify_google_user(token)
+    if not SESSION_TOKEN_SECRET:
+        raise HTTPException(status_code=401, detail='invalid access token')
+    try:
+        return verify_session_token(
+            token,
+            secrets=(SESSION_TOKEN_SECRET, SESSION_TOKEN_PREVIOUS_SECRET),
+            leeway_seconds=AUTH_CLOCK_SKEW_SECONDS,
+        )
+    except SessionTokenError as exc:
+        raise HTTPException(status_code=401, detail=str(exc)) from exc
+
+
 def _authorize_user(user_id: str, authorization: Optional[str]) -> str:
-    normalized_user_id = _sanitize_user_id(user_id)
+    normalized_user_id = sanitize_user_id(user_id)
     if not BACKEND_REQUIRE_AUTH:
         return normalized_user_id
     token = _extract_bearer_token(authorization)
-    token_subject = _verify_google_user(token)
+    token_subject = _verify_bearer_subject(token)
     if token_subject != normalized_user_id:
         raise HTTPException(status_code=403, detail='user mismatch')
     return normalized_user_id
@@ -614,7 +536,7 @@ def _resolve_transcript_principal(
     if not BACKEND_REQUIRE_AUTH:
         return f'ip:{_resolve_client_id(request)}'
     token = _extract_bearer_token(authorization)
-    user_id = _verify_google_user(token)
+    user_id = _verify_bearer_subject(token)
     return f'user:{user_id}'
 
 
@@ -649,49 +571,61 @@ def _resolve_client_id(request: Request) -> str:
 
 def _enforce_rate_limit(
     *,
+    limiter: RateLimiter,
     key: str,
     per_window: int,
     window_seconds: int,
-    lock: threading.Lock,
-    buckets: dict[str, deque[float]],
+    cost: int = 1,
 ) -> None:
-    if per_window <= 0:
-        return
-    now = time.monotonic()
-    cutoff = now - max(1, window_seconds)
-    with lock:
-        bucket = buckets.setdefault(key, deque())
-        while bucket and bucket[0] < cutoff:
-            bucket.popleft()
-        if len(bucket) >= per_window:
-            raise HTTPException(
-                status_code=429,
-                detail='요청이 많아 잠시 후 다시 시도해주세요.',
-            )
-        bucket.append(now)
-        if len(buckets) > RATE_LIMIT_MAX_BUCKETS:
-            stale_keys = [
-                bucket_key
-                for bucket_key, values in buckets.items()
-                if not values or values[-1] < cutoff
-            ]
-            for stale_key in stale_keys:
-                buckets.pop(stale_key, None)
-
-
-def _enforce_transcript_rate_limit(client_id: str) -> None:
-    _enforce_rate_limit(
-        key=f'transcript:{client_id}',
-        per_window=TRANSCRIPT_RATE_LIMIT_PER_WINDOW,
+    allowed, _ = limiter.charge(
+        key, limit=per_window, window_seconds=window_seconds, cost=cost,
+    )
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail='요청이 많아 잠시 후 다시 시도해주세요.',
+        )
+
+
+def _charge_transcript_rate_limit(
+    response: Response,
+    client_id: str,
+    cost: int,
+    *,
+    force: bool = False,
+) -> None:
+    """Charge transcript work against the client's budget.
+
+    Cache hits, caption fetches and Whisper jobs cost different amounts,
+    so the endpoint charges in steps as it learns what a request needs.
+    The remaining budget is reported in ``X-RateLimit-*`` headers.
+    """
+    allowed, remaining = TRANSCRIPT_RATE_LIMITER.charge(
+        f'transcript:{client_id}',
+        limit=TRANSCRIPT_RATE_BUDGET_PER_WINDOW,
         window_seconds=TRANSCRIPT_RATE_LIMIT_WINDOW_SECONDS,
-        lock=TRANSCRIPT_RATE_LOCK,
-        buckets=TRANSCRIPT_RATE_BUCKETS,
+        cost=cost,
+        force=force,
     )
+    if TRANSCRIPT_RATE_BUDGET_PER_WINDOW <= 0:
+        return
+    headers = {
+        'X-RateLimit-Limit': str(TRANSCRIPT_RATE_BUDGET_PER_WINDOW),
+        'X-RateLimit-Remaining': str(remaining),
+    }
+    if not allowed and not force:
+        raise HTTPException(
+            status_code=429,
+            detail='요청이 많아 잠시 후 다시 시도해주세요.',
+            headers=headers,
+        )
+    response.headers.update(headers)
 
 
 def _enforce_write_rate_limit(
     request: Request,
     user_id: Optional[str] = None,
+    cost: int = 1,
 ) -> None:
     principal = (
         f'user:{user_id}'
@@ -699,11 +633,11 @@ def _enforce_write_rate_limit(
         else f'ip:{_resolve_client_id(request)}'
     )
     _enforce_rate_limit(
+        limiter=WRITE_RATE_LIMITER,
         key=f'write:{principal}',
         per_window=WRITE_RATE_LIMIT_PER_WINDOW,
         window_seconds=WRITE_RATE_LIMIT_WINDOW_SECONDS,
-        lock=WRITE_RATE_LOCK,
-        buckets=WRITE_RATE_BUCKETS,
+        cost=cost,
     )
 
 
@@ -736,19 +670,69 @@ def health_check():
     }
 
 
+@app.get('/metrics')
+def metrics():
+    """Return in-process cache and background job counters."""
+    if not ENABLE_METRICS_ENDPOINT:
+        raise HTTPException(status_code=404, detail='Not Found')
+    return {
+        'transcript_memory_cache': (
+            transcript_utils.TRANSCRIPT_MEMORY_CACHE.stats()
+        ),
+        'transcript_shared_cache': (
+            transcript_utils.TRANSCRIPT_SHARED_CACHE.stats()
+        ),
+        'transcript_revalidation': TRANSCRIPT_REVALIDATOR.stats(),
+        'prewarm': PREWARM_SCHEDULER.stats(),
+        'cache_sweeper': CACHE_SWEEPER.stats(),
+        'transcript_single_flight': TRANSCRIPT_SINGLE_FLIGHT.stats(),
+        'transcript_rate_limit': TRANSCRIPT_RATE_LIMITER.stats(),
+        'write_rate_limit': WRITE_RATE_LIMITER.stats(),
+        'auth_cache': AUTH_CACHE.stats(),
+        'auth_failure_cache': AUTH_FAILURE_CACHE.stats(),
+        'google_jwks': GOOGLE_JWKS.stats(),
+        'db_pool': pool_stats(),
+        'db_async_pool': async_pool_stats(),
+    }
+
+
+@app.post('/auth/session')
+def create_session(
+    request: Request,
+    authorization: Optional[str] = Header(default=None),
+):
+    """Exchange a Google ID token for a short-lived session token."""
+    if not SESSION_TOKEN_SECRET:
+        raise HTTPException(status_code=404, detail='Not Found')
+    _enforce_write_rate_limit(request)
+    token = _extract_bearer_token(authorization)
+    if is_session_token(token):
+        raise HTTPException(status_code=401, detail='invalid access token')
+    user_id = _verify_google_user(token)
+    expires_at = int(time.time()) + SESSION_TOKEN_TTL_SECONDS
+    return {
+        'session_token': issue_session_token(
+            user_id, secret=SESSION_TOKEN_SECRET, expires_at=expires_at,
+        ),
+        'token_type': 'Bearer',
+        'user_id': user_id,
+        'expires_at': expires_at,
+        'expires_in': SESSION_TOKEN_TTL_SECONDS,
+    }
+
+
 def _build_transcript_payload(
     source_text: str,
     *,
     source: str,
     summarize: bool,
-    summary_lines: Optional[int],
     max_chars: int,
 ) -> dict[str, Any]:
     text, partial = trim_text(source_text, max_chars)
     summary = (
         transcript_utils.build_summary(
             source_text,
-            summary_lines,
+            SUMMARY_MAX_LINES,
             api_key=OPENAI_API_KEY,
             input_chars=OPENAI_SUMMARY_INPUT_CHARS,
             model=OPENAI_SUMMARY_MODEL,
@@ -765,198 +749,364 @@ def _build_transcript_payload(
     }
 
 
-def _resolve_audio_download_detail(error: Optional[str]) -> str:
-    detail = '음성 다운로드에 실패했습니다.'
-    if not error:
-        return detail
-    if transcript_utils.is_membership_error(error):
-        return 'You might not have membership for this video.'
-    if 'HTTP Error 403' in error or 'Forbidden' in error:
-        return (
-            '음성 다운로드가 차단되었습니다. '
-            'YouTube 제한(로그인/연령/지역) 또는 다운로더 업데이트가 필요합니다.'
-        )
-    return detail
-
-
-def _build_archive_metadata(
-    req: ArchiveToggleRequest,
-) -> dict[str, Optional[str]]:
-    return {
-        'title': _sanitize_archive_title(req.title),
-        'thumbnail_url': _sanitize_archive_thumbnail_url(req.thumbnail_url),
-        'channel_id': _sanitize_archive_channel_id(req.channel_id),
-        'channel_title': _sanitize_archive_title(req.channel_title),
-        'channel_thumbnail_url': _sanitize_archive_thumbnail_url(
-            req.channel_thumbnail_url
-        ),
-    }
-
-
 @app.post('/transcript')
 def transcript(
     req: TranscriptRequest,
     request: Request,
+    response: Response,
     authorization: Optional[str] = Header(default=None),
 ):
     """Return transcript and summary for a YouTube video."""
     principal = _resolve_transcript_principal(request, authorization)
-    _enforce_transcript_rate_limit(principal)
-    video_id = _sanitize_video_id(req.video_id)
+    _charge_transcript_rate_limit(
+        response, principal, TRANSCRIPT_RATE_COST_CACHE_HIT,
+    )
+    video_id = sanitize_video_id(req.video_id)
     max_chars = sanitize_max_chars(req.max_chars)
+    summary_lines = sanitize_summary_lines(req.summary_lines)
     cache_key = build_transcript_cache_key(
         video_id=video_id,
         max_chars=max_chars,
         summarize=bool(req.summarize),
-        summary_lines=req.summary_lines,
     )
 
     cached = load_cache(cache_key)
+    if cached and cached.get('stale') and (
+        TRANSCRIPT_REVALIDATOR.is_rejected(cache_key)
+    ):
+        # The video is gone or private; recompute to surface the error.
+        cached = None
     if cached:
-        return {**cached, 'cached': True}
-
-    with _transcript_slot(TRANSCRIPT_QUEUE_TIMEOUT):
-        caption_text = transcript_utils.fetch_caption_text(video_id)
-        if not caption_text:
-            caption_text = transcript_utils.fetch_caption_text_via_ytdlp(
-                video_id,
-                cookies_from_browser=YTDLP_COOKIES_FROM_BROWSER,
-                cookies_path=YTDLP_COOKIES_PATH,
-                player_client_list=YTDLP_PLAYER_CLIENT_LIST,
-                socket_timeout_seconds=YTDLP_SOCKET_TIMEOUT_SECONDS,
-                youtube_dl_cls=YoutubeDL,
+        if cached.get('stale'):
+            TRANSCRIPT_REVALIDATOR.schedule(
+                cache_key,
+                lambda: _recompute_transcript_cache(
+                    cache_key,
+                    video_id,
+                    summarize=bool(req.summarize),
+                    max_chars=max_chars,
+                ),
             )
+        return render_transcript_response(
+            cached, summary_lines=summary_lines, cached=True,
+        )
 
-        if caption_text:
-            payload = _build_transcript_payload(
-                caption_text,
-                source='captions',
-                summarize=bool(req.summarize),
-                summary_lines=req.summary_lines,
-                max_chars=max_chars,
-            )
+    _charge_transcript_rate_limit(
+        response,
+        principal,
+        max(0, TRANSCRIPT_RATE_COST_CAPTIONS - TRANSCRIPT_RATE_COST_CACHE_HIT),
+    )
+    computed: list[dict[str, Any]] = []
+    payload = _recompute_transcript_cache(
+        cache_key,
+        video_id,
+        summarize=bool(req.summarize),
+        max_chars=max_chars,
+        on_computed=computed.append,
+    )
+    if computed and payload.get('source') == 'whisper':
+        # The audio path is only known once captions are missing, and the
+        # work is done by then, so its extra cost is charged as debt. A
+        # request that got another instance's result did no audio work.
+        extra_cost = (
+            TRANSCRIPT_RATE_COST_WHISPER - TRANSCRIPT_RATE_COST_CAPTIONS
+        )
+        _charge_transcript_rate_limit(
+            response, principal, max(0, extra_cost), force=True,
+        )
+    return render_transcript_response(
+        payload, summary_lines=summary_lines, cached=False,
+    )
+
+
+def _recompute_transcript_cache(
+    cache_key: str,
+    video_id: str,
+    *,
+    summarize: bool,
+    max_chars: int,
+    allow_audio: bool = True,
+    semaphore: Optional[threading.Semaphore] = None,
+    on_computed: Optional[Callable[[dict[str, Any]], None]] = None,
+) -> Optional[dict[str, Any]]:
+    """Compute a transcript payload inside a slot and store it in cache.
+
+    Concurrent computations of the same cache key across instances are
+    collapsed by ``TRANSCRIPT_SINGLE_FLIGHT``; callers that lose the race
+    get the winner's cached payload, or a 503 with Retry-After while it is
+    still running. ``on_computed`` is only called when this call did the
+    work itself.
+    """
+    def _compute_and_save() -> Optional[dict[str, Any]]:
+        payload = _compute_transcript_payload(
+            video_id,
+            summarize=summarize,
+            max_chars=max_chars,
+            allow_audio=allow_audio,
+        )
+        if payload is not None:
             save_cache(cache_key, payload)
-            return {**payload, 'cached': False}
+            if on_computed is not None:
+                on_computed(payload)
+        return payload
 
-        if not OPENAI_API_KEY:
-            raise HTTPException(
-                status_code=400,
-                detail='OPENAI_API_KEY가 설정되어 있지 않습니다.',
-            )
+    def _fresh_cached_payload() -> Optional[dict[str, Any]]:
+        cached = load_cache(cache_key)
+        if cached and not cached.get('stale'):
+            return cached
+        return None
 
-        audio_path, error = transcript_utils.download_audio(
+    try:
+        return TRANSCRIPT_SINGLE_FLIGHT.run(
+            cache_key,
+            compute=_compute_and_save,
+            poll=_fresh_cached_payload,
+            slot=lambda: _transcript_slot(TRANSCRIPT_QUEUE_TIMEOUT, semaphore),
+        )
+    except SingleFlightPending as exc:
+        raise HTTPException(
+            status_code=503,
+            detail='자막을 생성하고 있습니다. 잠시 후 다시 시도해주세요.',
+            headers={'Retry-After': str(TRANSCRIPT_PENDING_RETRY_SECONDS)},
+        ) from exc
+
+
+def _compute_transcript_payload(
+    video_id: str,
+    *,
+    summarize: bool,
+    max_chars: int,
+    allow_audio: bool = True,
+) -> Optional[dict[str, Any]]:
+    """Run the cold caption/Whisper pipeline for a video.
+
+    Returns None only when captions are unavailable and ``allow_audio`` is
+    False; every other failure raises the endpoint's HTTP error.
+    """
+    caption_text = transcript_utils.fetch_caption_text(video_id)
+    if not caption_text:
+        caption_text = transcript_utils.fetch_caption_text_via_ytdlp(
             video_id,
             cookies_from_browser=YTDLP_COOKIES_FROM_BROWSER,
             cookies_path=YTDLP_COOKIES_PATH,
             player_client_list=YTDLP_PLAYER_CLIENT_LIST,
             socket_timeout_seconds=YTDLP_SOCKET_TIMEOUT_SECONDS,
             youtube_dl_cls=YoutubeDL,
-            download_error_cls=DownloadError,
         )
-        if audio_path is None:
-            raise HTTPException(
-                status_code=500,
-                detail=_resolve_audio_download_detail(error),
-            )
 
-        try:
-            transcript_text = transcript_utils.transcribe_audio(
-                audio_path, api_key=OPENAI_API_KEY,
-            )
-        finally:
-            try:
-                os.remove(audio_path)
-            except OSError:
-                pass
-
-        if not transcript_text:
-            raise HTTPException(status_code=500, detail='음성 인식에 실패했습니다.')
-
-        payload = _build_transcript_payload(
-            transcript_text,
-            source='whisper',
-            summarize=bool(req.summarize),
-            summary_lines=req.summary_lines,
+    if caption_text:
+        return _build_transcript_payload(
+            caption_text,
+            source='captions',
+            summarize=summarize,
             max_chars=max_chars,
         )
-        save_cache(cache_key, payload)
-        return {**payload, 'cached': False}
+
+    if not allow_audio:
+        return None
+
+    if not OPENAI_API_KEY:
+        raise HTTPException(
+            status_code=400,
+            detail='OPENAI_API_KEY가 설정되어 있지 않습니다.',
+        )
+
+    audio_path, error = transcript_utils.download_audio(
+        video_id,
+        cookies_from_browser=YTDLP_COOKIES_FROM_BROWSER,
+        cookies_path=YTDLP_COOKIES_PATH,
+        player_client_list=YTDLP_PLAYER_CLIENT_LIST,
+        socket_timeout_seconds=YTDLP_SOCKET_TIMEOUT_SECONDS,
+        youtube_dl_cls=YoutubeDL,
+        download_error_cls=DownloadError,
+    )
+    if audio_path is None:
+        raise HTTPException(
+            status_code=audio_download_error_status(error),
+            detail=audio_download_error_detail(error),
+        )
+
+    try:
+        transcript_text = transcript_utils.transcribe_audio(
+            audio_path, api_key=OPENAI_API_KEY,
+        )
+    finally:
+        try:
+            os.remove(audio_path)
+        except OSError:
+            pass
+
+    if not transcript_text:
+        raise HTTPException(status_code=500, detail='음성 인식에 실패했습니다.')
+
+    return _build_transcript_payload(
+        transcript_text,
+        source='whisper',
+        summarize=summarize,
+        max_chars=max_chars,
+    )
+
+
+def _warm_transcript(video_id: str, allow_audio: bool) -> Optional[str]:
+    """Pre-compute the default client request shape for a new upload."""
+    if not VIDEO_ID_PATTERN.fullmatch(video_id):
+        return None
+    cache_key = build_transcript_cache_key(
+        video_id=video_id,
+        max_chars=TRANSCRIPT_DEFAULT_MAX_CHARS,
+        summarize=True,
+    )
+    cached = load_cache(cache_key)
+    if cached and not cached.get('stale'):
+        return 'cached'
+    try:
+        payload = _recompute_transcript_cache(
+            cache_key,
+            video_id,
+            summarize=True,
+            max_chars=TRANSCRIPT_DEFAULT_MAX_CHARS,
+            allow_audio=allow_audio,
+            semaphore=PREWARM_SEMAPHORE,
+        )
+    except HTTPException:
+        return None
+    return payload['source'] if payload is not None else None
+
+
+PREWARM_SCHEDULER = PrewarmScheduler(
+    feed_source=YouTubeFeedSource(),
+    warm_video=_warm_transcript,
+)
+TRANSCRIPT_REVALIDATOR = CacheRevalidator()
+CACHE_SWEEPER = CacheSweeper()
+TRANSCRIPT_SINGLE_FLIGHT = AdvisoryLockSingleFlight()
 
 
 @app.get('/archives')
-def list_archives(
+async def list_archives(
     user_id: str,
+    *,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    from_ms: Optional[int] = Query(default=None, alias='from'),
+    to_ms: Optional[int] = Query(default=None, alias='to'),
     authorization: Optional[str] = Header(default=None),
+    conditional: ConditionalGet = Depends(),
 ):
-    """List archived videos for a user."""
-    user_id = _authorize_user(user_id, authorization)
+    """List one page of archived videos for a user, newest first.
+
+    ``from`` and ``to`` (epoch milliseconds, end exclusive) limit the page
+    to archives made in that window. Without ``limit`` or ``cursor`` the
+    whole list is returned, as before paging existed.
+    """
+    user_id = await run_in_threadpool(_authorize_user, user_id, authorization)
+    page_size = sanitize_archive_page_limit(limit, cursor)
+    window = sanitize_archive_range(from_ms, to_ms)
+    if not is_async_db_enabled():
+        return await run_in_threadpool(
+            _list_archives_sync, user_id, conditional,
+            limit=page_size, cursor=cursor, window=window,
+        )
+    after = decode_archive_cursor(cursor)
+    try:
+        async with get_async_session() as session:
+            return conditional.not_modified(
+                await fetch_data_version(session, user_id)
+            ) or await fetch_archive_page(
+                session, user_id, limit=page_size, after=after, window=window,
+            )
+    except SQLAlchemyError as exc:
+        return _degraded_read(
+            exc, conditional, {'items': [], 'next_cursor': None},
+        )
+
+
+def _list_archives_sync(
+    user_id: str,
+    conditional: ConditionalGet,
+    *,
+    limit: Optional[int],
+    cursor: Optional[str],
+    window: tuple[Any, Any],
+) -> Any:
     if FAIL_CLOSED_WITHOUT_DB and not is_db_enabled():
         raise HTTPException(status_code=503, detail='database required')
     if is_db_enabled():
+        after = decode_archive_cursor(cursor)
         try:
             with get_session() as session:
                 if session is None:
                     _raise_db_unavailable()
-                archives = (
-                    session.query(Archive)
-                    .filter(Archive.user_id == user_id)
-                    .order_by(Archive.archived_at.desc())
-                    .all()
+                return conditional.not_modified(
+                    load_data_version(session, user_id)
+                ) or load_archive_page(
+                    session, user_id, limit=limit, after=after, window=window,
                 )
-                return {'items': serialize_archive_items(session, archives)}
         except SQLAlchemyError as exc:
-            if FAIL_CLOSED_WITHOUT_DB:
-                raise HTTPException(
-                    status_code=503,
-                    detail='database required',
-                ) from exc
-            return {'items': []}
+            return _degraded_read(
+                exc, conditional, {'items': [], 'next_cursor': None},
+            )
     if not _allow_file_fallback():
         raise HTTPException(status_code=503, detail='database required')
-    return {'items': load_archives_file(user_id)}
+    return paginate_archive_file_items(
+        load_archives_file(user_id),
+        limit=limit,
+        raw_cursor=cursor,
+        window=window,
+    )
 
 
-def _build_db_archive_response(
-    session: Any,
-    video_id: str,
-    archive: Archive,
-    metadata: dict[str, Optional[str]],
-) -> dict[str, Any]:
-    """Build an archive response dict from DB records."""
-    video = session.query(Video).filter(Video.id == video_id).first()
-    channel = (
-        session.query(Channel).filter(Channel.id == video.channel_id).first()
-        if video is not None
-        else None
-    )
-    return {
-        'archived': True,
-        'video_id': video_id,
-        'archived_at': int(archive.archived_at.timestamp() * 1000),
-        'title': (
-            video.title if video is not None
-            else (metadata.get('title') or ARCHIVE_PLACEHOLDER_VIDEO_TITLE)
-        ),
-        'thumbnail_url': (
-            video.thumbnail_url if video is not None
-            else metadata.get('thumbnail_url')
-        ),
-        'channel_id': (
-            video.channel_id if video is not None
-            else (metadata.get('channel_id') or ARCHIVE_PLACEHOLDER_CHANNEL_ID)
-        ),
-        'channel_title': (
-            channel.title if channel is not None
-            else (
-                metadata.get('channel_title')
-                or ARCHIVE_PLACEHOLDER_CHANNEL_TITLE
+@app.get('/archives/calendar')
+async def archive_calendar(
+    user_id: str,
+    *,
+    from_ms: int = Query(alias='from'),
+    to_ms: int = Query(alias='to'),
+    utc_offset_minutes: int = 0,
+    authorization: Optional[str] = Header(default=None),
+    conditional: ConditionalGet = Depends(),
+):
+    """Count a user's archives per local day between ``from`` and ``to``."""
+    user_id = await run_in_threadpool(_authorize_user, user_id, authorization)
+    window = sanitize_calendar_range(from_ms, to_ms)
+    offset = sanitize_utc_offset_minutes(utc_offset_minutes)
+    if not is_async_db_enabled():
+        return await run_in_threadpool(
+            _archive_calendar_sync, user_id, window, offset, conditional,
+        )
+    try:
+        async with get_async_session() as session:
+            return conditional.not_modified(
+                await fetch_data_version(session, user_id)
+            ) or await fetch_archive_calendar(
+                session, user_id, window=window, offset_minutes=offset,
             )
-        ),
-        'channel_thumbnail_url': (
-            channel.thumbnail_url if channel is not None
-            else metadata.get('channel_thumbnail_url')
-        ),
-    }
+    except SQLAlchemyError as exc:
+        return _degraded_read(exc, conditional, {'days': []})
+
+
+def _archive_calendar_sync(
+    user_id: str,
+    window: tuple[Any, Any],
+    offset: int,
+    conditional: ConditionalGet,
+) -> Any:
+    if not is_db_enabled():
+        if not _allow_file_fallback():
+            raise HTTPException(status_code=503, detail='database required')
+        return count_archive_file_days(
+            load_archives_file(user_id), window=window, offset_minutes=offset,
+        )
+    try:
+        with get_session() as session:
+            session = _require_session(session)
+            return conditional.not_modified(
+                load_data_version(session, user_id)
+            ) or load_archive_calendar(
+                session, user_id, window=window, offset_minutes=offset,
+            )
+    except SQLAlchemyError as exc:
+        return _degraded_read(exc, conditional, {'days': []})
 
 
 @app.post('/archives/toggle')
@@ -968,8 +1118,8 @@ def toggle_archive(
     """Set or toggle archive status for a video."""
     user_id = _authorize_user(req.user_id, authorization)
     _enforce_write_rate_limit(request, user_id)
-    video_id = _sanitize_archive_video_id(req.video_id)
-    metadata = _build_archive_metadata(req)
+    video_id = sanitize_archive_video_id(req.video_id)
+    metadata = sanitize_archive_metadata(req)
     _require_database_for_write()
 
     if is_db_enabled():
@@ -977,33 +1127,8 @@ def toggle_archive(
             with get_session() as session:
                 if session is None:
                     _raise_db_unavailable()
-                ensure_user_exists(session, user_id)
-                existing = (
-                    session.query(Archive)
-                    .filter(
-                        Archive.user_id == user_id,
-                        Archive.video_id == video_id,
-                    )
-                    .first()
-                )
-                should_archive = (
-                    req.archived
-                    if req.archived is not None
-                    else existing is None
-                )
-                if not should_archive:
-                    if existing:
-                        session.delete(existing)
-                    session.commit()
-                    return {'archived': False, 'video_id': video_id}
-
-                upsert_archive_video(session, video_id, metadata)
-                if existing is None:
-                    existing = Archive(user_id=user_id, video_id=video_id)
-                    session.add(existing)
-                session.flush()
-                result = _build_db_archive_response(
-                    session, video_id, existing, metadata,
+                result = toggle_archive_row(
+                    session, user_id, video_id, metadata, req.archived,
                 )
                 session.commit()
                 return result
@@ -1021,7 +1146,7 @@ def toggle_archive(
                             .first()
                         )
                         if existing is not None:
-                            return _build_db_archive_response(
+                            return build_db_archive_response(
                                 session, video_id, existing, metadata,
                             )
                 except SQLAlchemyError:
@@ -1030,20 +1155,59 @@ def toggle_archive(
                 status_code=409, detail='archive conflict'
             ) from exc
         except SQLAlchemyError as exc:
-            if FAIL_CLOSED_WITHOUT_DB:
-                raise HTTPException(
-                    status_code=503,
-                    detail='database required',
-                ) from exc
-            raise HTTPException(
-                status_code=500, detail='archive update failed'
-            ) from exc
+            _raise_write_failed(exc, 'archive update failed')
 
     if not _allow_file_fallback():
         raise HTTPException(status_code=503, detail='database required')
     return toggle_archive_file(user_id, video_id, metadata, req.archived)
 
 
+@app.post('/archives/batch')
+def batch_archives(
+    req: ArchiveBatchRequest,
+    request: Request,
+    authorization: Optional[str] = Header(default=None),
+):
+    """Archive and unarchive several videos in one transaction.
+
+    The batch is charged against the write limit as one request weighing
+    one write per ``ARCHIVE_BATCH_ITEMS_PER_WRITE`` items.
+    """
+    user_id = _authorize_user(req.user_id, authorization)
+    changes = normalize_archive_batch(req.items)
+    _enforce_write_rate_limit(
+        request,
+        user_id,
+        cost=math.ceil(len(changes) / ARCHIVE_BATCH_ITEMS_PER_WRITE),
+    )
+    _require_database_for_write()
+    if is_db_enabled():
+        try:
+            with get_session() as session:
+                session = _require_session(session)
+                results = apply_archive_batch(session, user_id, changes)
+                session.commit()
+        except IntegrityError as exc:
+            raise HTTPException(
+                status_code=409, detail='archive conflict'
+            ) from exc
+        except SQLAlchemyError as exc:
+            _raise_write_failed(exc, 'archive batch failed')
+    elif _allow_file_fallback():
+        results = [
+            toggle_archive_file(user_id, video_id, metadata, archived)
+            for video_id, archived, metadata in changes
+        ]
+    else:
+        raise HTTPException(status_code=503, detail='database required')
+    archived_count = sum(1 for result in results if result['archived'])
+    return {
+        'results': results,
+        'archived': archived_count,
+        'unarchived': len(results) - archived_count,
+    }
+
+
 @app.post('/archives/clear')
 def clear_archives(
     req: ArchiveClearRequest,
@@ -1063,17 +1227,11 @@ def clear_archives(
                 session.query(Archive).filter(
                     Archive.user_id == user_id
                 ).delete()
+                bump_data_version(session, user_id)
                 session.commit()
                 return {'cleared': True}
         except SQLAlchemyError as exc:
-            if FAIL_CLOSED_WITHOUT_DB:
-                raise HTTPException(
-                    status_code=503,
-                    detail='database required',
-                ) from exc
-            raise HTTPException(
-                status_code=500, detail='archive clear failed'
-            ) from exc
+            _raise_write_failed(exc, 'archive clear failed')
 
     if not _allow_file_fallback():
         raise HTTPException(status_code=503, detail='database required')
@@ -1090,7 +1248,7 @@ def upsert_user(
     """Create or update a user profile."""
     user_id = _authorize_user(req.user_id, authorization)
     _enforce_write_rate_limit(request, user_id)
-    email = _sanitize_email(req.email)
+    email = sanitize_email(req.email)
     _require_database_for_write()
     if not is_db_enabled():
         return {
@@ -1114,40 +1272,41 @@ def upsert_user(
                 'plan_tier': user.plan_tier,
             }
     except SQLAlchemyError as exc:
-        if FAIL_CLOSED_WITHOUT_DB:
-            raise HTTPException(
-                status_code=503,
-                detail='database required',
-            ) from exc
-        raise HTTPException(
-            status_code=500, detail='user upsert failed'
-        ) from exc
+        _raise_write_failed(exc, 'user upsert failed')
 
 
 @app.get('/user')
-def get_user(
+async def get_user(
     user_id: str,
     authorization: Optional[str] = Header(default=None),
+    conditional: ConditionalGet = Depends(),
 ):
     """Fetch a user profile."""
-    user_id = _authorize_user(user_id, authorization)
+    user_id = await run_in_threadpool(_authorize_user, user_id, authorization)
+    if not is_async_db_enabled():
+        return await run_in_threadpool(_get_user_sync, user_id, conditional)
+    try:
+        async with get_async_session() as session:
+            return conditional.not_modified(
+                await fetch_data_version(session, user_id)
+            ) or user_response(await fetch_user(session, user_id))
+    except SQLAlchemyError as exc:
+        raise HTTPException(
+            status_code=500, detail='user fetch failed'
+        ) from exc
+
+
+def _get_user_sync(user_id: str, conditional: ConditionalGet) -> Any:
     if not is_db_enabled():
         return {'user_id': user_id, 'plan_tier': 'free'}
     try:
         with get_session() as session:
-            if session is None:
-                raise HTTPException(
-                    status_code=500,
-                    detail='database not available',
-                )
-            user = session.query(User).filter(User.id == user_id).first()
-            if user is None:
-                raise HTTPException(status_code=404, detail='user not found')
-            return {
-                'user_id': user.id,
-                'email': user.email,
-                'plan_tier': user.plan_tier,
-            }
+            session = _require_session(session)
+            return conditional.not_modified(
+                load_data_version(session, user_id)
+            ) or user_response(
+                session.query(User).filter(User.id == user_id).first()
+            )
     except SQLAlchemyError as exc:
         raise HTTPException(
             status_code=500, detail='user fetch failed'
@@ -1168,7 +1327,7 @@ def update_user_plan(
             detail='plan updates require trusted server credentials',
         )
     _enforce_write_rate_limit(request, user_id)
-    plan_tier = _sanitize_plan_tier(req.plan_tier)
+    plan_tier = sanitize_plan_tier(req.plan_tier)
     _require_database_for_write()
     if not is_db_enabled():
         return {'updated': True, 'plan_tier': plan_tier}
@@ -1178,71 +1337,51 @@ def update_user_plan(
                 _raise_db_unavailable()
             user = session.query(User).filter(User.id == user_id).first()
             if user is None:
-                user = User(id=user_id, plan_tier=plan_tier)
+                user = User(id=user_id, plan_tier=plan_tier, data_version=1)
                 session.add(user)
             else:
                 user.plan_tier = plan_tier
+                user.data_version += 1
             session.commit()
             return {'updated': True, 'plan_tier': user.plan_tier}
     except SQLAlchemyError as exc:
-        if FAIL_CLOSED_WITHOUT_DB:
-            raise HTTPException(
-                status_code=503,
-                detail='database required',
-            ) from exc
-        raise HTTPException(
-            status_code=500, detail='plan update failed'
-        ) from exc
+        _raise_write_failed(exc, 'plan update failed')
 
 
 @app.get('/user/state')
-def get_user_state(
+async def get_user_state(
     user_id: str,
     authorization: Optional[str] = Header(default=None),
+    conditional: ConditionalGet = Depends(),
 ):
     """Fetch per-user app state for cross-device sync."""
-    user_id = _authorize_user(user_id, authorization)
-    default_payload = {
-        'selection_change_day': 0,
-        'selection_changes_today': 0,
-        'opened_video_ids': [],
-    }
+    user_id = await run_in_threadpool(_authorize_user, user_id, authorization)
+    if not is_async_db_enabled():
+        return await run_in_threadpool(
+            _get_user_state_sync, user_id, conditional,
+        )
+    try:
+        async with get_async_session() as session:
+            return conditional.not_modified(
+                await fetch_data_version(session, user_id)
+            ) or user_state_response(await fetch_user_state(session, user_id))
+    except SQLAlchemyError:
+        conditional.discard()
+        return user_state_response(None)
+
+
+def _get_user_state_sync(user_id: str, conditional: ConditionalGet) -> Any:
     if not is_db_enabled():
-        return default_payload
+        return user_state_response(None)
     try:
         with get_session() as session:
-            if session is None:
-                raise HTTPException(
-                    status_code=500,
-                    detail='database not available',
-                )
-            state = (
-                session.query(UserState)
-                .filter(UserState.user_id == user_id)
-                .first()
-            )
-            if state is None:
-                return default_payload
-            try:
-                raw_ids = json.loads(state.opened_video_ids or '[]')
-                if not isinstance(raw_ids, list):
-                    raw_ids = []
-            except ValueError:
-                raw_ids = []
-            opened_video_ids = _normalize_opened_video_ids(
-                [str(item) for item in raw_ids]
-            )
-            return {
-                'selection_change_day': _sanitize_selection_change_day(
-                    state.selection_change_day
-                ),
-                'selection_changes_today': _sanitize_selection_changes_today(
-                    state.selection_changes_today
-                ),
-                'opened_video_ids': opened_video_ids,
-            }
+            session = _require_session(session)
+            return conditional.not_modified(
+                load_data_version(session, user_id)
+            ) or user_state_response(load_user_state(session, user_id))
     except SQLAlchemyError:
-        return default_payload
+        conditional.discard()
+        return user_state_response(None)
 
 
 @app.post('/user/state')
@@ -1254,13 +1393,13 @@ def upsert_user_state(
     """Upsert per-user app state for cross-device sync."""
     user_id = _authorize_user(req.user_id, authorization)
     _enforce_write_rate_limit(request, user_id)
-    selection_change_day = _sanitize_selection_change_day(
+    selection_change_day = sanitize_selection_change_day(
         req.selection_change_day
     )
-    selection_changes_today = _sanitize_selection_changes_today(
+    selection_changes_today = sanitize_selection_changes_today(
         req.selection_changes_today
     )
-    opened_video_ids = _normalize_opened_video_ids(req.opened_video_ids)
+    opened_video_ids = normalize_opened_video_ids(req.opened_video_ids)
     payload = {
         'selection_change_day': selection_change_day,
         'selection_changes_today': selection_changes_today,
@@ -1273,7 +1412,7 @@ def upsert_user_state(
         with get_session() as session:
             if session is None:
                 _raise_db_unavailable()
-            ensure_user_exists(session, user_id)
+            touch_user(session, user_id)
             upsert_user_state_row(
                 session,
                 user_id,
@@ -1284,45 +1423,41 @@ def upsert_user_state(
             session.commit()
             return payload
     except SQLAlchemyError as exc:
-        if FAIL_CLOSED_WITHOUT_DB:
-            raise HTTPException(
-                status_code=503,
-                detail='database required',
-            ) from exc
-        raise HTTPException(
-            status_code=500, detail='user state upsert failed'
-        ) from exc
+        _raise_write_failed(exc, 'user state upsert failed')
 
 
 @app.get('/selection')
-def get_selection(
+async def get_selection(
     user_id: str,
     authorization: Optional[str] = Header(default=None),
+    conditional: ConditionalGet = Depends(),
 ):
     """Return selected channel IDs for a user."""
-    user_id = _authorize_user(user_id, authorization)
+    user_id = await run_in_threadpool(_authorize_user, user_id, authorization)
+    if not is_async_db_enabled():
+        return await run_in_threadpool(
+            _get_selection_sync, user_id, conditional,
+        )
+    try:
+        async with get_async_session() as session:
+            return conditional.not_modified(
+                await fetch_data_version(session, user_id)
+            ) or selection_response(*await fetch_selection(session, user_id))
+    except SQLAlchemyError as exc:
+        raise HTTPException(
+            status_code=500, detail='selection fetch failed'
+        ) from exc
+
+
+def _get_selection_sync(user_id: str, conditional: ConditionalGet) -> Any:
     if not is_db_enabled():
         return {'selected_ids': []}
     try:
         with get_session() as session:
             session = _require_session(session)
-            user = session.query(User).filter(User.id == user_id).first()
-            rows = (
-                session.query(UserChannel)
-                .filter(
-                    UserChannel.user_id == user_id,
-                    UserChannel.is_selected.is_(True),
-                )
-                .order_by(UserChannel.channel_id.asc())
-                .all()
-            )
-            selected_ids = [row.channel_id for row in rows]
-            limit = _channel_limit_for_plan_tier(
-                user.plan_tier if user is not None else 'free'
-            )
-            if limit is not None and len(selected_ids) > limit:
-                selected_ids = selected_ids[:limit]
-            return {'selected_ids': selected_ids}
+            return conditional.not_modified(
+                load_data_version(session, user_id)
+            ) or selection_response(*load_selection(session, user_id))
     except SQLAlchemyError as exc:
         raise HTTPException(
             status_code=500, detail='selection fetch failed'
@@ -1341,18 +1476,16 @@ def save_selection(
     normalized_channels, selected_ids_sorted = normalize_selection_request(req)
     _require_database_for_write()
     if not is_db_enabled():
-        _enforce_selection_plan_limit('free', selected_ids_sorted)
+        enforce_selection_plan_limit('free', selected_ids_sorted)
         return {'selected_ids': selected_ids_sorted}
     try:
         with get_session() as session:
             session = _require_session(session)
-            ensure_user_exists(session, user_id)
-            user = session.query(User).filter(User.id == user_id).first()
-            _enforce_selection_plan_limit(
-                user.plan_tier if user is not None else 'free',
+            enforce_selection_plan_limit(
+                ensure_user_plan_tier(session, user_id),
                 selected_ids_sorted,
             )
-            upsert_channels(session, normalized_channels)
+            upsert_channels(session, normalized_channels, user_id=user_id)
             sync_user_channel_links(session, user_id, selected_ids_sorted)
 
             session.commit()
@@ -1362,11 +1495,4 @@ def save_selection(
             status_code=409, detail='selection conflict'
         ) from exc
     except SQLAlchemyError as exc:
-        if FAIL_CLOSED_WITHOUT_DB:
-            raise HTTPException(
-                status_code=503,
-                detail='database required',
-            ) from exc
-        raise HTTPException(
-            status_code=500, detail='selection save failed'
-        ) from exc
+        _raise_write_failed(exc, 'selection save failed')
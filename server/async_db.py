@@ -0,0 +1,140 @@
+"""Async SQLAlchemy engine and sessions for the read endpoints.
+
+Blocking sessions from ``db.get_session`` hold a threadpool thread for every
+DB round trip. With ``DB_ASYNC_ENABLED=true`` the read endpoints await an
+async session instead, so read concurrency is bounded by the pool rather
+than by worker threads. Writes stay on the sync path.
+
+The async drivers are optional: ``asyncpg`` for Postgres, ``aiosqlite``
+for SQLite, and ``greenlet`` for SQLAlchemy's asyncio bridge. When any is
+missing the app logs a warning and keeps serving reads synchronously.
+"""
+
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+import importlib.util
+import logging
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from .config import ASYNC_DATABASE_URL, DB_ASYNC_ENABLED
+from .db import DATABASE_URL
+from .db_pool import PoolMetrics, engine_options, pre_ping_strategy
+
+_ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+
+def async_database_url(database_url: str) -> Optional[str]:
+    """Return ``database_url`` with its async driver, or None if unknown."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        return None
+    return url.set(drivername=f'{backend}+{driver}').render_as_string(
+        hide_password=False,
+    )
+
+
+def missing_async_modules(async_url: str) -> list[str]:
+    """Return the modules ``async_url`` needs that are not installed."""
+    driver = make_url(async_url).get_driver_name()
+    return [
+        name
+        for name in ('greenlet', driver)
+        if importlib.util.find_spec(name) is None
+    ]
+
+
+class AsyncDatabase:
+    """An async engine, its session factory and its pool counters."""
+
+    def __init__(self, async_url: str, *, strategy: str = 'always') -> None:
+        self.engine = create_async_engine(
+            async_url,
+            **engine_options(async_url, strategy, asynchronous=True),
+        )
+        self.sessionmaker = async_sessionmaker(
+            self.engine, autoflush=False, expire_on_commit=False,
+        )
+        self.metrics = PoolMetrics()
+        self.metrics.attach(self.engine.sync_engine, strategy=strategy)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """Yield a session, rolling back if the body raises."""
+        session = self.sessionmaker()
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def dispose(self) -> None:
+        """Close every pooled connection."""
+        await self.engine.dispose()
+
+
+def build_async_database(
+    *,
+    enabled: bool = DB_ASYNC_ENABLED,
+    database_url: Optional[str] = DATABASE_URL,
+    async_url: str = ASYNC_DATABASE_URL,
+) -> Optional[AsyncDatabase]:
+    """Return the configured async database, or None to stay synchronous."""
+    if not enabled or not database_url:
+        return None
+    url = async_url or async_database_url(database_url)
+    if url is None:
+        logging.warning(
+            'DB_ASYNC_ENABLED has no async driver for this DATABASE_URL; '
+            'serving reads synchronously.'
+        )
+        return None
+    missing = missing_async_modules(url)
+    if missing:
+        logging.warning(
+            'DB_ASYNC_ENABLED needs %s; serving reads synchronously.',
+            ', '.join(missing),
+        )
+        return None
+    return AsyncDatabase(url, strategy=pre_ping_strategy())
+
+
+ASYNC_DB = build_async_database()
+
+
+def is_async_db_enabled() -> bool:
+    """Return True when reads should use the async engine."""
+    return ASYNC_DB is not None
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Yield an async session; callers check ``is_async_db_enabled`` first."""
+    if ASYNC_DB is None:
+        raise RuntimeError('async database is not enabled')
+    async with ASYNC_DB.session() as session:
+        yield session
+
+
+def async_pool_stats() -> dict[str, Any]:
+    """Return live async pool counters for the metrics endpoint."""
+    if ASYNC_DB is None:
+        return {'enabled': False}
+    return ASYNC_DB.metrics.stats()
+
+
+async def dispose_async_db() -> None:
+    """Close pooled async connections at shutdown."""
+    if ASYNC_DB is not None:
+        await ASYNC_DB.dispose()
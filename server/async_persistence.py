@@ -0,0 +1,126 @@
+"""Async read helpers mirroring the read paths in ``persistence``.
+
+Each helper issues the same queries as its sync counterpart through an
+``AsyncSession`` and reuses the sync module's response builders, so both
+paths return identical payloads.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Archive, Channel, User, Video
+from .persistence import (
+    ArchiveWindow,
+    archive_calendar_query,
+    archive_calendar_response,
+    archive_page_query,
+    build_archive_items,
+    data_version_query,
+    selection_from_rows,
+    selection_query,
+    split_archive_page,
+    user_state_query,
+)
+
+
+async def fetch_archive_page(
+    session: AsyncSession,
+    user_id: str,
+    *,
+    limit: Optional[int],
+    after: Optional[tuple[datetime, int]] = None,
+    window: ArchiveWindow = (None, None),
+) -> dict[str, Any]:
+    """Return one page of archive items and the cursor for the next."""
+    archives = list(
+        await session.scalars(
+            archive_page_query(
+                user_id, limit=limit, after=after, window=window,
+            )
+        )
+    )
+    page, next_cursor = split_archive_page(archives, limit)
+    return {
+        'items': await serialize_archive_items(session, page),
+        'next_cursor': next_cursor,
+    }
+
+
+async def fetch_archive_calendar(
+    session: AsyncSession,
+    user_id: str,
+    *,
+    window: ArchiveWindow,
+    offset_minutes: int,
+) -> dict[str, Any]:
+    """Return a user's per-day archive counts within ``window``."""
+    return archive_calendar_response(
+        await session.execute(
+            archive_calendar_query(
+                user_id,
+                window=window,
+                offset_minutes=offset_minutes,
+                dialect=session.bind.dialect.name,
+            )
+        )
+    )
+
+
+async def serialize_archive_items(
+    session: AsyncSession,
+    archives: list[Archive],
+) -> list[dict[str, Any]]:
+    """Load related video/channel metadata for archive responses."""
+    if not archives:
+        return []
+
+    video_ids = [item.video_id for item in archives]
+    videos = (
+        await session.scalars(select(Video).where(Video.id.in_(video_ids)))
+    ).all()
+    videos_by_id = {video.id: video for video in videos}
+    channel_ids = {video.channel_id for video in videos if video.channel_id}
+    channels = (
+        (
+            await session.scalars(
+                select(Channel).where(Channel.id.in_(list(channel_ids)))
+            )
+        ).all()
+        if channel_ids
+        else []
+    )
+    channels_by_id = {channel.id: channel for channel in channels}
+    return build_archive_items(archives, videos_by_id, channels_by_id)
+
+
+async def fetch_user(session: AsyncSession, user_id: str) -> Optional[User]:
+    """Return the user row, or None."""
+    return await session.get(User, user_id)
+
+
+async def fetch_user_state(
+    session: AsyncSession,
+    user_id: str,
+) -> Optional[Row]:
+    """Return the user's synced app state columns, or None."""
+    return (await session.execute(user_state_query(user_id))).first()
+
+
+async def fetch_selection(
+    session: AsyncSession,
+    user_id: str,
+) -> tuple[Optional[str], list[str]]:
+    """Return the user's plan tier and selected channel IDs."""
+    return selection_from_rows(
+        await session.execute(selection_query(user_id))
+    )
+
+
+async def fetch_data_version(session: AsyncSession, user_id: str) -> int:
+    """Return the user's data version, or 0 when the user does not exist."""
+    return (await session.execute(data_version_query(user_id))).scalar() or 0
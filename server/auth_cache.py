@@ -0,0 +1,135 @@
+"""Caches of token verification results, keyed by a short token digest.
+
+Raw Google ID tokens are about a kilobyte each, so entries are keyed by a
+16-byte SHA-256 prefix instead. Keys hash to one of several shards, each
+with its own lock, so cached verification on different tokens does not
+queue behind one global lock. Within a shard an ``OrderedDict`` keeps LRU
+order for capacity eviction in O(1), and a min-heap of expiry times lets
+expired entries be dropped in O(log n) without scanning.
+
+The app keeps one cache of verified subjects, valid until token expiry,
+and one of recent failure details with a short TTL.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import heapq
+import threading
+import time
+from typing import Optional
+
+from .config import AUTH_CACHE_MAX_ITEMS, AUTH_CACHE_SHARDS
+
+_DIGEST_BYTES = 16
+# Rebuild a shard's heap once stale entries outnumber live ones this much.
+_HEAP_SLACK_FACTOR = 2
+
+
+def token_digest(token: str) -> bytes:
+    """Return the cache key for ``token``."""
+    return hashlib.sha256(token.encode('utf-8')).digest()[:_DIGEST_BYTES]
+
+
+class _AuthShard:
+    __slots__ = ('lock', 'entries', 'expiry')
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+        self.expiry: list[tuple[float, bytes]] = []
+
+    def expire(self, now: float) -> int:
+        """Drop entries that expired by ``now``; return how many."""
+        removed = 0
+        while self.expiry and self.expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self.expiry)
+            entry = self.entries.get(key)
+            # Entries replaced or evicted since this heap push are skipped.
+            if entry is not None and entry[0] == expires_at:
+                del self.entries[key]
+                removed += 1
+        return removed
+
+    def compact(self) -> None:
+        """Rebuild the heap from live entries to shed stale heap items."""
+        self.expiry = [
+            (expires_at, key)
+            for key, (expires_at, _) in self.entries.items()
+        ]
+        heapq.heapify(self.expiry)
+
+
+class AuthCache:
+    """Sharded map of token digest to a cached value until its expiry."""
+
+    def __init__(
+        self,
+        *,
+        max_items: int = AUTH_CACHE_MAX_ITEMS,
+        shards: int = AUTH_CACHE_SHARDS,
+    ) -> None:
+        self._shards = tuple(_AuthShard() for _ in range(max(1, shards)))
+        self._max_per_shard = max(1, max_items // len(self._shards))
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[str]:
+        """Return the value cached for ``token`` if it has not expired."""
+        key = token_digest(token)
+        now = time.time() if now is None else now
+        shard = self._shard_for(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None and entry[0] > now:
+                shard.entries.move_to_end(key)
+                value = entry[1]
+            else:
+                value = None
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def put(self, token: str, value: str, expires_at: float) -> None:
+        """Cache ``value`` for ``token`` until ``expires_at``."""
+        key = token_digest(token)
+        shard = self._shard_for(key)
+        evicted = 0
+        with shard.lock:
+            expired = shard.expire(time.time())
+            shard.entries[key] = (expires_at, value)
+            shard.entries.move_to_end(key)
+            heapq.heappush(shard.expiry, (expires_at, key))
+            while len(shard.entries) > self._max_per_shard:
+                shard.entries.popitem(last=False)
+                evicted += 1
+            if len(shard.expiry) > _HEAP_SLACK_FACTOR * max(
+                self._max_per_shard, len(shard.entries),
+            ):
+                shard.compact()
+        if expired or evicted:
+            with self._stats_lock:
+                self._stats['expired'] += expired
+                self._stats['evicted'] += evicted
+
+    def clear(self) -> None:
+        """Drop every cached token."""
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.expiry.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return a snapshot of the cache counters."""
+        with self._stats_lock:
+            return {**self._stats, 'size': len(self)}
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def _shard_for(self, key: bytes) -> _AuthShard:
+        return self._shards[key[0] % len(self._shards)]
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
@@ -0,0 +1,197 @@
+"""Transparent compression for cached transcript text and summaries.
+
+Encoded values are plain strings so they fit the existing ``Text`` columns
+and JSON cache files. A leading format marker tells the decoder how a value
+was stored; values without a marker are legacy plain text and are returned
+unchanged, so rows written before compression keep reading.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from functools import lru_cache
+import hashlib
+from pathlib import Path
+from typing import Optional
+import zlib
+
+from .config import (
+    TRANSCRIPT_CACHE_COMPRESSION,
+    TRANSCRIPT_CACHE_COMPRESSION_LEVEL,
+    TRANSCRIPT_CACHE_COMPRESS_MIN_BYTES,
+    TRANSCRIPT_CACHE_ZDICT_PATH,
+)
+
+# U+001F never appears in caption text, so it cannot collide with legacy
+# plain-text values.
+_MARKER = '\x1f'
+ZLIB_PREFIX = f'{_MARKER}z1:'
+ZLIB_DICT_PREFIX = f'{_MARKER}z2:'
+_DICT_ID_LENGTH = 8
+
+CODEC_PLAIN = 0
+CODEC_ZLIB = 1
+CODEC_ZLIB_DICT = 2
+
+
+@lru_cache(maxsize=4)
+def _load_dictionary(path: Optional[str]) -> Optional[bytes]:
+    if not path:
+        return None
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None
+    return data or None
+
+
+def dictionary_id(zdict: bytes) -> str:
+    """Return the short identifier stored alongside dictionary payloads."""
+    return hashlib.sha256(zdict).hexdigest()[:_DICT_ID_LENGTH]
+
+
+def _compress(
+    raw: bytes,
+    *,
+    enabled: bool,
+    level: int,
+    min_bytes: int,
+    zdict: Optional[bytes],
+) -> tuple[int, str, bytes]:
+    """Return ``(codec, dictionary id, body)`` for ``raw``.
+
+    Falls back to ``CODEC_PLAIN`` when compression is disabled, the value is
+    too small, or compressing would not make it smaller.
+    """
+    if not enabled or len(raw) < min_bytes:
+        return CODEC_PLAIN, '', raw
+    if zdict is None:
+        zdict = _load_dictionary(TRANSCRIPT_CACHE_ZDICT_PATH)
+    if zdict:
+        compressor = zlib.compressobj(level, zdict=zdict)
+        codec, dict_id = CODEC_ZLIB_DICT, dictionary_id(zdict)
+    else:
+        compressor = zlib.compressobj(level)
+        codec, dict_id = CODEC_ZLIB, ''
+    compressed = compressor.compress(raw) + compressor.flush()
+    if len(compressed) >= len(raw):
+        return CODEC_PLAIN, '', raw
+    return codec, dict_id, compressed
+
+
+def _decompress(
+    codec: int,
+    dict_id: str,
+    body: bytes,
+    zdict: Optional[bytes],
+) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(body)
+    if zdict is None:
+        zdict = _load_dictionary(TRANSCRIPT_CACHE_ZDICT_PATH)
+    if not zdict or dictionary_id(zdict) != dict_id:
+        raise zlib.error('preset dictionary is unavailable')
+    decompressor = zlib.decompressobj(zdict=zdict)
+    return decompressor.decompress(body) + decompressor.flush()
+
+
+def encode_cached_text(
+    value: Optional[str],
+    *,
+    enabled: bool = TRANSCRIPT_CACHE_COMPRESSION,
+    level: int = TRANSCRIPT_CACHE_COMPRESSION_LEVEL,
+    min_bytes: int = TRANSCRIPT_CACHE_COMPRESS_MIN_BYTES,
+    zdict: Optional[bytes] = None,
+) -> Optional[str]:
+    """Compress a cached text value when it is large enough to benefit."""
+    if value is None:
+        return None
+    raw = value.encode('utf-8')
+    codec, dict_id, body = _compress(
+        raw,
+        enabled=enabled,
+        level=level,
+        min_bytes=min_bytes,
+        zdict=zdict,
+    )
+    if codec == CODEC_PLAIN:
+        return value
+    prefix = (
+        f'{ZLIB_DICT_PREFIX}{dict_id}:'
+        if codec == CODEC_ZLIB_DICT
+        else ZLIB_PREFIX
+    )
+    encoded = prefix + base64.b64encode(body).decode('ascii')
+    if len(encoded) >= len(raw):
+        return value
+    return encoded
+
+
+def decode_cached_text(
+    value: Optional[str],
+    *,
+    zdict: Optional[bytes] = None,
+) -> Optional[str]:
+    """Decode a value written by ``encode_cached_text`` or legacy plain text."""
+    if value is None or not value.startswith(_MARKER):
+        return value
+    try:
+        if value.startswith(ZLIB_PREFIX):
+            body = base64.b64decode(value[len(ZLIB_PREFIX):])
+            return _decompress(CODEC_ZLIB, '', body, zdict).decode('utf-8')
+        if value.startswith(ZLIB_DICT_PREFIX):
+            dict_id, _, payload = value[len(ZLIB_DICT_PREFIX):].partition(':')
+            body = base64.b64decode(payload)
+            return _decompress(
+                CODEC_ZLIB_DICT, dict_id, body, zdict,
+            ).decode('utf-8')
+    except (binascii.Error, zlib.error, UnicodeDecodeError):
+        return None
+    return value
+
+
+def encode_cached_bytes(
+    value: str,
+    *,
+    enabled: bool = TRANSCRIPT_CACHE_COMPRESSION,
+    level: int = TRANSCRIPT_CACHE_COMPRESSION_LEVEL,
+    min_bytes: int = TRANSCRIPT_CACHE_COMPRESS_MIN_BYTES,
+    zdict: Optional[bytes] = None,
+) -> bytes:
+    """Encode text for binary stores: a codec byte, dict id, then the body.
+
+    Unlike ``encode_cached_text`` the compressed body is stored raw rather
+    than base64 encoded.
+    """
+    codec, dict_id, body = _compress(
+        value.encode('utf-8'),
+        enabled=enabled,
+        level=level,
+        min_bytes=min_bytes,
+        zdict=zdict,
+    )
+    return bytes((codec,)) + dict_id.encode('ascii') + body
+
+
+def decode_cached_bytes(
+    value: bytes,
+    *,
+    zdict: Optional[bytes] = None,
+) -> Optional[str]:
+    """Decode bytes written by ``encode_cached_bytes``; None when corrupt."""
+    if not value:
+        return None
+    codec = value[0]
+    try:
+        if codec == CODEC_PLAIN:
+            return bytes(value[1:]).decode('utf-8')
+        if codec == CODEC_ZLIB:
+            return _decompress(codec, '', value[1:], zdict).decode('utf-8')
+        if codec == CODEC_ZLIB_DICT:
+            dict_id = bytes(value[1:1 + _DICT_ID_LENGTH]).decode('ascii')
+            body = value[1 + _DICT_ID_LENGTH:]
+            return _decompress(codec, dict_id, body, zdict).decode('utf-8')
+    except (zlib.error, UnicodeDecodeError):
+        return None
+    return None
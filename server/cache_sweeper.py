@@ -0,0 +1,290 @@
+"""Background sweeping of expired and over-budget transcript cache entries.
+
+Read paths only notice expiry for the entries they touch, so cold rows and
+files would otherwise live forever. The sweeper deletes expired
+``transcript_cache`` rows in bounded batches (backed by the ``created_at``
+index) and keeps ``CACHE_DIR`` under a total-bytes budget by evicting the
+least recently read transcript files first. It also clears rate-limit
+counters whose window has closed, so requests never pay for that delete.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import (
+    CACHE_DIR,
+    CACHE_DIR_MAX_BYTES,
+    CACHE_SWEEP_BATCH_SIZE,
+    CACHE_SWEEP_INTERVAL_SECONDS,
+    CACHE_SWEEP_MAX_BATCHES,
+    CACHE_SWEEP_TEMP_FILE_MAX_AGE_SECONDS,
+    TRANSCRIPT_CACHE_STALE_TTL,
+    TRANSCRIPT_CACHE_SWR_ENABLED,
+    TRANSCRIPT_CACHE_TTL,
+)
+from .db import get_session, is_db_enabled
+from .file_cache import RECORD_SUFFIX, TEMP_SUFFIX, TRANSCRIPT_DIR_NAME
+from .models import TranscriptCache
+from .persistence import delete_expired_rate_limit_counters
+
+# Archive fallback files hold user data rather than cached transcripts, so
+# they are never expired or evicted. Sharded archives live outside the
+# transcript shard tree; this prefix covers the old flat layout.
+_ARCHIVE_FILE_PREFIX = 'archive_'
+_TRANSCRIPT_SUFFIXES = (RECORD_SUFFIX, '.json')
+
+
+def default_retention_seconds() -> int:
+    """Return how long an entry may still be served, stale window included."""
+    if TRANSCRIPT_CACHE_SWR_ENABLED:
+        return TRANSCRIPT_CACHE_TTL + TRANSCRIPT_CACHE_STALE_TTL
+    return TRANSCRIPT_CACHE_TTL
+
+
+def touch_cache_file(path: Path) -> None:
+    """Record a read of ``path`` for LRU eviction without changing mtime.
+
+    The file mtime doubles as the entry creation time, so only the access
+    time is bumped. This keeps eviction order correct on ``noatime`` mounts.
+    """
+    try:
+        stat = path.stat()
+        os.utime(path, (time.time(), stat.st_mtime))
+    except OSError:
+        pass
+
+
+class CacheSweeper:  # pylint: disable=too-many-instance-attributes
+    """Periodically remove expired cache rows and files."""
+
+    def __init__(
+        self,
+        *,
+        cache_dir: Path = CACHE_DIR,
+        interval_seconds: int = CACHE_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = CACHE_SWEEP_BATCH_SIZE,
+        max_batches: int = CACHE_SWEEP_MAX_BATCHES,
+        dir_max_bytes: int = CACHE_DIR_MAX_BYTES,
+        retention_seconds: Optional[int] = None,
+    ) -> None:
+        self._cache_dir = cache_dir
+        self._interval_seconds = interval_seconds
+        self._batch_size = max(1, batch_size)
+        self._max_batches = max(1, max_batches)
+        self._dir_max_bytes = max(0, dir_max_bytes)
+        self._retention_seconds = (
+            retention_seconds
+            if retention_seconds is not None
+            else default_retention_seconds()
+        )
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'cycles': 0,
+            'failures': 0,
+            'db_rows_deleted': 0,
+            'rate_limit_rows_deleted': 0,
+            'files_expired': 0,
+            'files_evicted': 0,
+            'bytes_evicted': 0,
+            'temp_files_removed': 0,
+            'dir_bytes': 0,
+            'last_duration_ms': 0,
+        }
+
+    def start(self) -> None:
+        """Start the background loop if it is not already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_forever,
+            name='transcript-cache-sweeper',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal the background loop to stop and wait briefly for it."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, int]:
+        """Return a snapshot of the sweeper counters."""
+        with self._lock:
+            return dict(self._stats)
+
+    def run_once(self) -> dict[str, int]:
+        """Run one sweep over the DB and file tiers and return the counters."""
+        started = time.monotonic()
+        self.sweep_database()
+        self.sweep_rate_limits()
+        self.sweep_files()
+        with self._lock:
+            self._stats['cycles'] += 1
+            self._stats['last_duration_ms'] = int(
+                (time.monotonic() - started) * 1000
+            )
+            return dict(self._stats)
+
+    def sweep_database(self) -> int:
+        """Delete expired rows in batches and return how many were removed."""
+        if not is_db_enabled():
+            return 0
+        cutoff = datetime.fromtimestamp(
+            time.time() - self._retention_seconds,
+            tz=timezone.utc,
+        )
+        deleted = 0
+        try:
+            for _ in range(self._max_batches):
+                if self._stop_event.is_set():
+                    break
+                removed = self._delete_expired_batch(cutoff)
+                deleted += removed
+                if removed < self._batch_size:
+                    break
+        except SQLAlchemyError:
+            logging.exception('Transcript cache sweep failed.')
+            with self._lock:
+                self._stats['failures'] += 1
+        with self._lock:
+            self._stats['db_rows_deleted'] += deleted
+        return deleted
+
+    def sweep_rate_limits(self) -> int:
+        """Delete rate-limit counters whose window has closed."""
+        if not is_db_enabled():
+            return 0
+        deleted = 0
+        try:
+            with get_session() as session:
+                if session is None:
+                    return 0
+                deleted = delete_expired_rate_limit_counters(
+                    session, time.time(),
+                )
+                session.commit()
+        except SQLAlchemyError:
+            logging.exception('Rate limit counter sweep failed.')
+            with self._lock:
+                self._stats['failures'] += 1
+        with self._lock:
+            self._stats['rate_limit_rows_deleted'] += deleted
+        return deleted
+
+    def _delete_expired_batch(self, cutoff: datetime) -> int:
+        # Each batch runs in its own short transaction so a large backlog
+        # never holds locks on the table for long.
+        with get_session() as session:
+            if session is None:
+                return 0
+            ids = session.execute(
+                select(TranscriptCache.id)
+                .where(TranscriptCache.created_at < cutoff)
+                .order_by(TranscriptCache.created_at)
+                .limit(self._batch_size)
+            ).scalars().all()
+            if not ids:
+                return 0
+            session.execute(
+                delete(TranscriptCache).where(TranscriptCache.id.in_(ids))
+            )
+            session.commit()
+            return len(ids)
+
+    def sweep_files(self) -> int:
+        """Expire old files, then evict LRU files over the byte budget."""
+        now = time.time()
+        expired = 0
+        temp_removed = 0
+        entries: list[tuple[float, int, Path]] = []
+        for path in self._transcript_cache_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.suffix == TEMP_SUFFIX:
+                if now - stat.st_mtime > CACHE_SWEEP_TEMP_FILE_MAX_AGE_SECONDS:
+                    temp_removed += _unlink(path)
+                continue
+            if path.suffix not in _TRANSCRIPT_SUFFIXES:
+                continue
+            if now - stat.st_mtime > self._retention_seconds:
+                expired += _unlink(path)
+                continue
+            last_used = max(stat.st_atime, stat.st_mtime)
+            entries.append((last_used, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+        evicted_bytes = 0
+        if self._dir_max_bytes and total_bytes > self._dir_max_bytes:
+            entries.sort(key=lambda entry: entry[0])
+            for _, size, path in entries:
+                if total_bytes <= self._dir_max_bytes:
+                    break
+                if _unlink(path):
+                    evicted += 1
+                    evicted_bytes += size
+                    total_bytes -= size
+
+        with self._lock:
+            self._stats['files_expired'] += expired
+            self._stats['files_evicted'] += evicted
+            self._stats['bytes_evicted'] += evicted_bytes
+            self._stats['temp_files_removed'] += temp_removed
+            self._stats['dir_bytes'] = total_bytes
+        return expired + evicted
+
+    def _transcript_cache_files(self) -> list[Path]:
+        """List sharded records plus flat files left from the old layout."""
+        paths: list[Path] = []
+        try:
+            for path in self._cache_dir.iterdir():
+                if path.name.startswith(_ARCHIVE_FILE_PREFIX):
+                    continue
+                if path.is_file():
+                    paths.append(path)
+        except OSError:
+            return paths
+        shard_root = self._cache_dir / TRANSCRIPT_DIR_NAME
+        try:
+            shards = [shard for shard in shard_root.iterdir() if shard.is_dir()]
+        except OSError:
+            return paths
+        for shard in shards:
+            try:
+                paths.extend(shard.iterdir())
+            except OSError:
+                continue
+        return paths
+
+    def _run_forever(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logging.exception('Transcript cache sweep cycle failed.')
+            self._stop_event.wait(self._interval_seconds)
+
+
+def _unlink(path: Path) -> int:
+    try:
+        path.unlink()
+    except OSError:
+        return 0
+    return 1
@@ -0,0 +1,100 @@
+"""Conditional GET for the per-user read endpoints.
+
+Every write to a user's archives, selection, profile or synced state bumps
+``users.data_version``. Read endpoints load that counter first and tag the
+response with a weak ETag built from it and from the route and normalized
+query, so each page, cursor and window gets its own tag. A client
+revalidating with a matching ``If-None-Match`` gets a bodiless 304 before
+any of the queries that build the payload run.
+
+Archive items embed shared video and channel rows. A write that changes
+one of those rows also bumps every user who archived an affected video
+(see ``persistence.shared_metadata_bump``), so the version alone still
+covers them.
+
+The version is read before the payload, so a write landing in between can
+only make the tag older than the body; the next request then refetches
+rather than keeping stale data. Version 0 means the user row does not
+exist yet; such responses carry no validators and are never a 304.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Optional
+
+from fastapi import Header, Request, Response
+
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+_DIGEST_LENGTH = 16
+
+
+def version_etag(version: int, *parts: str) -> str:
+    """Return the weak ETag for a user data version and its scope."""
+    tag = f'v{int(version)}'
+    if parts:
+        digest = hashlib.sha256('\n'.join(parts).encode('utf-8'))
+        tag = f'{tag}-{digest.hexdigest()[:_DIGEST_LENGTH]}'
+    return f'W/"{tag}"'
+
+
+def request_scope(request: Request) -> str:
+    """Return the route plus its query parameters in a stable order."""
+    query = sorted(request.query_params.multi_items())
+    return f'{request.url.path}?{json.dumps(query, separators=(",", ":"))}'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Return True when ``If-None-Match`` lists ``etag`` or ``*``.
+
+    If-None-Match uses the weak comparison, so ``W/`` prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    opaque = _opaque_tag(etag)
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or _opaque_tag(candidate) == opaque:
+            return True
+    return False
+
+
+def _opaque_tag(tag: str) -> str:
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+class ConditionalGet:
+    """Per-request ETag handling, injected with ``Depends(ConditionalGet)``."""
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        if_none_match: Optional[str] = Header(default=None),
+    ) -> None:
+        self._scope = request_scope(request)
+        self._response = response
+        self._if_none_match = if_none_match
+
+    def not_modified(self, version: int) -> Optional[Response]:
+        """Tag the response with ``version`` for this route and query.
+
+        Returns a 304 to send instead when the client's copy is current,
+        otherwise None.
+        """
+        if version <= 0:
+            return None
+        headers = {
+            'ETag': version_etag(version, self._scope),
+            'Cache-Control': REVALIDATE_CACHE_CONTROL,
+        }
+        self._response.headers.update(headers)
+        if not etag_matches(self._if_none_match, headers['ETag']):
+            return None
+        return Response(status_code=304, headers=headers)
+
+    def discard(self) -> None:
+        """Drop the validators before serving a degraded fallback body."""
+        del self._response.headers['ETag']
+        del self._response.headers['Cache-Control']
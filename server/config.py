@@ -23,7 +23,7 @@ OPENAI_SUMMARY_MODEL = os.getenv('OPENAI_SUMMARY_MODEL', 'gpt-4o-mini')
 OPENAI_SUMMARY_INPUT_CHARS = int(
     os.getenv('OPENAI_SUMMARY_INPUT_CHARS', '4000')
 )
-OPENAI_SUMMARY_MAX_TOKENS = int(os.getenv('OPENAI_SUMMARY_MAX_TOKENS', '200'))
+OPENAI_SUMMARY_MAX_TOKENS = int(os.getenv('OPENAI_SUMMARY_MAX_TOKENS', '300'))
 YTDLP_COOKIES_PATH = os.getenv('YTDLP_COOKIES_PATH')
 YTDLP_COOKIES_FROM_BROWSER = os.getenv('YTDLP_COOKIES_FROM_BROWSER')
 YTDLP_PLAYER_CLIENTS = os.getenv(
@@ -36,6 +36,26 @@ YTDLP_PLAYER_CLIENT_LIST = tuple(
     if client.strip()
 )
 TRANSCRIPT_CACHE_TTL = int(os.getenv('TRANSCRIPT_CACHE_TTL', '86400'))
+TRANSCRIPT_CACHE_SWR_ENABLED = _env_flag('TRANSCRIPT_CACHE_SWR_ENABLED', False)
+TRANSCRIPT_CACHE_STALE_TTL = int(
+    os.getenv('TRANSCRIPT_CACHE_STALE_TTL', '604800')
+)
+TRANSCRIPT_REFRESH_FAILURE_GRACE_SECONDS = int(
+    os.getenv('TRANSCRIPT_REFRESH_FAILURE_GRACE_SECONDS', '1800')
+)
+TRANSCRIPT_MEMORY_CACHE_MAX_BYTES = int(
+    os.getenv('TRANSCRIPT_MEMORY_CACHE_MAX_BYTES', str(64 * 1024 * 1024))
+)
+TRANSCRIPT_CACHE_COMPRESSION = _env_flag('TRANSCRIPT_CACHE_COMPRESSION', True)
+TRANSCRIPT_CACHE_COMPRESSION_LEVEL = max(
+    1,
+    min(9, int(os.getenv('TRANSCRIPT_CACHE_COMPRESSION_LEVEL', '6'))),
+)
+TRANSCRIPT_CACHE_ZDICT_PATH = os.getenv('TRANSCRIPT_CACHE_ZDICT_PATH')
+TRANSCRIPT_REFRESH_MAX_WORKERS = max(
+    1,
+    int(os.getenv('TRANSCRIPT_REFRESH_MAX_WORKERS', '1')),
+)
 TRANSCRIPT_MAX_CONCURRENCY = int(os.getenv('TRANSCRIPT_MAX_CONCURRENCY', '2'))
 TRANSCRIPT_QUEUE_TIMEOUT = int(os.getenv('TRANSCRIPT_QUEUE_TIMEOUT', '20'))
 TRANSCRIPT_RATE_LIMIT_PER_WINDOW = int(
@@ -44,6 +64,113 @@ TRANSCRIPT_RATE_LIMIT_PER_WINDOW = int(
 TRANSCRIPT_RATE_LIMIT_WINDOW_SECONDS = int(
     os.getenv('TRANSCRIPT_RATE_LIMIT_WINDOW_SECONDS', '60')
 )
+TRANSCRIPT_RATE_COST_CACHE_HIT = max(
+    0,
+    int(os.getenv('TRANSCRIPT_RATE_COST_CACHE_HIT', '1')),
+)
+TRANSCRIPT_RATE_COST_CAPTIONS = max(
+    1,
+    int(os.getenv('TRANSCRIPT_RATE_COST_CAPTIONS', '10')),
+)
+TRANSCRIPT_RATE_COST_WHISPER = max(
+    1,
+    int(os.getenv('TRANSCRIPT_RATE_COST_WHISPER', '60')),
+)
+# Budget in cost units; by default TRANSCRIPT_RATE_LIMIT_PER_WINDOW still
+# means caption fetches per window.
+TRANSCRIPT_RATE_BUDGET_PER_WINDOW = int(
+    os.getenv(
+        'TRANSCRIPT_RATE_BUDGET_PER_WINDOW',
+        str(TRANSCRIPT_RATE_LIMIT_PER_WINDOW * TRANSCRIPT_RATE_COST_CAPTIONS),
+    )
+)
+TRANSCRIPT_SINGLE_FLIGHT_ENABLED = _env_flag(
+    'TRANSCRIPT_SINGLE_FLIGHT_ENABLED', False,
+)
+# Waiters poll after their slot wait (TRANSCRIPT_QUEUE_TIMEOUT), and the app
+# drops /transcript after 30s, so the two together stay under 25s. A waiter
+# that runs out gets a 503 with Retry-After rather than a duplicate job.
+TRANSCRIPT_SINGLE_FLIGHT_WAIT_SECONDS = max(0.0, min(
+    25.0 - TRANSCRIPT_QUEUE_TIMEOUT,
+    float(os.getenv('TRANSCRIPT_SINGLE_FLIGHT_WAIT_SECONDS', '5')),
+))
+TRANSCRIPT_SINGLE_FLIGHT_POLL_SECONDS = float(
+    os.getenv('TRANSCRIPT_SINGLE_FLIGHT_POLL_SECONDS', '0.5')
+)
+SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL', '').strip()
+SHARED_CACHE_KEY_PREFIX = os.getenv('SHARED_CACHE_KEY_PREFIX', 'tubetidy')
+SHARED_CACHE_MAX_VALUE_BYTES = int(
+    os.getenv('SHARED_CACHE_MAX_VALUE_BYTES', str(1024 * 1024))
+)
+SHARED_CACHE_TIMEOUT_SECONDS = float(
+    os.getenv('SHARED_CACHE_TIMEOUT_SECONDS', '0.5')
+)
+SHARED_CACHE_POOL_SIZE = max(1, int(os.getenv('SHARED_CACHE_POOL_SIZE', '8')))
+RATE_LIMIT_BACKEND = (
+    os.getenv('RATE_LIMIT_BACKEND', 'memory').strip().lower() or 'memory'
+)
+RATE_LIMIT_REDIS_URL = os.getenv(
+    'RATE_LIMIT_REDIS_URL', SHARED_CACHE_URL,
+).strip()
+# Defaults match SQLAlchemy's, which the app used before these settings
+# existed; larger pools and idle-only pre-pings are opt-in.
+DB_POOL_SIZE = max(1, int(os.getenv('DB_POOL_SIZE', '5')))
+DB_MAX_OVERFLOW = max(0, int(os.getenv('DB_MAX_OVERFLOW', '10')))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '30'))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', '-1'))
+DB_POOL_PRE_PING = (
+    os.getenv('DB_POOL_PRE_PING', 'always').strip().lower() or 'always'
+)
+DB_POOL_PRE_PING_IDLE_SECONDS = max(
+    0,
+    int(os.getenv('DB_POOL_PRE_PING_IDLE_SECONDS', '30')),
+)
+DB_ASYNC_ENABLED = _env_flag('DB_ASYNC_ENABLED', False)
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', '').strip()
+CACHE_SWEEPER_ENABLED = _env_flag('CACHE_SWEEPER_ENABLED', False)
+CACHE_SWEEP_INTERVAL_SECONDS = max(
+    30,
+    int(os.getenv('CACHE_SWEEP_INTERVAL_SECONDS', '600')),
+)
+CACHE_SWEEP_BATCH_SIZE = max(
+    1,
+    int(os.getenv('CACHE_SWEEP_BATCH_SIZE', '500')),
+)
+CACHE_SWEEP_MAX_BATCHES = max(
+    1,
+    int(os.getenv('CACHE_SWEEP_MAX_BATCHES', '20')),
+)
+CACHE_DIR_MAX_BYTES = int(
+    os.getenv('CACHE_DIR_MAX_BYTES', str(512 * 1024 * 1024))
+)
+PREWARM_ENABLED = _env_flag('PREWARM_ENABLED', False)
+PREWARM_INTERVAL_SECONDS = max(
+    60,
+    int(os.getenv('PREWARM_INTERVAL_SECONDS', '900')),
+)
+PREWARM_MAX_CONCURRENCY = max(
+    1,
+    int(os.getenv('PREWARM_MAX_CONCURRENCY', '1')),
+)
+PREWARM_MAX_VIDEOS_PER_CHANNEL = int(
+    os.getenv('PREWARM_MAX_VIDEOS_PER_CHANNEL', '3')
+)
+PREWARM_MAX_VIDEO_AGE_SECONDS = int(
+    os.getenv('PREWARM_MAX_VIDEO_AGE_SECONDS', '172800')
+)
+# Spend cap over a rolling window, so a short interval cannot multiply it.
+PREWARM_COST_BUDGET = int(os.getenv('PREWARM_COST_BUDGET', '30'))
+PREWARM_COST_WINDOW_SECONDS = max(
+    60,
+    int(os.getenv('PREWARM_COST_WINDOW_SECONDS', '3600')),
+)
+PREWARM_CAPTIONS_COST = int(os.getenv('PREWARM_CAPTIONS_COST', '1'))
+PREWARM_AUDIO_COST = int(os.getenv('PREWARM_AUDIO_COST', '10'))
+PREWARM_ALLOW_AUDIO = _env_flag('PREWARM_ALLOW_AUDIO', False)
+PREWARM_FEED_URL = os.getenv(
+    'PREWARM_FEED_URL',
+    'https://www.youtube.com/feeds/videos.xml',
+)
 YTDLP_SOCKET_TIMEOUT_SECONDS = max(
     1,
     int(os.getenv('YTDLP_SOCKET_TIMEOUT_SECONDS', '10')),
@@ -71,7 +198,16 @@ APP_ENV = os.getenv('APP_ENV', 'development').strip().lower()
 BACKEND_REQUIRE_AUTH = _env_flag('BACKEND_REQUIRE_AUTH', True)
 ALLOW_CLIENT_PLAN_UPDATES = _env_flag('ALLOW_CLIENT_PLAN_UPDATES', False)
 PLAN_UPDATE_SHARED_SECRET = os.getenv('PLAN_UPDATE_SHARED_SECRET', '').strip()
+SESSION_TOKEN_SECRET = os.getenv('SESSION_TOKEN_SECRET', '').strip()
+SESSION_TOKEN_PREVIOUS_SECRET = os.getenv(
+    'SESSION_TOKEN_PREVIOUS_SECRET', '',
+).strip()
+SESSION_TOKEN_TTL_SECONDS = max(
+    60,
+    int(os.getenv('SESSION_TOKEN_TTL_SECONDS', '900')),
+)
 ENABLE_API_DOCS = _env_flag('ENABLE_API_DOCS', False)
+ENABLE_METRICS_ENDPOINT = _env_flag('ENABLE_METRICS_ENDPOINT', False)
 FAIL_CLOSED_WITHOUT_DB = _env_flag(
     'FAIL_CLOSED_WITHOUT_DB',
     APP_ENV in {'prod', 'production'},
@@ -129,10 +265,46 @@ MAX_SELECTION_CHANGES_TODAY = 31
 ARCHIVE_PLACEHOLDER_CHANNEL_ID = '__archive_channel__'
 ARCHIVE_PLACEHOLDER_CHANNEL_TITLE = 'Archived videos'
 ARCHIVE_PLACEHOLDER_VIDEO_TITLE = 'Archived video'
+ARCHIVE_PAGE_DEFAULT_LIMIT = 100
+ARCHIVE_PAGE_MAX_LIMIT = 500
+ARCHIVE_BATCH_MAX_ITEMS = 200
+ARCHIVE_CALENDAR_MAX_DAYS = 400
+MAX_UTC_OFFSET_MINUTES = 14 * 60
+# A batch is charged one write per this many items against the write limit.
+ARCHIVE_BATCH_ITEMS_PER_WRITE = 10
 TRANSCRIPT_DEFAULT_MAX_CHARS = 1200
 TRANSCRIPT_MIN_MAX_CHARS = 300
 TRANSCRIPT_MAX_MAX_CHARS = 10000
+PREWARM_SEEN_MAX_ITEMS = 10000
+# Failed or caption-less uploads are retried with a doubling backoff that
+# starts at one prewarm interval, then dropped after this many attempts.
+PREWARM_RETRY_MAX_ATTEMPTS = 4
+PREWARM_RETRY_MAX_BACKOFF_SECONDS = 6 * 3600
+PREWARM_FEED_TIMEOUT_SECONDS = 10
+TRANSCRIPT_PENDING_RETRY_SECONDS = 10
+TRANSCRIPT_CACHE_COMPRESS_MIN_BYTES = 256
+CACHE_SWEEP_TEMP_FILE_MAX_AGE_SECONDS = 3600
+FILE_CACHE_SHARD_PREFIX_LENGTH = 2
+SHARED_CACHE_RETRY_SECONDS = 30
+RATE_LIMIT_RETRY_SECONDS = 30
+RATE_LIMIT_BUCKET_SHARDS = 16
+AUTH_CACHE_SHARDS = 16
+GOOGLE_JWKS_REFRESH_FRACTION = 0.8
+GOOGLE_JWKS_RETRY_SECONDS = 30
+SUMMARY_DEFAULT_LINES = 3
+SUMMARY_MAX_LINES = 5
 AUTH_CACHE_MAX_ITEMS = int(os.getenv('AUTH_CACHE_MAX_ITEMS', '1024'))
+AUTH_NEGATIVE_CACHE_TTL_SECONDS = max(
+    0,
+    int(os.getenv('AUTH_NEGATIVE_CACHE_TTL_SECONDS', '60')),
+)
+AUTH_NEGATIVE_CACHE_MAX_ITEMS = int(
+    os.getenv('AUTH_NEGATIVE_CACHE_MAX_ITEMS', '4096')
+)
+GOOGLE_JWKS_UNKNOWN_KID_REFRESH_SECONDS = max(
+    1,
+    int(os.getenv('GOOGLE_JWKS_UNKNOWN_KID_REFRESH_SECONDS', '60')),
+)
 WRITE_RATE_LIMIT_PER_WINDOW = int(
     os.getenv('WRITE_RATE_LIMIT_PER_WINDOW', '60')
 )
@@ -0,0 +1,133 @@
+"""Opaque keyset pagination cursors for the archive listing.
+
+A cursor is the sort key of the last item on a page, encoded as base64url
+JSON. It is not signed: it only positions a query that is already scoped
+to the authenticated user, so a forged cursor can at most skip items.
+
+The file-fallback archive list is paged, windowed and bucketed by day here
+too, so it answers the same way as the DB path.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*key: Any) -> str:
+    """Return an opaque cursor for the sort ``key``."""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(
+    raw_cursor: Optional[str],
+    types: tuple[type, ...],
+) -> Optional[tuple[Any, ...]]:
+    """Return the sort key in ``raw_cursor`` or raise 400 when malformed."""
+    if not raw_cursor:
+        return None
+    try:
+        key = json.loads(
+            base64.urlsafe_b64decode(raw_cursor + '=' * (-len(raw_cursor) % 4))
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail='invalid cursor') from exc
+    if (
+        not isinstance(key, list)
+        or len(key) != len(types)
+        or not all(
+            isinstance(value, kind) and not isinstance(value, bool)
+            for value, kind in zip(key, types)
+        )
+    ):
+        raise HTTPException(status_code=400, detail='invalid cursor')
+    return tuple(key)
+
+
+def encode_archive_cursor(archived_at: datetime, archive_id: int) -> str:
+    """Return the cursor positioned after an archive row."""
+    return encode_cursor(archived_at.isoformat(), archive_id)
+
+
+def decode_archive_cursor(
+    raw_cursor: Optional[str],
+) -> Optional[tuple[datetime, int]]:
+    """Return the ``(archived_at, id)`` a DB archive cursor points after."""
+    key = decode_cursor(raw_cursor, (str, int))
+    if key is None:
+        return None
+    try:
+        return datetime.fromisoformat(key[0]), key[1]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail='invalid cursor') from exc
+
+
+def paginate_archive_file_items(
+    items: list[dict[str, Any]],
+    *,
+    limit: Optional[int],
+    raw_cursor: Optional[str],
+    window: tuple[Optional[datetime], Optional[datetime]] = (None, None),
+) -> dict[str, Any]:
+    """Page file-fallback archive items in the same order as the DB path."""
+    ordered = sorted(
+        _within_window(items, window),
+        key=lambda item: (item['archived_at'], item['video_id']),
+        reverse=True,
+    )
+    after = decode_cursor(raw_cursor, (int, str))
+    if after is not None:
+        ordered = [
+            item
+            for item in ordered
+            if (item['archived_at'], item['video_id']) < after
+        ]
+    page = ordered[:limit]
+    next_cursor = (
+        encode_cursor(page[-1]['archived_at'], page[-1]['video_id'])
+        if len(page) < len(ordered)
+        else None
+    )
+    return {'items': page, 'next_cursor': next_cursor}
+
+
+def count_archive_file_days(
+    items: list[dict[str, Any]],
+    *,
+    window: tuple[Optional[datetime], Optional[datetime]],
+    offset_minutes: int,
+) -> dict[str, Any]:
+    """Count file-fallback archives per day ``offset_minutes`` from UTC."""
+    counts = Counter(
+        (
+            datetime.fromtimestamp(item['archived_at'] / 1000, tz=timezone.utc)
+            + timedelta(minutes=offset_minutes)
+        ).date().isoformat()
+        for item in _within_window(items, window)
+    )
+    return {
+        'days': [{'day': day, 'count': counts[day]} for day in sorted(counts)],
+    }
+
+
+def _within_window(
+    items: list[dict[str, Any]],
+    window: tuple[Optional[datetime], Optional[datetime]],
+) -> list[dict[str, Any]]:
+    since, until = (
+        None if bound is None else int(bound.timestamp() * 1000)
+        for bound in window
+    )
+    return [
+        item
+        for item in items
+        if (since is None or item['archived_at'] >= since)
+        and (until is None or item['archived_at'] < until)
+    ]
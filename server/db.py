@@ -13,6 +13,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
 from . import models
+from .db_pool import PoolMetrics, engine_options, pre_ping_strategy
 
 ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT / '.env')
@@ -21,12 +22,15 @@ DATABASE_URL = os.getenv('DATABASE_URL')
 
 _ENGINE = None
 _SESSION_LOCAL = None
+POOL_METRICS = PoolMetrics()
 
 if DATABASE_URL:
+    _PRE_PING = pre_ping_strategy()
     _ENGINE = create_engine(
         DATABASE_URL,
-        pool_pre_ping=True,
+        **engine_options(DATABASE_URL, _PRE_PING),
     )
+    POOL_METRICS.attach(_ENGINE, strategy=_PRE_PING)
     _SESSION_LOCAL = sessionmaker(
         bind=_ENGINE, autoflush=False, autocommit=False
     )
@@ -37,6 +41,11 @@ def is_db_enabled() -> bool:
     return _ENGINE is not None
 
 
+def pool_stats() -> dict:
+    """Return live connection pool counters for the metrics endpoint."""
+    return POOL_METRICS.stats()
+
+
 def init_db() -> None:
     """Initialize database schema if enabled."""
     if _ENGINE is None:
@@ -106,6 +115,10 @@ def _apply_runtime_migrations() -> None:
             CREATE INDEX IF NOT EXISTS ix_archives_user_archived_at
             ON archives (user_id, archived_at DESC)
             """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_transcript_cache_created_at
+            ON transcript_cache (created_at)
+            """,
         )
     elif dialect == 'sqlite':
         statements = (
@@ -141,6 +154,10 @@ def _apply_runtime_migrations() -> None:
             CREATE INDEX IF NOT EXISTS ix_archives_user_archived_at
             ON archives (user_id, archived_at)
             """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_transcript_cache_created_at
+            ON transcript_cache (created_at)
+            """,
         )
     else:
         return
@@ -172,6 +189,17 @@ def _ensure_optional_columns(conn) -> None:
     ):
         conn.execute(text('ALTER TABLE videos ADD COLUMN thumbnail_url TEXT'))
 
+    if (
+        'users' in table_columns
+        and 'data_version' not in table_columns['users']
+    ):
+        conn.execute(
+            text(
+                'ALTER TABLE users ADD COLUMN data_version '
+                'BIGINT NOT NULL DEFAULT 0'
+            )
+        )
+
 
 def validate_schema() -> tuple[bool, Optional[str]]:
     """Validate that the live database has the required application schema."""
@@ -186,8 +214,10 @@ def validate_schema() -> tuple[bool, Optional[str]]:
         'videos',
         'archives',
         'transcript_cache',
+        'rate_limit_counters',
     }
     required_columns = {
+        'users': {'data_version'},
         'videos': {'thumbnail_url'},
     }
 
@@ -0,0 +1,220 @@
+"""Connection pool sizing, pre-ping strategy and live pool counters.
+
+The defaults keep what the app always ran with: SQLAlchemy's 5 + 10 pool
+and a pre-ping on every checkout. Sync endpoints run on Starlette's
+threadpool (40 threads), so busy deployments can raise ``DB_POOL_SIZE``
+and ``DB_MAX_OVERFLOW`` to match, as long as every worker's share still
+fits the server's ``max_connections``.
+
+``pool_pre_ping`` costs a round trip on every checkout. The opt-in
+``idle`` strategy only pings connections that sat in the pool longer than
+``DB_POOL_PRE_PING_IDLE_SECONDS``; a failed ping raises
+``DisconnectionError`` so the pool swaps in a fresh connection. ``always``
+pings every checkout and ``never`` relies on recycling and on invalidation
+after a disconnect error.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DisconnectionError, TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_PRE_PING_IDLE_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+)
+
+_CHECKED_IN_AT = 'tubetidy_checked_in_at'
+
+
+def pre_ping_strategy(raw: str = DB_POOL_PRE_PING) -> str:
+    """Return a supported pre-ping strategy, defaulting to ``always``."""
+    if raw in ('always', 'idle', 'never'):
+        return raw
+    logging.warning('Unsupported DB_POOL_PRE_PING: %s', raw)
+    return 'always'
+
+
+def engine_options(
+    database_url: str,
+    strategy: str,
+    *,
+    asynchronous: bool = False,
+) -> dict[str, Any]:
+    """Return ``create_engine`` keyword arguments for ``database_url``.
+
+    SQLite keeps SQLAlchemy's default pool, which is picked per URL and
+    does not accept the sizing arguments.
+    """
+    options: dict[str, Any] = {'pool_pre_ping': strategy == 'always'}
+    if make_url(database_url).get_backend_name() == 'sqlite':
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if asynchronous else TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    )
+    return options
+
+
+class _TimedPoolMixin:
+    """Report how long each checkout took to the attached metrics."""
+
+    metrics: Optional['PoolMetrics'] = None
+
+    def connect(self):
+        """Check out a connection, timing the wait."""
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeout:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        """Return a replacement pool that reports to the same metrics."""
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """``QueuePool`` that reports how long each checkout took."""
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """Async-adapted ``QueuePool`` that reports checkout times."""
+
+
+class PoolMetrics:
+    """Counters fed by pool events, plus the pool's live occupancy."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+        self._strategy = 'always'
+        self._stats = {
+            'connects': 0,
+            'checkouts': 0,
+            'checkout_timeouts': 0,
+            'invalidations': 0,
+            'soft_invalidations': 0,
+            'pre_pings': 0,
+            'pre_ping_failures': 0,
+        }
+        self._waits = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    def attach(
+        self,
+        engine: Engine,
+        *,
+        strategy: str = 'always',
+        idle_seconds: float = DB_POOL_PRE_PING_IDLE_SECONDS,
+    ) -> None:
+        """Listen to ``engine``'s pool events and time its checkouts."""
+        self._engine = engine
+        self._strategy = strategy
+        if isinstance(engine.pool, _TimedPoolMixin):
+            engine.pool.metrics = self
+
+        @event.listens_for(engine, 'connect')
+        def _on_connect(_dbapi_connection, connection_record) -> None:
+            connection_record.info[_CHECKED_IN_AT] = time.monotonic()
+            self._count('connects')
+
+        @event.listens_for(engine, 'checkin')
+        def _on_checkin(_dbapi_connection, connection_record) -> None:
+            if connection_record is not None:
+                connection_record.info[_CHECKED_IN_AT] = time.monotonic()
+
+        @event.listens_for(engine, 'checkout')
+        def _on_checkout(dbapi_connection, connection_record, _proxy) -> None:
+            self._count('checkouts')
+            if strategy != 'idle':
+                return
+            checked_in_at = connection_record.info.get(_CHECKED_IN_AT, 0.0)
+            if time.monotonic() - checked_in_at < idle_seconds:
+                return
+            self._ping(dbapi_connection)
+
+        @event.listens_for(engine, 'invalidate')
+        def _on_invalidate(_dbapi_connection, _record, _exception) -> None:
+            self._count('invalidations')
+
+        @event.listens_for(engine, 'soft_invalidate')
+        def _on_soft_invalidate(_dbapi_connection, _record, _exc) -> None:
+            self._count('soft_invalidations')
+
+    def record_wait(self, seconds: float) -> None:
+        """Add one checkout that took ``seconds``."""
+        with self._lock:
+            self._waits += 1
+            self._wait_seconds_total += seconds
+            self._wait_seconds_max = max(self._wait_seconds_max, seconds)
+
+    def record_timeout(self) -> None:
+        """Count a checkout that gave up after ``pool_timeout``."""
+        self._count('checkout_timeouts')
+
+    def stats(self) -> dict[str, Any]:
+        """Return the event counters and current pool occupancy."""
+        if self._engine is None:
+            return {'enabled': False}
+        pool = self._engine.pool
+        with self._lock:
+            snapshot: dict[str, Any] = {
+                'enabled': True,
+                'pool': type(pool).__name__,
+                'pre_ping': self._strategy,
+                **self._stats,
+                'wait_ms_total': round(self._wait_seconds_total * 1000, 3),
+                'wait_ms_max': round(self._wait_seconds_max * 1000, 3),
+                'wait_ms_avg': round(
+                    self._wait_seconds_total * 1000 / self._waits, 3,
+                ) if self._waits else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            snapshot.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(0, pool.overflow()),
+            )
+        return snapshot
+
+    def _ping(self, dbapi_connection) -> None:
+        self._count('pre_pings')
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        except Exception as exc:
+            self._count('pre_ping_failures')
+            raise DisconnectionError() from exc
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
@@ -0,0 +1,176 @@
+"""Sharded, binary on-disk layout for the transcript and archive file caches.
+
+Entries live in hash-prefix subdirectories so no single directory grows
+past a few thousand files::
+
+    CACHE_DIR/transcripts/<ab>/<key>.ttc
+    CACHE_DIR/archives/<ab>/<user>.json
+
+Transcript records are a fixed header followed by the text, summary and
+source fields. Readers map the file with ``mmap`` and slice the fields
+at the offsets given by the header, so there is no JSON parse and
+compressed bodies are stored raw instead of base64 encoded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+from pathlib import Path
+import re
+import struct
+import time
+from typing import Optional
+
+from .cache_codec import decode_cached_bytes, encode_cached_bytes
+from .config import FILE_CACHE_SHARD_PREFIX_LENGTH
+
+TRANSCRIPT_DIR_NAME = 'transcripts'
+ARCHIVE_DIR_NAME = 'archives'
+RECORD_SUFFIX = '.ttc'
+TEMP_SUFFIX = '.tmp'
+
+RECORD_MAGIC = b'TTC1'
+RECORD_VERSION = 1
+# magic, version, flags, created_at, text length, summary length,
+# source length.
+_HEADER = struct.Struct('<4sBBdIIH')
+_FLAG_PARTIAL = 0x01
+_FLAG_HAS_SUMMARY = 0x02
+
+
+def shard_for(key: str) -> str:
+    """Return the shard directory name for ``key``."""
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return digest[:FILE_CACHE_SHARD_PREFIX_LENGTH]
+
+
+def transcript_record_path(cache_dir: Path, key: str) -> Path:
+    """Return the sharded record path for a transcript cache key."""
+    return (
+        cache_dir / TRANSCRIPT_DIR_NAME / shard_for(key)
+        / f'{key}{RECORD_SUFFIX}'
+    )
+
+
+def archive_record_path(cache_dir: Path, user_id: str) -> Path:
+    """Return the sharded archive fallback path for a user."""
+    safe = safe_archive_name(user_id)
+    return cache_dir / ARCHIVE_DIR_NAME / shard_for(safe) / f'{safe}.json'
+
+
+def legacy_archive_path(cache_dir: Path, user_id: str) -> Path:
+    """Return the flat archive path used before the sharded layout."""
+    return cache_dir / f'archive_{safe_archive_name(user_id)}.json'
+
+
+def safe_archive_name(user_id: str) -> str:
+    """Return ``user_id`` reduced to filesystem-safe characters."""
+    return re.sub(r'[^a-zA-Z0-9_-]+', '_', user_id)
+
+
+def pack_record(payload: dict, created_at: Optional[float] = None) -> bytes:
+    """Serialize a transcript payload into the binary record format."""
+    text = encode_cached_bytes(payload.get('text') or '')
+    summary_value = payload.get('summary')
+    summary = (
+        encode_cached_bytes(summary_value)
+        if summary_value is not None
+        else b''
+    )
+    source = (payload.get('source') or 'captions').encode('utf-8')[:255]
+    flags = 0
+    if payload.get('partial'):
+        flags |= _FLAG_PARTIAL
+    if summary_value is not None:
+        flags |= _FLAG_HAS_SUMMARY
+    header = _HEADER.pack(
+        RECORD_MAGIC,
+        RECORD_VERSION,
+        flags,
+        created_at if created_at is not None else time.time(),
+        len(text),
+        len(summary),
+        len(source),
+    )
+    return header + text + summary + source
+
+
+def unpack_record(buffer) -> Optional[dict]:
+    """Decode a binary record; return None when it is truncated or corrupt."""
+    if len(buffer) < _HEADER.size:
+        return None
+    (
+        magic,
+        version,
+        flags,
+        created_at,
+        text_length,
+        summary_length,
+        source_length,
+    ) = _HEADER.unpack_from(buffer, 0)
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        return None
+    text_start = _HEADER.size
+    summary_start = text_start + text_length
+    source_start = summary_start + summary_length
+    end = source_start + source_length
+    if end != len(buffer):
+        return None
+
+    text = decode_cached_bytes(buffer[text_start:summary_start])
+    if text is None:
+        return None
+    summary = None
+    if flags & _FLAG_HAS_SUMMARY:
+        summary = decode_cached_bytes(buffer[summary_start:source_start])
+        if summary is None:
+            return None
+    try:
+        source = bytes(buffer[source_start:end]).decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    return {
+        'text': text,
+        'summary': summary,
+        'source': source or 'captions',
+        'partial': bool(flags & _FLAG_PARTIAL),
+        'created_at': created_at,
+    }
+
+
+def read_record(path: Path) -> Optional[dict]:
+    """Read a transcript record through ``mmap``; None when missing."""
+    try:
+        with open(path, 'rb') as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size < _HEADER.size:
+                return None
+            with mmap.mmap(
+                handle.fileno(), 0, access=mmap.ACCESS_READ,
+            ) as mapped, memoryview(mapped) as view:
+                return unpack_record(view)
+    except (OSError, ValueError, BufferError):
+        return None
+
+
+def write_record(
+    path: Path,
+    payload: dict,
+    created_at: Optional[float] = None,
+) -> bool:
+    """Atomically write a transcript record, creating its shard directory."""
+    return write_bytes_atomic(path, pack_record(payload, created_at))
+
+
+def write_bytes_atomic(path: Path, data: bytes) -> bool:
+    """Write ``data`` through a temp file in the same directory."""
+    temp_path = path.with_suffix(TEMP_SUFFIX)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path.write_bytes(data)
+        temp_path.replace(path)
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,220 @@
+"""Google ID token signing keys, refreshed ahead of expiry in the background.
+
+The key map is replaced as a whole on every refresh, so request threads
+read it without taking a lock. A background thread fetches new keys once
+``GOOGLE_JWKS_REFRESH_FRACTION`` of the cache lifetime has passed, which
+keeps requests from waiting on Google's certs endpoint when the old keys
+expire. Requests only fetch keys themselves when the store was never
+filled or the background refresh kept failing past the expiry.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import jwt
+import requests
+
+from .config import (
+    GOOGLE_JWKS_CACHE_TTL_SECONDS,
+    GOOGLE_JWKS_REFRESH_FRACTION,
+    GOOGLE_JWKS_RETRY_SECONDS,
+    GOOGLE_JWKS_TIMEOUT_SECONDS,
+    GOOGLE_JWKS_UNKNOWN_KID_REFRESH_SECONDS,
+    GOOGLE_JWKS_URL,
+)
+
+_MIN_TTL_SECONDS = 60
+
+
+class JwksUnavailableError(Exception):
+    """Raised when no usable signing keys could be fetched."""
+
+
+def extract_max_age(cache_control: str) -> Optional[int]:
+    """Return the ``max-age`` of a Cache-Control header, if present."""
+    match = re.search(r'max-age=(\d+)', cache_control)
+    if not match:
+        return None
+    return int(match.group(1))
+
+
+class GoogleJwksStore:  # pylint: disable=too-many-instance-attributes
+    """Hold the current key map and keep it fresh."""
+
+    def __init__(
+        self,
+        *,
+        url: str = GOOGLE_JWKS_URL,
+        timeout_seconds: float = GOOGLE_JWKS_TIMEOUT_SECONDS,
+        default_ttl_seconds: int = GOOGLE_JWKS_CACHE_TTL_SECONDS,
+        refresh_fraction: float = GOOGLE_JWKS_REFRESH_FRACTION,
+        retry_seconds: float = GOOGLE_JWKS_RETRY_SECONDS,
+        unknown_kid_refresh_seconds: float = (
+            GOOGLE_JWKS_UNKNOWN_KID_REFRESH_SECONDS
+        ),
+        fetch: Callable[..., Any] = requests.get,
+    ) -> None:
+        self._url = url
+        self._timeout_seconds = timeout_seconds
+        self._default_ttl_seconds = default_ttl_seconds
+        self._refresh_fraction = min(1.0, max(0.1, refresh_fraction))
+        self._retry_seconds = retry_seconds
+        self._fetch = fetch
+        self._unknown_kid_refresh_seconds = unknown_kid_refresh_seconds
+        self._next_unknown_kid_refresh = 0.0
+        # (keys by kid, refresh_at, expires_at); replaced, never mutated.
+        self._state: tuple[dict[str, Any], float, float] = ({}, 0.0, 0.0)
+        self._fetch_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'blocking_fetches': 0,
+            'unknown_kid_refreshes': 0,
+            'unknown_kid_throttled': 0,
+        }
+
+    def keys(self) -> dict[str, Any]:
+        """Return the current key map, fetching only if none is usable."""
+        keys, _, expires_at = self._state
+        if keys and expires_at > time.time():
+            return keys
+        with self._fetch_lock:
+            keys, _, expires_at = self._state
+            if keys and expires_at > time.time():
+                return keys
+            self._count('blocking_fetches')
+            return self._refresh_locked()
+
+    def refresh(self) -> dict[str, Any]:
+        """Fetch and install a new key map."""
+        with self._fetch_lock:
+            return self._refresh_locked()
+
+    def refresh_for_unknown_kid(self) -> dict[str, Any]:
+        """Refetch keys for a token whose ``kid`` is not in the map.
+
+        Google rotates keys rarely, so at most one such refresh runs per
+        ``unknown_kid_refresh_seconds``; other callers get the current map.
+        Callers that queued behind the refresh see its result.
+        """
+        if time.monotonic() < self._next_unknown_kid_refresh:
+            self._count('unknown_kid_throttled')
+            return self._state[0]
+        with self._fetch_lock:
+            now = time.monotonic()
+            if now < self._next_unknown_kid_refresh:
+                self._count('unknown_kid_throttled')
+                return self._state[0]
+            self._next_unknown_kid_refresh = (
+                now + self._unknown_kid_refresh_seconds
+            )
+            self._count('unknown_kid_refreshes')
+            return self._refresh_locked()
+
+    def start(self) -> None:
+        """Start the background refresher if it is not already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_forever,
+            name='google-jwks-refresh',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal the background refresher to stop and wait briefly for it."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of the refresh counters."""
+        keys, refresh_at, expires_at = self._state
+        with self._stats_lock:
+            return {
+                **self._stats,
+                'keys': len(keys),
+                'refresh_in_seconds': max(0, int(refresh_at - time.time())),
+                'expires_in_seconds': max(0, int(expires_at - time.time())),
+            }
+
+    def _refresh_locked(self) -> dict[str, Any]:
+        try:
+            keys, ttl = self._download()
+        except JwksUnavailableError:
+            self._count('refresh_failures')
+            raise
+        now = time.time()
+        self._state = (
+            keys,
+            now + ttl * self._refresh_fraction,
+            now + ttl,
+        )
+        self._count('refreshes')
+        return keys
+
+    def _download(self) -> tuple[dict[str, Any], int]:
+        try:
+            response = self._fetch(self._url, timeout=self._timeout_seconds)
+        except requests.RequestException as exc:
+            raise JwksUnavailableError(str(exc)) from exc
+        if response.status_code != 200:
+            raise JwksUnavailableError(f'status {response.status_code}')
+        try:
+            payload = response.json()
+        except ValueError as exc:
+            raise JwksUnavailableError('invalid JSON') from exc
+
+        keys = payload.get('keys') if isinstance(payload, dict) else None
+        if not isinstance(keys, list):
+            raise JwksUnavailableError('missing keys')
+        jwks_by_kid: dict[str, Any] = {}
+        for key_data in keys:
+            if not isinstance(key_data, dict):
+                continue
+            key_id = key_data.get('kid')
+            if not isinstance(key_id, str) or not key_id:
+                continue
+            try:
+                jwks_by_kid[key_id] = jwt.PyJWK.from_dict(key_data).key
+            except jwt.PyJWTError:
+                continue
+        if not jwks_by_kid:
+            raise JwksUnavailableError('no usable keys')
+
+        max_age = extract_max_age(response.headers.get('Cache-Control', ''))
+        ttl = max_age if max_age is not None else self._default_ttl_seconds
+        return jwks_by_kid, max(_MIN_TTL_SECONDS, ttl)
+
+    def _next_wait(self) -> float:
+        _, refresh_at, _ = self._state
+        return max(0.0, refresh_at - time.time())
+
+    def _run_forever(self) -> None:
+        while not self._stop_event.wait(self._next_wait()):
+            try:
+                self.refresh()
+            except JwksUnavailableError:
+                logging.warning(
+                    'Google JWKS refresh failed; retrying in %ss.',
+                    self._retry_seconds,
+                )
+                self._stop_event.wait(self._retry_seconds)
+            except Exception:
+                logging.exception('Google JWKS refresh failed.')
+                self._stop_event.wait(self._retry_seconds)
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
@@ -0,0 +1,133 @@
+"""In-process, byte-bounded LRU cache used in front of the transcript tiers."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Optional
+
+_ENTRY_OVERHEAD_BYTES = 128
+
+
+def estimate_payload_bytes(payload: dict[str, Any]) -> int:
+    """Approximate the retained size of a cached transcript payload."""
+    size = _ENTRY_OVERHEAD_BYTES
+    for value in payload.values():
+        if isinstance(value, str):
+            size += len(value.encode('utf-8'))
+        else:
+            size += 8
+    return size
+
+
+class ByteBoundedLRUCache:
+    """Thread-safe LRU cache bounded by the total size of its payloads.
+
+    Entries older than ``max_age_seconds`` are dropped on read, so the
+    tier never outlives the TTL of the tiers behind it.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int,
+        max_age_seconds: float,
+        max_entry_bytes: Optional[int] = None,
+    ) -> None:
+        self._max_bytes = max(0, max_bytes)
+        self._max_age_seconds = max_age_seconds
+        self._max_entry_bytes = (
+            max_entry_bytes
+            if max_entry_bytes is not None
+            else self._max_bytes // 8
+        )
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            str, tuple[dict[str, Any], float, int]
+        ] = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'rejected': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """Return True when the cache may hold any entries."""
+        return self._max_bytes > 0
+
+    def get(self, key: str) -> Optional[tuple[dict[str, Any], float]]:
+        """Return ``(payload, created_at)`` and mark the entry recently used."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            payload, created_at, _ = entry
+            if now - created_at > self._max_age_seconds:
+                self._remove_locked(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return payload, created_at
+
+    def set(
+        self,
+        key: str,
+        payload: dict[str, Any],
+        created_at: Optional[float] = None,
+    ) -> None:
+        """Insert or replace an entry, evicting LRU entries to fit."""
+        if not self.enabled:
+            return
+        size = estimate_payload_bytes(payload)
+        with self._lock:
+            self._remove_locked(key)
+            if size > self._max_entry_bytes:
+                self._stats['rejected'] += 1
+                return
+            self._entries[key] = (
+                dict(payload),
+                created_at if created_at is not None else time.time(),
+                size,
+            )
+            self._total_bytes += size
+            while self._total_bytes > self._max_bytes and self._entries:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self._stats['evictions'] += 1
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            self._remove_locked(key)
+
+    def clear(self) -> None:
+        """Drop every entry while keeping counters."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return a snapshot of the cache counters and occupancy."""
+        with self._lock:
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self._max_bytes,
+            }
+
+    def _remove_locked(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
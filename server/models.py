@@ -4,8 +4,10 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
+    Float,
     ForeignKey,
     Index,
     Integer,
@@ -25,6 +27,10 @@ class User(Base):
     id: Mapped[str] = mapped_column(String(64), primary_key=True)
     email: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     plan_tier: Mapped[str] = mapped_column(String(32), default='free')
+    # Bumped by every write to the user's data; served as the read ETag.
+    data_version: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default='0'
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -125,6 +131,9 @@ class Archive(Base):
 class TranscriptCache(Base):
     """Cached transcript entries."""
     __tablename__ = 'transcript_cache'
+    __table_args__ = (
+        Index('ix_transcript_cache_created_at', 'created_at'),
+    )
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, autoincrement=True
@@ -137,3 +146,13 @@ class TranscriptCache(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
+
+
+class RateLimitCounter(Base):
+    """Fixed-window request counter shared by every server instance."""
+    __tablename__ = 'rate_limit_counters'
+
+    bucket_key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    window_start: Mapped[int] = mapped_column(BigInteger, default=0)
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    expires_at: Mapped[float] = mapped_column(Float, index=True)
@@ -2,11 +2,30 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import json
 from typing import Any, Optional
 
 from fastapi import HTTPException
+from sqlalchemy import (
+    DateTime,
+    Row,
+    Select,
+    String,
+    Text,
+    Update,
+    and_,
+    case,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.sql.functions import coalesce, count
 try:
     from sqlalchemy.dialects.postgresql import insert as POSTGRES_INSERT
 except Exception:  # pragma: no cover - fallback for non-Postgres builds.
@@ -25,8 +44,23 @@ from .config import (
     MAX_CHANNEL_TITLE_LENGTH,
     MAX_SELECTION_CHANNELS,
 )
-from .models import Archive, Channel, User, UserChannel, UserState, Video
+from .models import (
+    Archive,
+    Channel,
+    RateLimitCounter,
+    User,
+    UserChannel,
+    UserState,
+    Video,
+)
+from .cursors import encode_archive_cursor
 from .schemas import SelectionRequest
+from .validation import (
+    channel_limit_for_plan_tier,
+    normalize_opened_video_ids,
+    sanitize_selection_change_day,
+    sanitize_selection_changes_today,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -48,10 +82,6 @@ def _dialect_insert(session: Any):
     return None
 
 
-def _is_postgres_session(session: Any) -> bool:
-    return _dialect_name(session) == 'postgresql'
-
-
 # ---------------------------------------------------------------------------
 # Normalisation helpers
 # ---------------------------------------------------------------------------
@@ -124,28 +154,169 @@ def ensure_user_exists(session: Any, user_id: str) -> None:
         session.flush()
 
 
+def _touch_user_insert(di: Any, user_id: str):
+    """Return an upsert creating the user or bumping its data version."""
+    users = User.__table__
+    # created_at is explicit because column defaults are not applied when
+    # the statement runs inside a CTE.
+    return di(users).values(
+        id=user_id,
+        plan_tier='free',
+        data_version=1,
+        created_at=datetime.now(timezone.utc),
+    ).on_conflict_do_update(
+        index_elements=['id'],
+        set_={'data_version': users.c.data_version + 1},
+    )
+
+
+def bump_data_version(session: Any, user_id: str) -> None:
+    """Mark the user's data changed so cached reads revalidate."""
+    users = User.__table__
+    session.execute(
+        update(users)
+        .where(users.c.id == user_id)
+        .values(data_version=users.c.data_version + 1)
+    )
+
+
+def shared_metadata_bump(
+    user_id: str,
+    videos: Optional[dict[str, dict[str, Optional[str]]]] = None,
+    channels: Optional[dict[str, dict[str, Optional[str]]]] = None,
+) -> Optional[Update]:
+    """Return an UPDATE bumping other users who see the changed rows.
+
+    Archive listings embed the shared video and channel rows, so their
+    ETags only stay version-only if a metadata change also bumps everyone
+    who archived an affected video. ``videos`` maps video IDs to archive
+    metadata, whose None fields are left alone; ``channels`` maps channel
+    IDs to the exact title and thumbnail about to be written. The UPDATE
+    compares against the current rows, so it must run before the upserts.
+    Returns None when nothing would be written.
+    """
+    video_table = Video.__table__
+    channel_table = Channel.__table__
+    target = video_table.alias('target_video')
+    changed = []
+    for video_id, metadata in (videos or {}).items():
+        changed.append(_differs(video_table, video_id, {
+            'title': metadata['title'] or None,
+            'thumbnail_url': metadata['thumbnail_url'],
+            'channel_id': metadata['channel_id'],
+        }))
+        channel_id = metadata['channel_id'] or (
+            select(target.c.channel_id)
+            .where(target.c.id == video_id)
+            .scalar_subquery()
+        )
+        changed.append(_differs(channel_table, channel_id, {
+            'title': metadata['channel_title'] or None,
+            'thumbnail_url': metadata['channel_thumbnail_url'],
+        }))
+    for channel_id, payload in (channels or {}).items():
+        changed.append(_differs(channel_table, channel_id, dict(payload), (
+            'title', 'thumbnail_url',
+        )))
+    changed = [clause for clause in changed if clause is not None]
+    if not changed:
+        return None
+    archives = Archive.__table__
+    users = User.__table__
+    readers = (
+        select(archives.c.user_id)
+        .join(video_table, video_table.c.id == archives.c.video_id)
+        .join(channel_table, channel_table.c.id == video_table.c.channel_id)
+        .where(or_(*changed))
+    )
+    return (
+        update(users)
+        .where(users.c.id != user_id, users.c.id.in_(readers))
+        .values(data_version=users.c.data_version + 1)
+    )
+
+
+def _differs(
+    table: Any,
+    row_id: Any,
+    values: dict[str, Optional[str]],
+    always: tuple[str, ...] = (),
+):
+    """Match ``row_id`` when a non-None (or ``always``) value would change."""
+    diffs = [
+        table.c[column].is_distinct_from(value)
+        for column, value in values.items()
+        if value is not None or column in always
+    ]
+    if not diffs:
+        return None
+    return and_(table.c.id == row_id, or_(*diffs))
+
+
+def bump_shared_metadata_readers(
+    session: Any,
+    user_id: str,
+    videos: Optional[dict[str, dict[str, Optional[str]]]] = None,
+    channels: Optional[dict[str, dict[str, Optional[str]]]] = None,
+) -> None:
+    """Run ``shared_metadata_bump`` when there is anything to compare."""
+    stmt = shared_metadata_bump(user_id, videos, channels)
+    if stmt is not None:
+        session.execute(stmt)
+
+
+def touch_user(session: Any, user_id: str) -> None:
+    """Create the user row if needed and bump its data version."""
+    di = _dialect_insert(session)
+    if di is not None:
+        session.execute(_touch_user_insert(di, user_id))
+        return
+    ensure_user_exists(session, user_id)
+    bump_data_version(session, user_id)
+
+
+def ensure_user_plan_tier(session: Any, user_id: str) -> str:
+    """Touch the user row as ``touch_user`` does and return its plan tier."""
+    di = _dialect_insert(session)
+    if di is not None:
+        stmt = _touch_user_insert(di, user_id).returning(
+            User.__table__.c.plan_tier
+        )
+        return session.execute(stmt).scalar_one()
+
+    touch_user(session, user_id)
+    user = session.query(User).filter(User.id == user_id).first()
+    return user.plan_tier if user is not None else 'free'
+
+
 def upsert_user_profile(
     session: Any,
     *,
     user_id: str,
     email: Optional[str],
-) -> User:
-    """Create or update the user profile row."""
+) -> Any:
+    """Create or update the user profile row.
+
+    Returns an object with ``id``, ``email`` and ``plan_tier``.
+    """
     di = _dialect_insert(session)
     if di is not None:
+        users = User.__table__
         stmt = (
-            di(User.__table__)
-            .values(id=user_id, email=email, plan_tier='free')
+            di(users)
+            .values(
+                id=user_id, email=email, plan_tier='free', data_version=1,
+            )
             .on_conflict_do_update(
                 index_elements=['id'],
-                set_={'email': email},
+                set_={
+                    'email': email,
+                    'data_version': users.c.data_version + 1,
+                },
             )
+            .returning(users.c.id, users.c.email, users.c.plan_tier)
         )
-        session.execute(stmt)
-        user = session.query(User).filter(User.id == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=500, detail='user upsert failed')
-        return user
+        return session.execute(stmt).one()
 
     user = session.query(User).filter(User.id == user_id).first()
     if user is None:
@@ -153,14 +324,74 @@ def upsert_user_profile(
             id=user_id,
             email=email,
             plan_tier='free',
+            data_version=1,
         )
         session.add(user)
         session.flush()
     else:
         user.email = email
+        user.data_version += 1
     return user
 
 
+def selection_query(user_id: str) -> Select:
+    """Return one statement yielding selected channel IDs and plan tier.
+
+    Each row carries the user's plan tier from a scalar subquery. When no
+    channel is selected there are no rows, and the plan tier is moot.
+    """
+    plan_tier = (
+        select(User.plan_tier).where(User.id == user_id).scalar_subquery()
+    )
+    return (
+        select(UserChannel.channel_id, plan_tier.label('plan_tier'))
+        .where(
+            UserChannel.user_id == user_id,
+            UserChannel.is_selected.is_(True),
+        )
+        .order_by(UserChannel.channel_id.asc())
+    )
+
+
+def selection_from_rows(rows: Any) -> tuple[Optional[str], list[str]]:
+    """Split ``selection_query`` rows into plan tier and channel IDs."""
+    rows = list(rows)
+    plan_tier = rows[0].plan_tier if rows else None
+    return plan_tier, [row.channel_id for row in rows]
+
+
+def load_selection(
+    session: Any,
+    user_id: str,
+) -> tuple[Optional[str], list[str]]:
+    """Return the user's plan tier and selected channel IDs."""
+    return selection_from_rows(session.execute(selection_query(user_id)))
+
+
+def user_state_query(user_id: str) -> Select:
+    """Return a statement selecting the synced app state columns."""
+    return select(
+        UserState.selection_change_day,
+        UserState.selection_changes_today,
+        UserState.opened_video_ids,
+    ).where(UserState.user_id == user_id)
+
+
+def load_user_state(session: Any, user_id: str) -> Optional[Row]:
+    """Return the user's synced app state columns, or None."""
+    return session.execute(user_state_query(user_id)).first()
+
+
+def data_version_query(user_id: str) -> Select:
+    """Return a statement selecting the user's data version."""
+    return select(User.data_version).where(User.id == user_id)
+
+
+def load_data_version(session: Any, user_id: str) -> int:
+    """Return the user's data version, or 0 when the user does not exist."""
+    return session.execute(data_version_query(user_id)).scalar() or 0
+
+
 # ---------------------------------------------------------------------------
 # Channel helpers
 # ---------------------------------------------------------------------------
@@ -168,13 +399,22 @@ def upsert_user_profile(
 def upsert_channels(
     session: Any,
     normalized_channels: dict[str, dict[str, Optional[str]]],
+    *,
+    user_id: str,
 ) -> None:
-    """Upsert the channel metadata set sent by the client."""
+    """Upsert the channel metadata set sent by ``user_id``.
+
+    Other users whose archives show a channel that changes are bumped.
+    """
     channel_ids = set(normalized_channels.keys())
     if not channel_ids:
         return
 
-    if _is_postgres_session(session) and POSTGRES_INSERT is not None:
+    bump_shared_metadata_readers(
+        session, user_id, channels=normalized_channels,
+    )
+    di = _dialect_insert(session)
+    if di is not None:
         values = [
             {
                 'id': channel_id,
@@ -184,7 +424,7 @@ def upsert_channels(
             }
             for channel_id, payload in normalized_channels.items()
         ]
-        insert_stmt = POSTGRES_INSERT(Channel.__table__).values(values)
+        insert_stmt = di(Channel.__table__).values(values)
         stmt = insert_stmt.on_conflict_do_update(
             index_elements=['id'],
             set_={
@@ -356,6 +596,656 @@ def upsert_archive_video(
         video.thumbnail_url = metadata['thumbnail_url']
 
 
+def supports_upsert(session: Any) -> bool:
+    """Return True when the session's dialect has ON CONFLICT upserts."""
+    return _dialect_insert(session) is not None
+
+
+def _now_literal():
+    # Explicit timestamps: column defaults cannot be bound inside a CTE.
+    return literal(datetime.now(timezone.utc), DateTime(timezone=True))
+
+
+def _channel_upsert(
+    di: Any,
+    video_id: str,
+    metadata: dict[str, Optional[str]],
+):
+    """Upsert the archive's channel, resolved like ``upsert_archive_video``.
+
+    The channel is the one sent by the client, else the one the video
+    already belongs to, else the placeholder channel.
+    """
+    channels = Channel.__table__
+    videos = Video.__table__
+    resolved = select(
+        coalesce(
+            literal(metadata['channel_id'], String),
+            select(videos.c.channel_id)
+            .where(videos.c.id == video_id)
+            .scalar_subquery(),
+            literal(ARCHIVE_PLACEHOLDER_CHANNEL_ID, String),
+        ).label('id')
+    ).subquery('resolved_channel')
+    stmt = di(channels).from_select(
+        ['id', 'youtube_channel_id', 'title', 'thumbnail_url', 'created_at'],
+        # ``WHERE true`` keeps SQLite from parsing ON CONFLICT as a join.
+        select(
+            resolved.c.id,
+            resolved.c.id,
+            literal(
+                metadata['channel_title'] or ARCHIVE_PLACEHOLDER_CHANNEL_TITLE,
+                String,
+            ),
+            literal(metadata['channel_thumbnail_url'], Text),
+            _now_literal(),
+        ).where(true()),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={
+            'title': coalesce(
+                literal(metadata['channel_title'], String),
+                func.nullif(channels.c.title, ''),
+                ARCHIVE_PLACEHOLDER_CHANNEL_TITLE,
+            ),
+            'thumbnail_url': coalesce(
+                literal(metadata['channel_thumbnail_url'], Text),
+                channels.c.thumbnail_url,
+            ),
+        },
+    ).returning(channels.c.id, channels.c.title, channels.c.thumbnail_url)
+
+
+def _video_upsert(
+    di: Any,
+    video_id: str,
+    channel_id: Any,
+    metadata: dict[str, Optional[str]],
+    source: Any = None,
+):
+    videos = Video.__table__
+    row = select(
+        literal(video_id, String),
+        literal(video_id[:32], String),
+        channel_id,
+        literal(
+            metadata['title'] or ARCHIVE_PLACEHOLDER_VIDEO_TITLE, String,
+        ),
+        literal(metadata['thumbnail_url'], Text),
+        _now_literal(),
+    )
+    row = row.select_from(source) if source is not None else row
+    stmt = di(videos).from_select(
+        [
+            'id',
+            'youtube_id',
+            'channel_id',
+            'title',
+            'thumbnail_url',
+            'created_at',
+        ],
+        row.where(true()),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={
+            'channel_id': stmt.excluded.channel_id,
+            'title': coalesce(
+                literal(metadata['title'], String),
+                func.nullif(videos.c.title, ''),
+                ARCHIVE_PLACEHOLDER_VIDEO_TITLE,
+            ),
+            'thumbnail_url': coalesce(
+                literal(metadata['thumbnail_url'], Text),
+                videos.c.thumbnail_url,
+            ),
+        },
+    ).returning(
+        videos.c.id,
+        videos.c.channel_id,
+        videos.c.title,
+        videos.c.thumbnail_url,
+    )
+
+
+def _archive_insert(di: Any, user_id: str, video_id: Any, source: Any = None):
+    archives = Archive.__table__
+    row = select(literal(user_id, String), video_id, _now_literal())
+    row = row.select_from(source) if source is not None else row
+    stmt = di(archives).from_select(
+        ['user_id', 'video_id', 'archived_at'], row.where(true()),
+    )
+    # A no-op update lets RETURNING report an archive that already existed.
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'video_id'],
+        set_={'archived_at': archives.c.archived_at},
+    ).returning(archives.c.video_id, archives.c.archived_at)
+
+
+def upsert_archive(
+    session: Any,
+    user_id: str,
+    video_id: str,
+    metadata: dict[str, Optional[str]],
+) -> dict[str, Any]:
+    """Archive a video and return the response row in few round trips.
+
+    Postgres runs the user, channel, video and archive upserts, plus the
+    ``shared_metadata_bump`` of other archivers, as one statement of
+    chained CTEs. SQLite cannot run DML inside a CTE, so it issues the
+    same statements one by one, each reporting its row with RETURNING.
+    Callers check ``supports_upsert`` first.
+    """
+    di = _dialect_insert(session)
+    user_stmt = _touch_user_insert(di, user_id)
+    channel_stmt = _channel_upsert(di, video_id, metadata)
+    readers_stmt = shared_metadata_bump(user_id, {video_id: metadata})
+    if _dialect_name(session) == 'postgresql':
+        channel = channel_stmt.cte('archive_channel')
+        video = _video_upsert(
+            di, video_id, channel.c.id, metadata, source=channel,
+        ).cte('archive_video')
+        archive = _archive_insert(
+            di, user_id, video.c.id, source=video,
+        ).cte('archive_row')
+        query = (
+            select(
+                video.c.channel_id,
+                video.c.title,
+                video.c.thumbnail_url,
+                archive.c.archived_at,
+                channel.c.title.label('channel_title'),
+                channel.c.thumbnail_url.label('channel_thumbnail_url'),
+            )
+            .select_from(video)
+            .join(archive, archive.c.video_id == video.c.id)
+            .join(channel, channel.c.id == video.c.channel_id)
+            .add_cte(user_stmt.cte('archive_user'))
+        )
+        if readers_stmt is not None:
+            # Every CTE sees the snapshot from before the upserts.
+            query = query.add_cte(readers_stmt.cte('archive_readers'))
+        row = session.execute(query).one()
+        return _archive_response(video_id, row, row.archived_at, (
+            row.channel_title, row.channel_thumbnail_url,
+        ))
+
+    session.execute(user_stmt)
+    if readers_stmt is not None:
+        session.execute(readers_stmt)
+    channel = session.execute(channel_stmt).one()
+    video = session.execute(
+        _video_upsert(di, video_id, literal(channel.id, String), metadata)
+    ).one()
+    archived_at = session.execute(
+        _archive_insert(di, user_id, literal(video_id, String))
+    ).one().archived_at
+    return _archive_response(video_id, video, archived_at, (
+        channel.title, channel.thumbnail_url,
+    ))
+
+
+def _archive_response(
+    video_id: str,
+    video: Any,
+    archived_at: datetime,
+    channel: tuple[str, Optional[str]],
+) -> dict[str, Any]:
+    return {
+        'archived': True,
+        'video_id': video_id,
+        'archived_at': int(archived_at.timestamp() * 1000),
+        'title': video.title,
+        'thumbnail_url': video.thumbnail_url,
+        'channel_id': video.channel_id,
+        'channel_title': channel[0],
+        'channel_thumbnail_url': channel[1],
+    }
+
+
+def delete_archive(session: Any, user_id: str, video_id: str) -> bool:
+    """Delete one archive row, touching the user row as toggles always do.
+
+    Returns True when a row was deleted. Callers check ``supports_upsert``
+    first.
+    """
+    di = _dialect_insert(session)
+    archives = Archive.__table__
+    stmt = (
+        delete(archives)
+        .where(archives.c.user_id == user_id, archives.c.video_id == video_id)
+        .returning(archives.c.id)
+    )
+    if _dialect_name(session) == 'postgresql':
+        user_cte = _touch_user_insert(di, user_id).cte('archive_user')
+        stmt = stmt.add_cte(user_cte)
+    else:
+        session.execute(_touch_user_insert(di, user_id))
+    return session.execute(stmt).first() is not None
+
+
+def apply_archive_batch(
+    session: Any,
+    user_id: str,
+    changes: list[tuple[str, bool, dict[str, Optional[str]]]],
+) -> list[dict[str, Any]]:
+    """Apply ``(video_id, archived, metadata)`` changes in one transaction.
+
+    With dialect upserts the statement count does not grow with the batch:
+    the user is touched once, the targets' videos and channels are read in
+    two SELECTs, then channels, videos and archives are upserted and the
+    unarchived rows deleted with one multi-row statement each. Results
+    follow the order of ``changes``, whose video IDs must be unique.
+    """
+    di = _dialect_insert(session)
+    if di is None:
+        return _apply_archive_batch_orm(session, user_id, changes)
+    session.execute(_touch_user_insert(di, user_id))
+    targets = {
+        video_id: metadata
+        for video_id, archived, metadata in changes
+        if archived
+    }
+    removed = [video_id for video_id, archived, _ in changes if not archived]
+    responses = (
+        _bulk_upsert_archives(session, di, user_id, targets)
+        if targets
+        else {}
+    )
+    if removed:
+        archives = Archive.__table__
+        session.execute(
+            delete(archives).where(
+                archives.c.user_id == user_id,
+                archives.c.video_id.in_(removed),
+            )
+        )
+    return [
+        responses[video_id]
+        if archived
+        else {'archived': False, 'video_id': video_id}
+        for video_id, archived, _ in changes
+    ]
+
+
+def _bulk_upsert_archives(
+    session: Any,
+    di: Any,
+    user_id: str,
+    targets: dict[str, dict[str, Optional[str]]],
+) -> dict[str, dict[str, Any]]:
+    """Archive ``targets`` and return their responses by video ID.
+
+    Channels and metadata resolve as in ``upsert_archive_video``, against
+    rows read up front; the upserts then write the merged values.
+    """
+    bump_shared_metadata_readers(session, user_id, targets)
+    channels = Channel.__table__
+    videos = Video.__table__
+    archives = Archive.__table__
+    video_rows = {
+        video_id: {
+            'id': video_id,
+            'youtube_id': video_id[:32],
+            'channel_id': metadata['channel_id'],
+            'title': None,
+            'thumbnail_url': None,
+        }
+        for video_id, metadata in targets.items()
+    }
+    for row in session.execute(
+        select(
+            videos.c.id,
+            videos.c.channel_id,
+            videos.c.title,
+            videos.c.thumbnail_url,
+        ).where(videos.c.id.in_(list(targets)))
+    ):
+        current = video_rows[row.id]
+        current['channel_id'] = current['channel_id'] or row.channel_id
+        current['title'] = row.title
+        current['thumbnail_url'] = row.thumbnail_url
+
+    channel_rows: dict[str, dict[str, Any]] = {}
+    for video in video_rows.values():
+        video['channel_id'] = (
+            video['channel_id'] or ARCHIVE_PLACEHOLDER_CHANNEL_ID
+        )
+        channel_rows.setdefault(video['channel_id'], {
+            'id': video['channel_id'],
+            'youtube_channel_id': video['channel_id'],
+            'title': None,
+            'thumbnail_url': None,
+        })
+    for row in session.execute(
+        select(channels.c.id, channels.c.title, channels.c.thumbnail_url)
+        .where(channels.c.id.in_(list(channel_rows)))
+    ):
+        channel_rows[row.id]['title'] = row.title
+        channel_rows[row.id]['thumbnail_url'] = row.thumbnail_url
+
+    for video_id, metadata in targets.items():
+        video = video_rows[video_id]
+        _merge_archive_metadata(
+            video,
+            metadata['title'],
+            metadata['thumbnail_url'],
+            ARCHIVE_PLACEHOLDER_VIDEO_TITLE,
+        )
+        _merge_archive_metadata(
+            channel_rows[video['channel_id']],
+            metadata['channel_title'],
+            metadata['channel_thumbnail_url'],
+            ARCHIVE_PLACEHOLDER_CHANNEL_TITLE,
+        )
+
+    channel_stmt = di(channels).values(list(channel_rows.values()))
+    channel_by_id = {
+        row.id: row
+        for row in session.execute(
+            channel_stmt.on_conflict_do_update(
+                index_elements=['id'],
+                set_={
+                    'title': channel_stmt.excluded.title,
+                    'thumbnail_url': channel_stmt.excluded.thumbnail_url,
+                },
+            ).returning(
+                channels.c.id, channels.c.title, channels.c.thumbnail_url,
+            )
+        )
+    }
+    video_stmt = di(videos).values(list(video_rows.values()))
+    video_by_id = {
+        row.id: row
+        for row in session.execute(
+            video_stmt.on_conflict_do_update(
+                index_elements=['id'],
+                set_={
+                    'channel_id': video_stmt.excluded.channel_id,
+                    'title': video_stmt.excluded.title,
+                    'thumbnail_url': video_stmt.excluded.thumbnail_url,
+                },
+            ).returning(
+                videos.c.id,
+                videos.c.channel_id,
+                videos.c.title,
+                videos.c.thumbnail_url,
+            )
+        )
+    }
+    archive_stmt = di(archives).values([
+        {'user_id': user_id, 'video_id': video_id} for video_id in targets
+    ])
+    # A no-op update lets RETURNING report archives that already existed.
+    archived_at_by_id = {
+        row.video_id: row.archived_at
+        for row in session.execute(
+            archive_stmt.on_conflict_do_update(
+                index_elements=['user_id', 'video_id'],
+                set_={'archived_at': archives.c.archived_at},
+            ).returning(archives.c.video_id, archives.c.archived_at)
+        )
+    }
+    responses = {}
+    for video_id in targets:
+        video = video_by_id[video_id]
+        channel = channel_by_id[video.channel_id]
+        responses[video_id] = _archive_response(
+            video_id,
+            video,
+            archived_at_by_id[video_id],
+            (channel.title, channel.thumbnail_url),
+        )
+    return responses
+
+
+def _merge_archive_metadata(
+    row: dict[str, Any],
+    title: Optional[str],
+    thumbnail_url: Optional[str],
+    placeholder_title: str,
+) -> None:
+    row['title'] = title or row['title'] or placeholder_title
+    if thumbnail_url is not None:
+        row['thumbnail_url'] = thumbnail_url
+
+
+def _apply_archive_batch_orm(
+    session: Any,
+    user_id: str,
+    changes: list[tuple[str, bool, dict[str, Optional[str]]]],
+) -> list[dict[str, Any]]:
+    touch_user(session, user_id)
+    return [
+        _toggle_archive_orm(session, user_id, video_id, metadata, archived)
+        for video_id, archived, metadata in changes
+    ]
+
+
+def toggle_archive_row(
+    session: Any,
+    user_id: str,
+    video_id: str,
+    metadata: dict[str, Optional[str]],
+    archived: Optional[bool],
+) -> dict[str, Any]:
+    """Set or flip one archive; ``archived=None`` toggles.
+
+    Dialects with upserts take one statement on Postgres to archive and
+    one to unarchive; others go through the ORM.
+    """
+    if not supports_upsert(session):
+        touch_user(session, user_id)
+        return _toggle_archive_orm(
+            session, user_id, video_id, metadata, archived,
+        )
+    if archived is not True:
+        if delete_archive(session, user_id, video_id) or archived is False:
+            return {'archived': False, 'video_id': video_id}
+    return upsert_archive(session, user_id, video_id, metadata)
+
+
+def _toggle_archive_orm(
+    session: Any,
+    user_id: str,
+    video_id: str,
+    metadata: dict[str, Optional[str]],
+    archived: Optional[bool],
+) -> dict[str, Any]:
+    existing = (
+        session.query(Archive)
+        .filter(Archive.user_id == user_id, Archive.video_id == video_id)
+        .first()
+    )
+    if not (archived if archived is not None else existing is None):
+        if existing is not None:
+            session.delete(existing)
+        return {'archived': False, 'video_id': video_id}
+    bump_shared_metadata_readers(session, user_id, {video_id: metadata})
+    upsert_archive_video(session, video_id, metadata)
+    if existing is None:
+        existing = Archive(user_id=user_id, video_id=video_id)
+        session.add(existing)
+    session.flush()
+    return build_db_archive_response(session, video_id, existing, metadata)
+
+
+ArchiveWindow = tuple[Optional[datetime], Optional[datetime]]
+
+
+def archive_page_query(
+    user_id: str,
+    *,
+    limit: Optional[int],
+    after: Optional[tuple[datetime, int]] = None,
+    window: ArchiveWindow = (None, None),
+) -> Select:
+    """Return one page of a user's archives, newest first.
+
+    Rows are keyed on ``(archived_at, id)`` so the scan walks
+    ``ix_archives_user_archived_at`` from the cursor instead of skipping
+    an offset, and stays within ``window`` when one is given. One extra
+    row is fetched to tell whether a next page exists; a ``limit`` of None
+    returns every row.
+    """
+    stmt = _within_window(
+        select(Archive).where(Archive.user_id == user_id), window,
+    )
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(Archive.archived_at, Archive.id) < tuple_(*after)
+        )
+    stmt = stmt.order_by(Archive.archived_at.desc(), Archive.id.desc())
+    return stmt if limit is None else stmt.limit(limit + 1)
+
+
+def _within_window(stmt: Select, window: ArchiveWindow) -> Select:
+    """Limit ``stmt`` to archives in the ``[since, until)`` window."""
+    since, until = window
+    if since is not None:
+        stmt = stmt.where(Archive.archived_at >= since)
+    if until is not None:
+        stmt = stmt.where(Archive.archived_at < until)
+    return stmt
+
+
+def split_archive_page(
+    archives: list[Archive],
+    limit: Optional[int],
+) -> tuple[list[Archive], Optional[str]]:
+    """Drop the look-ahead row and return the page and its next cursor."""
+    if limit is None or len(archives) <= limit:
+        return archives, None
+    page = archives[:limit]
+    return page, encode_archive_cursor(page[-1].archived_at, page[-1].id)
+
+
+def load_archive_page(
+    session: Any,
+    user_id: str,
+    *,
+    limit: Optional[int],
+    after: Optional[tuple[datetime, int]] = None,
+    window: ArchiveWindow = (None, None),
+) -> dict[str, Any]:
+    """Return one page of archive items and the cursor for the next."""
+    archives = list(
+        session.scalars(
+            archive_page_query(
+                user_id, limit=limit, after=after, window=window,
+            )
+        )
+    )
+    page, next_cursor = split_archive_page(archives, limit)
+    return {
+        'items': serialize_archive_items(session, page),
+        'next_cursor': next_cursor,
+    }
+
+
+def archive_calendar_query(
+    user_id: str,
+    *,
+    window: ArchiveWindow,
+    offset_minutes: int,
+    dialect: str,
+) -> Select:
+    """Return ``(day, count)`` rows of a user's archives within ``window``.
+
+    The window bounds the scan on ``ix_archives_user_archived_at`` and
+    archives are bucketed into days ``offset_minutes`` from UTC in SQL, so
+    the result has at most one row per day of the window.
+    """
+    if dialect == 'postgresql':
+        local_day = func.to_char(
+            func.timezone('UTC', Archive.archived_at)
+            + timedelta(minutes=offset_minutes),
+            'YYYY-MM-DD',
+        )
+    else:
+        local_day = func.date(
+            Archive.archived_at, f'{offset_minutes:+d} minutes',
+        )
+    days = _within_window(
+        select(local_day.label('day')).where(Archive.user_id == user_id),
+        window,
+    ).subquery('archive_days')
+    return (
+        select(days.c.day, count().label('count'))
+        .group_by(days.c.day)
+        .order_by(days.c.day)
+    )
+
+
+def archive_calendar_response(rows: Any) -> dict[str, Any]:
+    """Shape ``archive_calendar_query`` rows for the calendar endpoint."""
+    return {'days': [{'day': day, 'count': count} for day, count in rows]}
+
+
+def load_archive_calendar(
+    session: Any,
+    user_id: str,
+    *,
+    window: ArchiveWindow,
+    offset_minutes: int,
+) -> dict[str, Any]:
+    """Return a user's per-day archive counts within ``window``."""
+    return archive_calendar_response(
+        session.execute(
+            archive_calendar_query(
+                user_id,
+                window=window,
+                offset_minutes=offset_minutes,
+                dialect=_dialect_name(session),
+            )
+        )
+    )
+
+
+def build_db_archive_response(
+    session: Any,
+    video_id: str,
+    archive: Archive,
+    metadata: dict[str, Optional[str]],
+) -> dict[str, Any]:
+    """Build an archive response dict from DB records."""
+    video = session.query(Video).filter(Video.id == video_id).first()
+    channel = (
+        session.query(Channel).filter(Channel.id == video.channel_id).first()
+        if video is not None
+        else None
+    )
+    return {
+        'archived': True,
+        'video_id': video_id,
+        'archived_at': int(archive.archived_at.timestamp() * 1000),
+        'title': (
+            video.title if video is not None
+            else (metadata.get('title') or ARCHIVE_PLACEHOLDER_VIDEO_TITLE)
+        ),
+        'thumbnail_url': (
+            video.thumbnail_url if video is not None
+            else metadata.get('thumbnail_url')
+        ),
+        'channel_id': (
+            video.channel_id if video is not None
+            else (metadata.get('channel_id') or ARCHIVE_PLACEHOLDER_CHANNEL_ID)
+        ),
+        'channel_title': (
+            channel.title if channel is not None
+            else (
+                metadata.get('channel_title')
+                or ARCHIVE_PLACEHOLDER_CHANNEL_TITLE
+            )
+        ),
+        'channel_thumbnail_url': (
+            channel.thumbnail_url if channel is not None
+            else metadata.get('channel_thumbnail_url')
+        ),
+    }
+
+
 def serialize_archive_items(
     session: Any,
     archives: list[Archive],
@@ -374,7 +1264,15 @@ def serialize_archive_items(
         else []
     )
     channels_by_id = {channel.id: channel for channel in channels}
+    return build_archive_items(archives, videos_by_id, channels_by_id)
 
+
+def build_archive_items(
+    archives: list[Archive],
+    videos_by_id: dict[str, Video],
+    channels_by_id: dict[str, Channel],
+) -> list[dict[str, Any]]:
+    """Build archive response items from preloaded videos and channels."""
     items = []
     for archived in archives:
         video = videos_by_id.get(archived.video_id)
@@ -407,6 +1305,56 @@ def serialize_archive_items(
     return items
 
 
+def user_response(user: Optional[User]) -> dict[str, Any]:
+    """Return the profile response for ``user``, or raise 404."""
+    if user is None:
+        raise HTTPException(status_code=404, detail='user not found')
+    return {
+        'user_id': user.id,
+        'email': user.email,
+        'plan_tier': user.plan_tier,
+    }
+
+
+def user_state_response(state: Optional[Any]) -> dict[str, Any]:
+    """Return the synced app state response, with defaults for no row."""
+    if state is None:
+        return {
+            'selection_change_day': 0,
+            'selection_changes_today': 0,
+            'opened_video_ids': [],
+        }
+    try:
+        raw_ids = json.loads(state.opened_video_ids or '[]')
+        if not isinstance(raw_ids, list):
+            raw_ids = []
+    except ValueError:
+        raw_ids = []
+    opened_video_ids = normalize_opened_video_ids(
+        [str(item) for item in raw_ids]
+    )
+    return {
+        'selection_change_day': sanitize_selection_change_day(
+            state.selection_change_day
+        ),
+        'selection_changes_today': sanitize_selection_changes_today(
+            state.selection_changes_today
+        ),
+        'opened_video_ids': opened_video_ids,
+    }
+
+
+def selection_response(
+    plan_tier: Optional[str],
+    selected_ids: list[str],
+) -> dict[str, Any]:
+    """Return selected channel IDs trimmed to the plan limit."""
+    limit = channel_limit_for_plan_tier(plan_tier or 'free')
+    if limit is not None and len(selected_ids) > limit:
+        selected_ids = selected_ids[:limit]
+    return {'selected_ids': selected_ids}
+
+
 # ---------------------------------------------------------------------------
 # User-state helpers
 # ---------------------------------------------------------------------------
@@ -462,3 +1410,87 @@ def upsert_user_state_row(
     state.opened_video_ids = encoded_opened_video_ids
     state.updated_at = now
     session.add(state)
+
+
+# ---------------------------------------------------------------------------
+# Rate-limit counters
+# ---------------------------------------------------------------------------
+
+def increment_rate_limit_counter(
+    session: Any,
+    bucket_key: str,
+    *,
+    window_start: int,
+    expires_at: float,
+    cost: int = 1,
+) -> int:
+    """Add ``cost`` to the current window and return the window total.
+
+    A row left over from an earlier window is reset in the same statement,
+    so concurrent instances never lose increments.
+    """
+    di = _dialect_insert(session)
+    if di is not None:
+        table = RateLimitCounter.__table__
+        stmt = di(table).values(
+            bucket_key=bucket_key,
+            window_start=window_start,
+            hits=cost,
+            expires_at=expires_at,
+        )
+        same_window = table.c.window_start == stmt.excluded.window_start
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['bucket_key'],
+            set_={
+                'hits': case(
+                    (same_window, table.c.hits + cost),
+                    else_=cost,
+                ),
+                'window_start': stmt.excluded.window_start,
+                'expires_at': stmt.excluded.expires_at,
+            },
+        ).returning(table.c.hits)
+        return int(session.execute(stmt).scalar_one())
+
+    counter = (
+        session.query(RateLimitCounter)
+        .filter(RateLimitCounter.bucket_key == bucket_key)
+        .with_for_update()
+        .first()
+    )
+    if counter is None:
+        counter = RateLimitCounter(bucket_key=bucket_key, hits=0)
+    if counter.window_start != window_start:
+        counter.window_start = window_start
+        counter.hits = 0
+    counter.hits += cost
+    counter.expires_at = expires_at
+    session.add(counter)
+    session.flush()
+    return counter.hits
+
+
+def refund_rate_limit_counter(
+    session: Any,
+    bucket_key: str,
+    *,
+    window_start: int,
+    cost: int,
+) -> None:
+    """Take back a charge made earlier in the same transaction."""
+    session.execute(
+        update(RateLimitCounter)
+        .where(
+            RateLimitCounter.bucket_key == bucket_key,
+            RateLimitCounter.window_start == window_start,
+        )
+        .values(hits=RateLimitCounter.hits - cost)
+    )
+
+
+def delete_expired_rate_limit_counters(session: Any, now: float) -> int:
+    """Remove counters whose window has closed."""
+    result = session.execute(
+        delete(RateLimitCounter).where(RateLimitCounter.expires_at < now)
+    )
+    return result.rowcount or 0
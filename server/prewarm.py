@@ -0,0 +1,374 @@
+"""Background pre-warming of transcripts for new uploads on selected channels.
+
+The scheduler periodically takes the union of channels that any user has
+selected, asks a feed source for their recent uploads and runs the
+transcript + summary pipeline ahead of time, so that the first real open
+of a new video is a cache hit.
+
+Spend is capped by ``PREWARM_COST_BUDGET`` over a rolling
+``PREWARM_COST_WINDOW_SECONDS`` window rather than per cycle. Only jobs
+that actually fetched captions or ran Whisper are charged; cache hits and
+failures cost nothing.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import (
+    ARCHIVE_PLACEHOLDER_CHANNEL_ID,
+    CHANNEL_ID_PATTERN,
+    PREWARM_ALLOW_AUDIO,
+    PREWARM_AUDIO_COST,
+    PREWARM_CAPTIONS_COST,
+    PREWARM_COST_BUDGET,
+    PREWARM_COST_WINDOW_SECONDS,
+    PREWARM_FEED_TIMEOUT_SECONDS,
+    PREWARM_FEED_URL,
+    PREWARM_INTERVAL_SECONDS,
+    PREWARM_MAX_CONCURRENCY,
+    PREWARM_MAX_VIDEO_AGE_SECONDS,
+    PREWARM_MAX_VIDEOS_PER_CHANNEL,
+    PREWARM_RETRY_MAX_ATTEMPTS,
+    PREWARM_RETRY_MAX_BACKOFF_SECONDS,
+    PREWARM_SEEN_MAX_ITEMS,
+    USER_AGENT,
+    VIDEO_ID_PATTERN,
+)
+from .db import get_session, is_db_enabled
+from .models import UserChannel
+
+# Warm callbacks return the transcript source they produced ('captions',
+# 'whisper'), 'cached' when the entry was already hot, or None on failure.
+WarmVideo = Callable[[str, bool], Optional[str]]
+# Job result for uploads left for a later cycle by the cost budget.
+_OVER_BUDGET = 'over_budget'
+
+
+class FeedSource(ABC):
+    """Interface for listing the recent uploads of a channel."""
+
+    @abstractmethod
+    def recent_uploads(self, channel_id: str) -> list[dict]:
+        """Return ``{'video_id', 'published_at'}`` dicts, newest first."""
+
+
+class YouTubeFeedSource(FeedSource):
+    """Read recent uploads from the public YouTube channel RSS feed."""
+
+    def __init__(
+        self,
+        *,
+        feed_url: str = PREWARM_FEED_URL,
+        timeout_seconds: float = PREWARM_FEED_TIMEOUT_SECONDS,
+    ) -> None:
+        self._feed_url = feed_url
+        self._timeout_seconds = timeout_seconds
+
+    def recent_uploads(self, channel_id: str) -> list[dict]:
+        try:
+            response = requests.get(
+                self._feed_url,
+                params={'channel_id': channel_id},
+                headers={'User-Agent': USER_AGENT},
+                timeout=self._timeout_seconds,
+            )
+        except requests.RequestException:
+            return []
+        if response.status_code != 200 or not response.text:
+            return []
+        return parse_upload_feed(response.text)
+
+
+class StaticFeedSource(FeedSource):
+    """In-memory feed source used by tests and local development."""
+
+    def __init__(self, uploads: Optional[dict[str, list[dict]]] = None):
+        self._uploads = dict(uploads or {})
+
+    def set_uploads(self, channel_id: str, uploads: list[dict]) -> None:
+        """Replace the uploads reported for a channel."""
+        self._uploads[channel_id] = list(uploads)
+
+    def recent_uploads(self, channel_id: str) -> list[dict]:
+        return list(self._uploads.get(channel_id, []))
+
+
+def parse_upload_feed(raw: str) -> list[dict]:
+    """Parse a YouTube Atom feed into upload dicts."""
+    uploads = []
+    for entry in re.findall(r'<entry>(.*?)</entry>', raw, flags=re.DOTALL):
+        id_match = re.search(r'<yt:videoId>([^<]+)</yt:videoId>', entry)
+        if not id_match:
+            continue
+        video_id = id_match.group(1).strip()
+        if not VIDEO_ID_PATTERN.fullmatch(video_id):
+            continue
+        published_at = None
+        published_match = re.search(r'<published>([^<]+)</published>', entry)
+        if published_match:
+            try:
+                published_at = datetime.fromisoformat(
+                    published_match.group(1).strip()
+                ).timestamp()
+            except ValueError:
+                published_at = None
+        uploads.append({'video_id': video_id, 'published_at': published_at})
+    return uploads
+
+
+def load_selected_channel_ids() -> list[str]:
+    """Return the union of channels selected by any user."""
+    if not is_db_enabled():
+        return []
+    try:
+        with get_session() as session:
+            if session is None:
+                return []
+            rows = session.execute(
+                select(UserChannel.channel_id)
+                .where(UserChannel.is_selected.is_(True))
+                .distinct()
+            ).scalars()
+            return sorted(
+                channel_id
+                for channel_id in rows
+                if channel_id
+                and channel_id != ARCHIVE_PLACEHOLDER_CHANNEL_ID
+                and CHANNEL_ID_PATTERN.fullmatch(channel_id)
+            )
+    except SQLAlchemyError:
+        logging.exception('Failed to load selected channels for prewarm.')
+        return []
+
+
+class PrewarmScheduler:  # pylint: disable=too-many-instance-attributes
+    """Periodically warm the transcript cache for new uploads."""
+
+    def __init__(
+        self,
+        *,
+        feed_source: FeedSource,
+        warm_video: WarmVideo,
+        channel_loader: Callable[[], list[str]] = load_selected_channel_ids,
+        interval_seconds: int = PREWARM_INTERVAL_SECONDS,
+        max_concurrency: int = PREWARM_MAX_CONCURRENCY,
+        max_videos_per_channel: int = PREWARM_MAX_VIDEOS_PER_CHANNEL,
+        max_video_age_seconds: int = PREWARM_MAX_VIDEO_AGE_SECONDS,
+        cost_budget: int = PREWARM_COST_BUDGET,
+        cost_window_seconds: int = PREWARM_COST_WINDOW_SECONDS,
+        captions_cost: int = PREWARM_CAPTIONS_COST,
+        audio_cost: int = PREWARM_AUDIO_COST,
+        allow_audio: bool = PREWARM_ALLOW_AUDIO,
+    ) -> None:
+        self._feed_source = feed_source
+        self._warm_video = warm_video
+        self._channel_loader = channel_loader
+        self._interval_seconds = interval_seconds
+        self._max_concurrency = max(1, max_concurrency)
+        self._max_videos_per_channel = max_videos_per_channel
+        self._max_video_age_seconds = max_video_age_seconds
+        self._cost_budget = cost_budget
+        self._cost_window_seconds = cost_window_seconds
+        self._captions_cost = max(0, captions_cost)
+        self._audio_cost = max(self._captions_cost, audio_cost)
+        self._allow_audio = allow_audio
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        # video_id -> (failed attempts, earliest retry time).
+        self._retries: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        # (finished at, cost) of charged jobs inside the budget window.
+        self._spend: deque[tuple[float, int]] = deque()
+        self._reserved = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'cycles': 0,
+            'warmed': 0,
+            'already_cached': 0,
+            'failed': 0,
+            'abandoned': 0,
+            'skipped_budget': 0,
+            'cost_spent': 0,
+        }
+
+    def start(self) -> None:
+        """Start the background loop if it is not already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_forever,
+            name='transcript-prewarm',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal the background loop to stop and wait briefly for it."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, int]:
+        """Return a snapshot of the scheduler counters."""
+        with self._lock:
+            return dict(self._stats)
+
+    def run_once(self) -> int:
+        """Run a single warm cycle and return the number of videos warmed."""
+        candidates = self._collect_candidates()
+        with self._lock:
+            self._stats['cycles'] += 1
+        if not candidates:
+            return 0
+
+        # Every job reserves its worst-case cost up front, so the budget
+        # can never be overspent; settling refunds whatever it did not use.
+        reserve = self._audio_cost if self._allow_audio else self._captions_cost
+        warmed = 0
+
+        def _warm(video_id: str) -> Optional[str]:
+            # Reserve when the job starts, so jobs queued behind a cache
+            # hit or a failure can still use the budget it gave back.
+            if not self._try_reserve(reserve):
+                return _OVER_BUDGET
+            try:
+                source = self._warm_video(video_id, self._allow_audio)
+            except Exception:
+                logging.exception('Prewarm failed for %s.', video_id)
+                source = None
+            self._settle(reserve, self._job_cost(source))
+            return source
+
+        with ThreadPoolExecutor(
+            max_workers=self._max_concurrency,
+            thread_name_prefix='transcript-prewarm-job',
+        ) as executor:
+            futures = []
+            for video_id in candidates:
+                if self._stop_event.is_set():
+                    break
+                futures.append((video_id, executor.submit(_warm, video_id)))
+
+            for video_id, future in futures:
+                source = future.result()
+                if source == _OVER_BUDGET:
+                    continue
+                if source:
+                    self._mark_seen(video_id)
+                else:
+                    self._schedule_retry(video_id)
+                with self._lock:
+                    if source == 'cached':
+                        self._stats['already_cached'] += 1
+                    elif source:
+                        self._stats['warmed'] += 1
+                        warmed += 1
+                    else:
+                        self._stats['failed'] += 1
+        return warmed
+
+    def _job_cost(self, source: Optional[str]) -> int:
+        if source == 'whisper':
+            return self._audio_cost
+        if source == 'captions':
+            return self._captions_cost
+        return 0
+
+    def _try_reserve(self, reserve: int) -> bool:
+        """Hold ``reserve`` against the rolling budget, if it fits."""
+        with self._lock:
+            cutoff = time.time() - self._cost_window_seconds
+            while self._spend and self._spend[0][0] <= cutoff:
+                self._spend.popleft()
+            spent = sum(cost for _, cost in self._spend)
+            if spent + self._reserved + reserve > self._cost_budget:
+                self._stats['skipped_budget'] += 1
+                return False
+            self._reserved += reserve
+            return True
+
+    def _settle(self, reserve: int, cost: int) -> None:
+        with self._lock:
+            self._reserved -= reserve
+            if cost:
+                self._spend.append((time.time(), cost))
+                self._stats['cost_spent'] += cost
+
+    def _collect_candidates(self) -> list[str]:
+        now = time.time()
+        candidates: list[str] = []
+        queued: set[str] = set()
+        for channel_id in self._channel_loader():
+            if self._stop_event.is_set():
+                break
+            uploads = self._feed_source.recent_uploads(channel_id)
+            for upload in uploads[:max(0, self._max_videos_per_channel)]:
+                video_id = upload.get('video_id')
+                if not isinstance(video_id, str) or video_id in queued:
+                    continue
+                published_at = upload.get('published_at')
+                if (
+                    published_at is not None
+                    and self._max_video_age_seconds > 0
+                    and now - published_at > self._max_video_age_seconds
+                ):
+                    continue
+                with self._lock:
+                    if video_id in self._seen:
+                        continue
+                    retry = self._retries.get(video_id)
+                    if retry is not None and retry[1] > now:
+                        continue
+                queued.add(video_id)
+                candidates.append(video_id)
+        return candidates
+
+    def _mark_seen(self, video_id: str) -> None:
+        with self._lock:
+            self._retries.pop(video_id, None)
+            self._seen[video_id] = None
+            self._seen.move_to_end(video_id)
+            while len(self._seen) > PREWARM_SEEN_MAX_ITEMS:
+                self._seen.popitem(last=False)
+
+    def _schedule_retry(self, video_id: str) -> None:
+        """Back off a failed upload, or give up after too many attempts."""
+        with self._lock:
+            attempts = self._retries.pop(video_id, (0, 0.0))[0] + 1
+            if attempts >= PREWARM_RETRY_MAX_ATTEMPTS:
+                self._stats['abandoned'] += 1
+                abandoned = True
+            else:
+                backoff = min(
+                    PREWARM_RETRY_MAX_BACKOFF_SECONDS,
+                    self._interval_seconds * 2 ** (attempts - 1),
+                )
+                self._retries[video_id] = (attempts, time.time() + backoff)
+                while len(self._retries) > PREWARM_SEEN_MAX_ITEMS:
+                    self._retries.popitem(last=False)
+                abandoned = False
+        if abandoned:
+            self._mark_seen(video_id)
+
+    def _run_forever(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logging.exception('Prewarm cycle failed.')
+            self._stop_event.wait(self._interval_seconds)
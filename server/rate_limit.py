@@ -0,0 +1,424 @@
+"""Pluggable request rate limiting.
+
+Per-process buckets let a client through once per autoscaled instance, so
+the effective limit grows with the instance count. ``RATE_LIMIT_BACKEND``
+selects where the counters live:
+
+* ``memory`` keeps GCRA state in this process (the default).
+* ``postgres`` keeps fixed-window counters in ``rate_limit_counters`` and
+  increments them with one atomic upsert per request. Closed windows are
+  deleted by the cache sweeper, off the request path.
+* ``redis`` keeps fixed-window counters in a Redis-protocol store and
+  increments them with a script that sets the expiry on the first hit.
+
+Shared backends fall back to the in-memory buckets while they are failing,
+so an outage degrades to per-instance limits instead of rejecting or
+admitting everything.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import heapq
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_BUCKET_SHARDS,
+    RATE_LIMIT_MAX_BUCKETS,
+    RATE_LIMIT_REDIS_URL,
+    RATE_LIMIT_RETRY_SECONDS,
+    SHARED_CACHE_KEY_PREFIX,
+    SHARED_CACHE_POOL_SIZE,
+    SHARED_CACHE_TIMEOUT_SECONDS,
+)
+from .db import get_session
+from .persistence import (
+    increment_rate_limit_counter,
+    refund_rate_limit_counter,
+)
+from .redis_client import RedisClient, RedisError
+
+# Adds the cost to the window counter, sets its expiry when the key is
+# created and takes a denied charge back, in one round trip and
+# atomically on the server. ARGV: ttl ms, cost, limit, force flag.
+_REDIS_CHARGE_SCRIPT = (
+    "local cost = tonumber(ARGV[2]) "
+    "local hits = redis.call('INCRBY', KEYS[1], cost) "
+    "if redis.call('PTTL', KEYS[1]) < 0 then "
+    "redis.call('PEXPIRE', KEYS[1], ARGV[1]) end "
+    "if hits > tonumber(ARGV[3]) and ARGV[4] == '0' then "
+    "return {0, redis.call('DECRBY', KEYS[1], cost)} end "
+    "return {1, hits}"
+)
+
+
+class RateLimitBackendError(Exception):
+    """Raised when a shared rate-limit backend cannot count a request."""
+
+
+class RateLimitBackend(ABC):
+    """Interface for charging request costs against a per-key budget."""
+
+    @abstractmethod
+    def hit(
+        self,
+        key: str,
+        *,
+        limit: int,
+        window_seconds: int,
+        cost: int = 1,
+        force: bool = False,
+    ) -> tuple[bool, int]:
+        """Charge ``cost`` to ``key`` and return ``(allowed, remaining)``.
+
+        A charge that would exceed ``limit`` is refused and not recorded,
+        unless ``force`` is set: forced charges always apply, for work that
+        has already been done, and may leave the budget in debt.
+        """
+
+
+class _BucketShard:
+    """One lock's worth of GCRA state plus its expiry heap.
+
+    Every tracked key has exactly one heap entry. When an entry comes due
+    and the key's arrival time has moved on, it is pushed back with the
+    new deadline instead of being removed, so each request costs at most
+    one amortized heap operation.
+    """
+
+    __slots__ = ('lock', 'tats', 'expiry')
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.tats: dict[str, float] = {}
+        self.expiry: list[tuple[float, str]] = []
+
+    def expire(self, now: float) -> None:
+        """Drop keys whose allowance has fully refilled by ``now``."""
+        while self.expiry and self.expiry[0][0] <= now:
+            _, key = heapq.heappop(self.expiry)
+            tat = self.tats.get(key)
+            if tat is None:
+                continue
+            if tat <= now:
+                del self.tats[key]
+            else:
+                heapq.heappush(self.expiry, (tat, key))
+
+    def evict_soonest(self) -> None:
+        """Forget the key closest to a full allowance."""
+        while self.expiry:
+            _, key = heapq.heappop(self.expiry)
+            if self.tats.pop(key, None) is not None:
+                return
+
+    def clear(self) -> None:
+        """Forget every key."""
+        self.tats.clear()
+        self.expiry.clear()
+
+
+class RateLimitBuckets:
+    """GCRA state split across shards, each with its own lock.
+
+    A request only locks the shard its key hashes to, so concurrent
+    requests from different clients rarely contend. Capacity is enforced
+    per shard.
+    """
+
+    def __init__(
+        self,
+        *,
+        shards: int = RATE_LIMIT_BUCKET_SHARDS,
+        max_buckets: int = RATE_LIMIT_MAX_BUCKETS,
+    ) -> None:
+        self._shards = tuple(_BucketShard() for _ in range(max(1, shards)))
+        self.max_per_shard = max(1, max_buckets // len(self._shards))
+
+    def shard_for(self, key: str) -> _BucketShard:
+        """Return the shard that owns ``key``."""
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key: str) -> Optional[float]:
+        """Return the arrival time stored for ``key``, if any."""
+        shard = self.shard_for(key)
+        with shard.lock:
+            return shard.tats.get(key)
+
+    def clear(self) -> None:
+        """Forget every key in every shard."""
+        for shard in self._shards:
+            with shard.lock:
+                shard.clear()
+
+    def __len__(self) -> int:
+        return sum(len(shard.tats) for shard in self._shards)
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """GCRA counters local to this process.
+
+    The generic cell rate algorithm spaces requests ``window / limit``
+    seconds apart and allows a burst of ``limit``. Each key stores one
+    float, its theoretical arrival time (TAT): the moment the key would be
+    back to a full burst allowance. A charge of ``cost`` moves the TAT
+    ``cost`` intervals forward and is admitted when the new TAT is at most
+    ``window`` ahead of now.
+    """
+
+    def __init__(self, buckets: Optional[RateLimitBuckets] = None) -> None:
+        self._buckets = buckets if buckets is not None else RateLimitBuckets()
+
+    def hit(
+        self,
+        key: str,
+        *,
+        limit: int,
+        window_seconds: int,
+        cost: int = 1,
+        force: bool = False,
+    ) -> tuple[bool, int]:
+        window = float(max(1, window_seconds))
+        interval = window / limit
+        now = time.monotonic()
+        shard = self._buckets.shard_for(key)
+        with shard.lock:
+            # A key whose TAT has passed has its full allowance back,
+            # which is the same as having no entry at all.
+            shard.expire(now)
+            tat = max(shard.tats.get(key, now), now)
+            new_tat = tat + cost * interval
+            allowed = new_tat - now <= window
+            if not allowed and not force:
+                return False, _gcra_remaining(tat - now, window, interval)
+            if cost > 0:
+                if key not in shard.tats:
+                    if len(shard.tats) >= self._buckets.max_per_shard:
+                        shard.evict_soonest()
+                    heapq.heappush(shard.expiry, (new_tat, key))
+                shard.tats[key] = new_tat
+        return allowed, _gcra_remaining(new_tat - now, window, interval)
+
+
+def _gcra_remaining(ahead: float, window: float, interval: float) -> int:
+    # Small epsilon so float error never hides the last unit of budget.
+    return max(0, int((window - ahead) / interval + 1e-9))
+
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """Fixed-window counters in the application database."""
+
+    def __init__(
+        self,
+        *,
+        session_factory: Callable[[], Any] = get_session,
+    ) -> None:
+        self._session_factory = session_factory
+
+    def hit(
+        self,
+        key: str,
+        *,
+        limit: int,
+        window_seconds: int,
+        cost: int = 1,
+        force: bool = False,
+    ) -> tuple[bool, int]:
+        window = max(1, window_seconds)
+        now = time.time()
+        window_start = int(now // window) * window
+        try:
+            with self._session_factory() as session:
+                if session is None:
+                    raise RateLimitBackendError('database is not configured')
+                hits = increment_rate_limit_counter(
+                    session,
+                    key,
+                    window_start=window_start,
+                    expires_at=float(window_start + window),
+                    cost=cost,
+                )
+                allowed = hits <= limit
+                if not allowed and not force:
+                    # The row stays locked until commit, so no other
+                    # instance sees the charge before it is taken back.
+                    refund_rate_limit_counter(
+                        session, key, window_start=window_start, cost=cost,
+                    )
+                    hits -= cost
+                session.commit()
+        except SQLAlchemyError as exc:
+            raise RateLimitBackendError(str(exc)) from exc
+        return allowed, max(0, limit - hits)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Fixed-window counters in a Redis-protocol store."""
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        key_prefix: str = SHARED_CACHE_KEY_PREFIX,
+    ) -> None:
+        self._client = client
+        self._namespace = f'{key_prefix}:ratelimit:'
+
+    def hit(
+        self,
+        key: str,
+        *,
+        limit: int,
+        window_seconds: int,
+        cost: int = 1,
+        force: bool = False,
+    ) -> tuple[bool, int]:
+        window = max(1, window_seconds)
+        window_index = int(time.time() // window)
+        try:
+            allowed, hits = self._client.execute(
+                'EVAL',
+                _REDIS_CHARGE_SCRIPT,
+                1,
+                f'{self._namespace}{key}:{window_index}',
+                window * 1000,
+                cost,
+                limit,
+                1 if force else 0,
+            )
+        except (RedisError, TypeError, ValueError) as exc:
+            raise RateLimitBackendError(str(exc)) from exc
+        return bool(allowed) and int(hits) <= limit, max(0, limit - int(hits))
+
+
+def build_rate_limit_backend(
+    kind: str = RATE_LIMIT_BACKEND,
+    redis_url: str = RATE_LIMIT_REDIS_URL,
+) -> Optional[RateLimitBackend]:
+    """Return the configured shared backend, or None for in-memory only."""
+    if kind == 'memory':
+        return None
+    if kind == 'postgres':
+        return DatabaseRateLimitBackend()
+    if kind == 'redis':
+        if urlparse(redis_url).scheme not in ('redis', 'rediss'):
+            logging.warning(
+                'RATE_LIMIT_BACKEND=redis needs a redis:// URL; '
+                'using in-memory rate limits.'
+            )
+            return None
+        return RedisRateLimitBackend(
+            RedisClient(
+                redis_url,
+                timeout_seconds=SHARED_CACHE_TIMEOUT_SECONDS,
+                pool_size=SHARED_CACHE_POOL_SIZE,
+            )
+        )
+    logging.warning('Unsupported RATE_LIMIT_BACKEND: %s', kind)
+    return None
+
+
+class RateLimiter:
+    """Apply limits through a shared backend with an in-memory fallback."""
+
+    def __init__(
+        self,
+        backend: Optional[RateLimitBackend],
+        fallback: InMemoryRateLimitBackend,
+        *,
+        retry_seconds: float = RATE_LIMIT_RETRY_SECONDS,
+    ) -> None:
+        self._backend = backend
+        self._fallback = fallback
+        self._retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._disabled_until = 0.0
+        self._stats = {
+            'allowed': 0,
+            'limited': 0,
+            'backend_errors': 0,
+            'fallback_checks': 0,
+        }
+
+    def allow(self, key: str, *, limit: int, window_seconds: int) -> bool:
+        """Count one request for ``key`` and return whether it may proceed."""
+        return self.charge(key, limit=limit, window_seconds=window_seconds)[0]
+
+    def charge(
+        self,
+        key: str,
+        *,
+        limit: int,
+        window_seconds: int,
+        cost: int = 1,
+        force: bool = False,
+    ) -> tuple[bool, int]:
+        """Charge ``cost`` to ``key`` and return ``(allowed, remaining)``.
+
+        See ``RateLimitBackend.hit`` for how refused and forced charges are
+        recorded. A non-positive ``limit`` disables limiting.
+        """
+        if limit <= 0:
+            return True, 0
+        result = None
+        if self._backend_available():
+            try:
+                result = self._backend.hit(
+                    key,
+                    limit=limit,
+                    window_seconds=window_seconds,
+                    cost=cost,
+                    force=force,
+                )
+            except RateLimitBackendError:
+                self._record_failure()
+        if result is None:
+            with self._lock:
+                if self._backend is not None:
+                    self._stats['fallback_checks'] += 1
+            result = self._fallback.hit(
+                key,
+                limit=limit,
+                window_seconds=window_seconds,
+                cost=cost,
+                force=force,
+            )
+        with self._lock:
+            self._stats['allowed' if result[0] else 'limited'] += 1
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of the limiter counters."""
+        with self._lock:
+            return {
+                **self._stats,
+                'backend': (
+                    type(self._backend).__name__
+                    if self._backend is not None
+                    else type(self._fallback).__name__
+                ),
+                'available': self._disabled_until <= time.monotonic(),
+            }
+
+    def _backend_available(self) -> bool:
+        if self._backend is None:
+            return False
+        with self._lock:
+            return time.monotonic() >= self._disabled_until
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._stats['backend_errors'] += 1
+            self._disabled_until = time.monotonic() + self._retry_seconds
+        logging.warning(
+            'Shared rate-limit backend unavailable; '
+            'using in-memory limits for %ss.',
+            self._retry_seconds,
+        )
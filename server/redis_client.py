@@ -0,0 +1,157 @@
+"""Small pooled client for the Redis serialization protocol (RESP2).
+
+Only the plain request/reply commands the shared cache and rate limiter
+need are used, so this avoids a dependency on a full Redis library.
+``redis://`` and ``rediss://`` URLs are supported, including a username,
+password and database number.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import socket
+import ssl
+from typing import Any
+from urllib.parse import unquote, urlparse
+
+
+class RedisError(Exception):
+    """Raised when a command fails or the server cannot be reached."""
+
+
+class RedisConnection:
+    """One socket speaking the Redis serialization protocol (RESP2)."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+
+    def close(self) -> None:
+        """Close the socket, ignoring errors."""
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+    def command(self, *args: Any) -> Any:
+        """Send one command and return its decoded reply."""
+        parts = [f'*{len(args)}\r\n'.encode('ascii')]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(f'${len(data)}\r\n'.encode('ascii'))
+            parts.append(data)
+            parts.append(b'\r\n')
+        self._sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_line(self) -> bytes:
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise RedisError('connection closed by server')
+        return line[:-2]
+
+    def _read_reply(self) -> Any:
+        line = self._read_line()
+        kind, body = line[:1], line[1:]
+        if kind == b'+':
+            return body.decode('utf-8', 'replace')
+        if kind == b'-':
+            raise RedisError(body.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise RedisError('truncated bulk reply')
+            return data[:-2]
+        if kind == b'*':
+            count = int(body)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RedisError('unexpected reply from server')
+
+
+class RedisClient:  # pylint: disable=too-many-instance-attributes
+    """Minimal pooled Redis client for the handful of commands we use."""
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        timeout_seconds: float,
+        pool_size: int,
+    ) -> None:
+        parsed = urlparse(url)
+        self._host = parsed.hostname or 'localhost'
+        self._port = parsed.port or 6379
+        self._username = unquote(parsed.username) if parsed.username else None
+        self._password = unquote(parsed.password) if parsed.password else None
+        self._database = _database_index(parsed.path)
+        self._use_tls = parsed.scheme == 'rediss'
+        self._timeout_seconds = timeout_seconds
+        self._pool: queue.LifoQueue[RedisConnection] = queue.LifoQueue(
+            maxsize=max(1, pool_size)
+        )
+
+    def execute(self, *args: Any) -> Any:
+        """Run one command on a pooled connection and return its reply."""
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            reply = connection.command(*args)
+        except (OSError, ValueError, RedisError) as exc:
+            connection.close()
+            raise RedisError(str(exc)) from exc
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return reply
+
+    def _connect(self) -> RedisConnection:
+        try:
+            sock = socket.create_connection(
+                (self._host, self._port),
+                timeout=self._timeout_seconds,
+            )
+            if self._use_tls:
+                sock = ssl.create_default_context().wrap_socket(
+                    sock,
+                    server_hostname=self._host,
+                )
+        except OSError as exc:
+            raise RedisError(str(exc)) from exc
+        connection = RedisConnection(sock)
+        try:
+            if self._password:
+                if self._username:
+                    connection.command('AUTH', self._username, self._password)
+                else:
+                    connection.command('AUTH', self._password)
+            if self._database:
+                connection.command('SELECT', self._database)
+        except (OSError, ValueError, RedisError) as exc:
+            connection.close()
+            raise RedisError(str(exc)) from exc
+        return connection
+
+
+def _database_index(path: str) -> int:
+    """Return the database number in a URL path, or 0 when it is unusable."""
+    value = path.strip('/')
+    if value.isdigit():
+        return int(value)
+    if value:
+        logging.warning(
+            'Ignoring non-numeric Redis database %r; using database 0.',
+            value,
+        )
+    return 0
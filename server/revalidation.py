@@ -0,0 +1,139 @@
+"""Deduplicated background refreshes for stale transcript cache entries."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from .config import (
+    TRANSCRIPT_REFRESH_FAILURE_GRACE_SECONDS,
+    TRANSCRIPT_REFRESH_MAX_WORKERS,
+)
+
+_MAX_TRACKED_FAILURES = 4096
+
+
+class CacheRevalidator:  # pylint: disable=too-many-instance-attributes
+    """Run at most one background refresh per cache key at a time.
+
+    A refresh that fails transiently (a falsy return, a timeout, an upstream
+    5xx or 429) puts its key into a grace window: the stale entry keeps
+    being served and no new refresh is attempted until the window passes,
+    so a flaky upstream is not hammered by every reader.
+
+    A definitive failure, such as a 4xx for a removed or private video,
+    marks the key rejected instead. Callers should stop serving the stale
+    entry for a rejected key and surface the real error.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = TRANSCRIPT_REFRESH_MAX_WORKERS,
+        failure_grace_seconds: int = TRANSCRIPT_REFRESH_FAILURE_GRACE_SECONDS,
+    ) -> None:
+        self._max_workers = max(1, max_workers)
+        self._failure_grace_seconds = max(0, failure_grace_seconds)
+        self._lock = threading.Lock()
+        self._in_flight: set[str] = set()
+        self._failed_at: OrderedDict[str, float] = OrderedDict()
+        self._rejected_at: OrderedDict[str, float] = OrderedDict()
+        self._executor = None
+        self._stats = {
+            'scheduled': 0,
+            'deduplicated': 0,
+            'in_grace': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'rejected': 0,
+        }
+
+    def schedule(self, key: str, refresh: Callable[[], Any]) -> bool:
+        """Schedule ``refresh`` for ``key`` unless one is running or failing.
+
+        ``refresh`` should return a truthy value on success; a falsy return
+        or an exception counts as a failure.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if key in self._in_flight:
+                self._stats['deduplicated'] += 1
+                return False
+            failed_at = self._failed_at.get(key)
+            if (
+                failed_at is not None
+                and now - failed_at < self._failure_grace_seconds
+            ):
+                self._stats['in_grace'] += 1
+                return False
+            self._in_flight.add(key)
+            self._stats['scheduled'] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix='transcript-revalidate',
+                )
+            executor = self._executor
+        executor.submit(self._run, key, refresh)
+        return True
+
+    def is_rejected(self, key: str) -> bool:
+        """Return True if the last refresh of ``key`` failed definitively."""
+        with self._lock:
+            rejected_at = self._rejected_at.get(key)
+            return (
+                rejected_at is not None
+                and time.monotonic() - rejected_at
+                < self._failure_grace_seconds
+            )
+
+    def stats(self) -> dict[str, int]:
+        """Return a snapshot of the revalidation counters."""
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._in_flight)}
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running refreshes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _run(self, key: str, refresh: Callable[[], Any]) -> None:
+        transient = True
+        try:
+            succeeded = bool(refresh())
+        except Exception as error:
+            logging.warning('Background refresh failed for %s.', key)
+            succeeded = False
+            transient = is_transient_failure(error)
+        with self._lock:
+            self._in_flight.discard(key)
+            if succeeded:
+                self._stats['succeeded'] += 1
+                self._failed_at.pop(key, None)
+                self._rejected_at.pop(key, None)
+                return
+            self._stats['failed' if transient else 'rejected'] += 1
+            _remember(self._failed_at, key)
+            if not transient:
+                _remember(self._rejected_at, key)
+
+
+def is_transient_failure(error: BaseException) -> bool:
+    """Return True if a refresh error is worth riding out on stale data."""
+    status_code = getattr(error, 'status_code', None)
+    if not isinstance(status_code, int):
+        return True
+    return status_code >= 500 or status_code in (408, 429)
+
+
+def _remember(failures: OrderedDict[str, float], key: str) -> None:
+    failures[key] = time.monotonic()
+    failures.move_to_end(key)
+    while len(failures) > _MAX_TRACKED_FAILURES:
+        failures.popitem(last=False)
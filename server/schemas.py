@@ -14,12 +14,9 @@ class TranscriptRequest(BaseModel):
     summary_lines: Optional[int] = 3
 
 
-class ArchiveToggleRequest(BaseModel):
-    """Payload for toggling an archive entry."""
+class ArchiveMetadataPayload(BaseModel):
+    """Optional video and channel metadata sent with archive changes."""
 
-    user_id: str
-    video_id: str
-    archived: Optional[bool] = None
     title: Optional[str] = None
     thumbnail_url: Optional[str] = None
     channel_id: Optional[str] = None
@@ -27,6 +24,28 @@ class ArchiveToggleRequest(BaseModel):
     channel_thumbnail_url: Optional[str] = None
 
 
+class ArchiveToggleRequest(ArchiveMetadataPayload):
+    """Payload for toggling an archive entry."""
+
+    user_id: str
+    video_id: str
+    archived: Optional[bool] = None
+
+
+class ArchiveBatchItem(ArchiveMetadataPayload):
+    """One archive change within a batch; ``archived`` is required."""
+
+    video_id: str
+    archived: bool
+
+
+class ArchiveBatchRequest(BaseModel):
+    """Payload for applying several archive changes at once."""
+
+    user_id: str
+    items: list[ArchiveBatchItem]
+
+
 class ArchiveClearRequest(BaseModel):
     """Payload for clearing all archive entries for a user."""
 
@@ -0,0 +1,45 @@
+"""Security and correlation headers applied to every response."""
+
+from __future__ import annotations
+
+import re
+from typing import Optional
+import uuid
+
+from fastapi import Request, Response
+
+_REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9_\-\.]{1,128}')
+
+
+def resolve_request_id(raw_request_id: Optional[str]) -> str:
+    """Echo a well-formed client request id, or mint a new one."""
+    if raw_request_id and _REQUEST_ID_PATTERN.fullmatch(raw_request_id):
+        return raw_request_id
+    return str(uuid.uuid4())
+
+
+def apply_security_headers(request: Request, response: Response) -> Response:
+    """Set default security headers without overriding explicit ones."""
+    response.headers.setdefault(
+        'X-Request-Id',
+        resolve_request_id(request.headers.get('X-Request-Id')),
+    )
+    response.headers.setdefault('X-Content-Type-Options', 'nosniff')
+    response.headers.setdefault('X-Frame-Options', 'DENY')
+    response.headers.setdefault('Referrer-Policy', 'no-referrer')
+    response.headers.setdefault(
+        'Content-Security-Policy',
+        "default-src 'none'; frame-ancestors 'none'; base-uri 'none'",
+    )
+    response.headers.setdefault(
+        'Permissions-Policy',
+        'geolocation=(), microphone=(), camera=()',
+    )
+    response.headers.setdefault('Cross-Origin-Resource-Policy', 'same-site')
+    response.headers.setdefault('Cache-Control', 'no-store')
+    if request.url.scheme == 'https':
+        response.headers.setdefault(
+            'Strict-Transport-Security',
+            'max-age=31536000; includeSubDomains',
+        )
+    return response
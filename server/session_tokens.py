@@ -0,0 +1,101 @@
+"""Short-lived, server-signed session tokens.
+
+Clients can exchange a verified Google ID token for a session token via
+``POST /auth/session``. Checking a session token takes one HMAC-SHA256 and
+a constant-time compare, with no JWKS lookup, RS256 verification or
+per-instance cache to warm up. Any instance sharing the secret accepts it.
+
+Format: ``tts1.<base64url JSON {"sub", "exp"}>.<base64url HMAC>``, where the
+HMAC covers everything before the last dot.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import Optional
+
+from .config import USER_ID_PATTERN
+
+SESSION_TOKEN_PREFIX = 'tts1.'
+
+
+class SessionTokenError(Exception):
+    """Raised with the client-facing detail when a session token is bad."""
+
+
+def is_session_token(token: str) -> bool:
+    """Return True when ``token`` is in the session token format."""
+    return token.startswith(SESSION_TOKEN_PREFIX)
+
+
+def issue_session_token(
+    subject: str,
+    *,
+    secret: str,
+    expires_at: int,
+) -> str:
+    """Return a session token for ``subject`` valid until ``expires_at``."""
+    claims = json.dumps(
+        {'sub': subject, 'exp': int(expires_at)},
+        separators=(',', ':'),
+    ).encode('utf-8')
+    signed = SESSION_TOKEN_PREFIX + _b64encode(claims)
+    return f'{signed}.{_b64encode(_sign(signed, secret))}'
+
+
+def verify_session_token(
+    token: str,
+    *,
+    secrets: tuple[str, ...],
+    leeway_seconds: int = 0,
+    now: Optional[float] = None,
+) -> str:
+    """Return the subject of a valid token signed with one of ``secrets``.
+
+    The first secret signs new tokens; the others are accepted so a secret
+    can be rotated without logging everyone out.
+    """
+    signed, _, signature = token.rpartition('.')
+    if not is_session_token(signed):
+        raise SessionTokenError('invalid access token')
+    try:
+        provided = _b64decode(signature)
+        claims = json.loads(_b64decode(signed[len(SESSION_TOKEN_PREFIX):]))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise SessionTokenError('invalid access token') from exc
+    if not any(
+        hmac.compare_digest(provided, _sign(signed, secret))
+        for secret in secrets
+        if secret
+    ):
+        raise SessionTokenError('invalid access token')
+
+    subject = claims.get('sub') if isinstance(claims, dict) else None
+    expires_at = claims.get('exp') if isinstance(claims, dict) else None
+    if not isinstance(subject, str) or not USER_ID_PATTERN.fullmatch(subject):
+        raise SessionTokenError('invalid token subject')
+    if not isinstance(expires_at, int):
+        raise SessionTokenError('token exp invalid')
+    current = time.time() if now is None else now
+    if expires_at + leeway_seconds <= current:
+        raise SessionTokenError('token expired')
+    return subject
+
+
+def _sign(signed: str, secret: str) -> bytes:
+    return hmac.new(
+        secret.encode('utf-8'), signed.encode('ascii'), hashlib.sha256,
+    ).digest()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
@@ -0,0 +1,253 @@
+"""Shared transcript cache tier that every server instance can reach.
+
+The per-instance memory and file tiers are lost when a Cloud Run instance
+recycles, and the DB tier costs a full ORM round trip. This tier sits
+between them and stores transcript records in a key-value service:
+
+* ``redis://`` / ``rediss://`` URLs use the built-in client from
+  ``redis_client`` (GET, SET with PX, DEL), so no extra dependency is
+  needed.
+* ``memory://`` uses an in-process stand-in with the same semantics, for
+  tests and single-instance development.
+
+Values are the binary records from ``file_cache`` and keys are namespaced
+by the record format version, so a format change never reads old values.
+Backend failures open a short circuit so a slow or missing service does
+not add latency to every request.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import logging
+import threading
+import time
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from .config import (
+    SHARED_CACHE_KEY_PREFIX,
+    SHARED_CACHE_MAX_VALUE_BYTES,
+    SHARED_CACHE_POOL_SIZE,
+    SHARED_CACHE_RETRY_SECONDS,
+    SHARED_CACHE_TIMEOUT_SECONDS,
+    SHARED_CACHE_URL,
+)
+from .file_cache import RECORD_VERSION, pack_record, unpack_record
+from .redis_client import RedisClient, RedisError
+
+_MEMORY_STANDIN_MAX_ITEMS = 10000
+
+
+class SharedCacheError(Exception):
+    """Raised when the shared cache backend cannot complete a command."""
+
+
+class SharedCacheBackend(ABC):
+    """Interface for byte-oriented key-value stores with expiry."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored value or None when missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        """Store ``value`` under ``key`` for ``ttl_seconds``."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove ``key`` if present."""
+
+
+class InMemorySharedCache(SharedCacheBackend):
+    """Process-local stand-in used by tests and single-instance setups."""
+
+    def __init__(self, max_items: int = _MEMORY_STANDIN_MAX_ITEMS) -> None:
+        self._max_items = max(1, max_items)
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + ttl_seconds)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class RedisSharedCache(SharedCacheBackend):
+    """Shared cache backed by a Redis server."""
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        timeout_seconds: float = SHARED_CACHE_TIMEOUT_SECONDS,
+        pool_size: int = SHARED_CACHE_POOL_SIZE,
+    ) -> None:
+        self._client = RedisClient(
+            url,
+            timeout_seconds=timeout_seconds,
+            pool_size=pool_size,
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._execute('GET', key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        self._execute('SET', key, value, 'PX', max(1, ttl_seconds) * 1000)
+
+    def delete(self, key: str) -> None:
+        self._execute('DEL', key)
+
+    def _execute(self, *args: Any) -> Any:
+        try:
+            return self._client.execute(*args)
+        except RedisError as exc:
+            raise SharedCacheError(str(exc)) from exc
+
+
+def build_shared_cache_backend(url: str) -> Optional[SharedCacheBackend]:
+    """Return the backend for ``url``, or None when the tier is disabled."""
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme in ('redis', 'rediss'):
+        return RedisSharedCache(url)
+    if scheme == 'memory':
+        return InMemorySharedCache()
+    logging.warning('Unsupported SHARED_CACHE_URL scheme: %s', scheme)
+    return None
+
+
+class SharedCacheTier:
+    """Namespacing, size limits, encoding and failure handling for a backend.
+
+    ``get`` returns the decoded payload with its ``created_at``; callers
+    decide freshness the same way they do for the other tiers.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SharedCacheBackend],
+        *,
+        key_prefix: str = SHARED_CACHE_KEY_PREFIX,
+        max_value_bytes: int = SHARED_CACHE_MAX_VALUE_BYTES,
+        retry_seconds: float = SHARED_CACHE_RETRY_SECONDS,
+    ) -> None:
+        self._backend = backend
+        self._namespace = f'{key_prefix}:transcript:v{RECORD_VERSION}:'
+        self._max_value_bytes = max_value_bytes
+        self._retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._disabled_until = 0.0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'oversize': 0,
+            'errors': 0,
+            'skipped_unavailable': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """Return True when a backend is configured."""
+        return self._backend is not None
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return ``{text, summary, source, partial, created_at}`` or None."""
+        if not self._available():
+            return None
+        try:
+            value = self._backend.get(self._namespace + key)
+        except SharedCacheError:
+            self._record_failure()
+            return None
+        record = unpack_record(value) if value else None
+        with self._lock:
+            self._stats['hits' if record else 'misses'] += 1
+        return record
+
+    def set(
+        self,
+        key: str,
+        payload: dict,
+        *,
+        ttl_seconds: int,
+        created_at: Optional[float] = None,
+    ) -> bool:
+        """Store ``payload``; skip values larger than the size limit."""
+        if ttl_seconds <= 0 or not self._available():
+            return False
+        value = pack_record(payload, created_at)
+        if len(value) > self._max_value_bytes:
+            with self._lock:
+                self._stats['oversize'] += 1
+            return False
+        try:
+            self._backend.set(self._namespace + key, value, ttl_seconds)
+        except SharedCacheError:
+            self._record_failure()
+            return False
+        with self._lock:
+            self._stats['sets'] += 1
+        return True
+
+    def delete(self, key: str) -> None:
+        """Remove an entry, ignoring backend failures."""
+        if not self._available():
+            return
+        try:
+            self._backend.delete(self._namespace + key)
+        except SharedCacheError:
+            self._record_failure()
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of the tier counters."""
+        with self._lock:
+            return {
+                **self._stats,
+                'enabled': self.enabled,
+                'available': self._disabled_until <= time.monotonic(),
+            }
+
+    def _available(self) -> bool:
+        if self._backend is None:
+            return False
+        with self._lock:
+            if time.monotonic() < self._disabled_until:
+                self._stats['skipped_unavailable'] += 1
+                return False
+        return True
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._stats['errors'] += 1
+            self._disabled_until = time.monotonic() + self._retry_seconds
+        logging.warning(
+            'Shared transcript cache unavailable; bypassing for %ss.',
+            self._retry_seconds,
+        )
+
+
+def build_shared_cache_tier() -> SharedCacheTier:
+    """Build the tier configured by ``SHARED_CACHE_URL``."""
+    return SharedCacheTier(build_shared_cache_backend(SHARED_CACHE_URL))
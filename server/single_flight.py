@@ -0,0 +1,196 @@
+"""Cross-instance single-flight for transcript computation.
+
+When several instances get a burst for the same uncached video, each one
+would otherwise start its own caption fetch or Whisper job. The first
+caller takes a Postgres session-level advisory lock keyed by the transcript
+cache key and does the work. Other callers, on this instance or another,
+poll that same cache key until the result appears or the lock frees up.
+The wait is bounded by TRANSCRIPT_SINGLE_FLIGHT_WAIT_SECONDS; a waiter that
+runs out of time raises ``SingleFlightPending`` instead of starting the
+duplicate job the lock exists to prevent.
+
+The lock is only tried once the caller holds its compute ``slot``, and it
+lives on the pooled connection of a ``get_session()`` session for the
+computation alone. Queued callers therefore never hold a connection, and
+lock holders are bounded by the slot count rather than by the request
+rate. If the database is unavailable, is not Postgres, or the feature is
+disabled, callers compute directly, as they did before.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import (
+    TRANSCRIPT_SINGLE_FLIGHT_ENABLED,
+    TRANSCRIPT_SINGLE_FLIGHT_POLL_SECONDS,
+    TRANSCRIPT_SINGLE_FLIGHT_WAIT_SECONDS,
+)
+from .db import get_session
+
+T = TypeVar('T')
+
+# Distinguishes these locks from any other advisory locks on the database.
+_LOCK_NAMESPACE = 'transcript:'
+
+
+class SingleFlightPending(Exception):
+    """Another caller is still computing ``key`` after the wait ran out."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f'computation for {key} is still in progress')
+        self.key = key
+
+
+def advisory_lock_id(key: str) -> int:
+    """Map ``key`` to a signed 64-bit advisory lock id."""
+    digest = hashlib.sha256(f'{_LOCK_NAMESPACE}{key}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+class AdvisoryLockSingleFlight:
+    """Run one computation per key across every instance sharing the DB."""
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = TRANSCRIPT_SINGLE_FLIGHT_ENABLED,
+        wait_seconds: float = TRANSCRIPT_SINGLE_FLIGHT_WAIT_SECONDS,
+        poll_seconds: float = TRANSCRIPT_SINGLE_FLIGHT_POLL_SECONDS,
+        session_factory: Callable[[], Any] = get_session,
+    ) -> None:
+        self._enabled = enabled
+        self._wait_seconds = max(0.0, wait_seconds)
+        self._poll_seconds = max(0.01, poll_seconds)
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._stats = {
+            'acquired': 0,
+            'contended': 0,
+            'served_from_cache': 0,
+            'wait_timeouts': 0,
+            'fallbacks': 0,
+            'wait_ms_total': 0,
+            'wait_ms_max': 0,
+        }
+
+    def stats(self) -> dict[str, int]:
+        """Return a snapshot of the lock counters."""
+        with self._lock:
+            return dict(self._stats)
+
+    def run(
+        self,
+        key: str,
+        compute: Callable[[], T],
+        poll: Callable[[], Optional[T]],
+        slot: Callable[[], ContextManager[Any]] = nullcontext,
+    ) -> T:
+        """Return ``compute()`` under the lock, or what ``poll`` finds.
+
+        ``poll`` should return the cached result once the lock holder has
+        stored it, and None until then. ``slot`` is entered before the
+        lock is tried and held for the computation; waiters release it
+        while they poll. Raises ``SingleFlightPending`` when the holder is
+        still working after the wait.
+        """
+        if not self._enabled:
+            with slot():
+                return compute()
+
+        started = time.monotonic()
+        contended = False
+        while True:
+            with slot():
+                acquired = self._try_run_locked(key, compute)
+                if acquired is None:
+                    self._count('fallbacks')
+                    return compute()
+            if acquired[0]:
+                if contended:
+                    self._record_wait(started)
+                return acquired[1]
+            if not contended:
+                contended = True
+                self._count('contended')
+
+            if time.monotonic() - started >= self._wait_seconds:
+                self._count('wait_timeouts')
+                self._record_wait(started)
+                raise SingleFlightPending(key)
+            time.sleep(self._poll_seconds)
+            result = poll()
+            if result is not None:
+                self._count('served_from_cache')
+                self._record_wait(started)
+                return result
+
+    def _try_run_locked(
+        self,
+        key: str,
+        compute: Callable[[], T],
+    ) -> Optional[tuple[bool, Any]]:
+        """Return ``(True, result)``, ``(False, None)`` or None on fallback."""
+        lock_id = advisory_lock_id(key)
+        with self._session_factory() as session:
+            if session is None or _dialect_name(session) != 'postgresql':
+                return None
+            try:
+                # Autocommit keeps the connection out of a transaction while
+                # the holder works; the session still pins the connection,
+                # so the unlock runs where the lock was taken.
+                connection = session.connection(
+                    execution_options={'isolation_level': 'AUTOCOMMIT'},
+                )
+                acquired = connection.execute(
+                    text('SELECT pg_try_advisory_lock(:lock_id)'),
+                    {'lock_id': lock_id},
+                ).scalar()
+            except SQLAlchemyError:
+                logging.warning('Advisory lock unavailable for %s.', key)
+                return None
+            if not acquired:
+                return False, None
+            self._count('acquired')
+            try:
+                return True, compute()
+            finally:
+                _unlock(connection, lock_id)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _record_wait(self, started: float) -> None:
+        waited_ms = int((time.monotonic() - started) * 1000)
+        with self._lock:
+            self._stats['wait_ms_total'] += waited_ms
+            self._stats['wait_ms_max'] = max(
+                self._stats['wait_ms_max'], waited_ms,
+            )
+
+
+def _dialect_name(session: Any) -> str:
+    dialect = getattr(getattr(session, 'bind', None), 'dialect', None)
+    return getattr(dialect, 'name', '')
+
+
+def _unlock(connection: Any, lock_id: int) -> None:
+    try:
+        connection.execute(
+            text('SELECT pg_advisory_unlock(:lock_id)'),
+            {'lock_id': lock_id},
+        )
+    except SQLAlchemyError:
+        # Session locks die with their connection, so drop it from the pool
+        # rather than hand a still-locked connection to the next caller.
+        logging.warning('Failed to release advisory lock %s.', lock_id)
+        connection.invalidate()
@@ -94,23 +94,52 @@ class AppTestCase(unittest.TestCase):
             video_id='abc12345xyz',
             max_chars=1200,
             summarize=True,
-            summary_lines=3,
         )
         no_summary = _build_transcript_cache_key(
             video_id='abc12345xyz',
             max_chars=1200,
             summarize=False,
-            summary_lines=3,
         )
         shorter = _build_transcript_cache_key(
             video_id='abc12345xyz',
             max_chars=800,
             summarize=True,
-            summary_lines=3,
         )
         self.assertNotEqual(base, no_summary)
         self.assertNotEqual(base, shorter)
 
+    def test_summary_lines_variants_share_one_summary_call(self) -> None:
+        """Different summary_lines requests should reuse one ranked summary."""
+        store: dict[str, dict] = {}
+        ranked = '첫째\n둘째\n셋째\n넷째\n다섯째'
+        with patch.object(backend, 'load_cache', side_effect=store.get):
+            with patch.object(
+                backend,
+                'save_cache',
+                side_effect=store.__setitem__,
+            ):
+                with patch(
+                    'server.transcript_utils.fetch_caption_text',
+                    return_value='caption text',
+                ):
+                    with patch(
+                        'server.transcript_utils.build_summary',
+                        return_value=ranked,
+                    ) as build_summary:
+                        three = self.client.post(
+                            '/transcript',
+                            json={'video_id': 'abc12345xyz', 'summary_lines': 3},
+                        )
+                        five = self.client.post(
+                            '/transcript',
+                            json={'video_id': 'abc12345xyz', 'summary_lines': 5},
+                        )
+        self.assertEqual(build_summary.call_count, 1)
+        self.assertEqual(three.json().get('summary'), '첫째\n둘째\n셋째')
+        self.assertFalse(three.json().get('cached'))
+        self.assertEqual(five.json().get('summary'), ranked)
+        self.assertTrue(five.json().get('cached'))
+
     def test_parse_json3_tolerates_non_dict_events(self) -> None:
         """JSON3 parser should ignore malformed entries without raising."""
         raw = (
@@ -303,6 +332,84 @@ class AppTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 401)
         self.assertEqual(response.json().get('detail'), 'invalid access token')
 
+    def test_failed_token_verification_is_negatively_cached(self) -> None:
+        """A token that failed its signature check should not be re-verified."""
+        backend.AUTH_FAILURE_CACHE.clear()
+        with patch.object(backend, 'BACKEND_REQUIRE_AUTH', True):
+            with patch(
+                'server.app._resolve_google_signing_key',
+                return_value='key',
+            ) as resolve_key:
+                with patch(
+                    'server.app.jwt.decode',
+                    side_effect=backend.jwt.InvalidSignatureError('bad'),
+                ) as decode:
+                    responses = [
+                        self.client.get(
+                            '/selection',
+                            params={'user_id': 'user_1234'},
+                            headers={'Authorization': 'Bearer forged-token'},
+                        )
+                        for _ in range(3)
+                    ]
+        backend.AUTH_FAILURE_CACHE.clear()
+        self.assertEqual([r.status_code for r in responses], [401] * 3)
+        self.assertEqual(
+            {r.json().get('detail') for r in responses},
+            {'invalid access token'},
+        )
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(resolve_key.call_count, 1)
+
+    def test_session_token_exchange_skips_google_verification(self) -> None:
+        """A session token should authorize without another RS256 check."""
+        backend.WRITE_RATE_BUCKETS.clear()
+        with patch.object(backend, 'BACKEND_REQUIRE_AUTH', True):
+            with patch.object(backend, 'SESSION_TOKEN_SECRET', 'test-secret'):
+                with patch(
+                    'server.app._verify_google_user',
+                    return_value='user_1234',
+                ) as verify_google:
+                    exchange = self.client.post(
+                        '/auth/session',
+                        headers={'Authorization': 'Bearer google-id-token'},
+                    )
+                    session_token = exchange.json().get('session_token', '')
+                    with patch('server.app.is_db_enabled', return_value=False):
+                        accepted = self.client.post(
+                            '/user/upsert',
+                            json={'user_id': 'user_1234'},
+                            headers={
+                                'Authorization': f'Bearer {session_token}',
+                            },
+                        )
+                    mismatch = self.client.get(
+                        '/selection',
+                        params={'user_id': 'user_other'},
+                        headers={'Authorization': f'Bearer {session_token}'},
+                    )
+                    tampered = self.client.get(
+                        '/selection',
+                        params={'user_id': 'user_1234'},
+                        headers={'Authorization': f'Bearer {session_token}x'},
+                    )
+        self.assertEqual(exchange.status_code, 200)
+        self.assertEqual(exchange.json().get('user_id'), 'user_1234')
+        self.assertTrue(session_token.startswith('tts1.'))
+        self.assertEqual(verify_google.call_count, 1)
+        self.assertEqual(accepted.status_code, 200)
+        self.assertEqual(mismatch.status_code, 403)
+        self.assertEqual(tampered.status_code, 401)
+
+    def test_session_exchange_is_disabled_without_secret(self) -> None:
+        """The exchange endpoint should not exist without a signing secret."""
+        with patch.object(backend, 'SESSION_TOKEN_SECRET', ''):
+            response = self.client.post(
+                '/auth/session',
+                headers={'Authorization': 'Bearer google-id-token'},
+            )
+        self.assertEqual(response.status_code, 404)
+
     def test_auth_rejects_user_mismatch(self) -> None:
         """Protected endpoints should reject token/user mismatches."""
         with patch.object(backend, 'BACKEND_REQUIRE_AUTH', True):
@@ -315,13 +422,50 @@ class AppTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 403)
         self.assertEqual(response.json().get('detail'), 'user mismatch')
 
+    def test_transcript_rate_limit_charges_by_cost(self) -> None:
+        """Cache hits should cost less budget than caption fetches."""
+        store: dict[str, dict] = {}
+        with patch.object(backend, 'TRANSCRIPT_RATE_BUDGET_PER_WINDOW', 20):
+            with patch.object(backend, 'TRANSCRIPT_RATE_COST_CACHE_HIT', 1):
+                with patch.object(backend, 'TRANSCRIPT_RATE_COST_CAPTIONS', 10):
+                    with patch.object(backend, 'load_cache', side_effect=store.get):
+                        with patch.object(
+                            backend,
+                            'save_cache',
+                            side_effect=store.__setitem__,
+                        ):
+                            with patch(
+                                'server.transcript_utils.fetch_caption_text',
+                                return_value='caption text',
+                            ):
+                                backend.TRANSCRIPT_RATE_BUCKETS.clear()
+                                miss = self.client.post(
+                                    '/transcript',
+                                    json={'video_id': 'abc12345xyz'},
+                                )
+                                hit = self.client.post(
+                                    '/transcript',
+                                    json={'video_id': 'abc12345xyz'},
+                                )
+                                limited = self.client.post(
+                                    '/transcript',
+                                    json={'video_id': 'xyz12345abc'},
+                                )
+                                backend.TRANSCRIPT_RATE_BUCKETS.clear()
+        self.assertEqual(miss.status_code, 200)
+        self.assertEqual(miss.headers.get('x-ratelimit-limit'), '20')
+        self.assertEqual(miss.headers.get('x-ratelimit-remaining'), '10')
+        self.assertTrue(hit.json().get('cached'))
+        self.assertEqual(hit.headers.get('x-ratelimit-remaining'), '9')
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited.headers.get('x-ratelimit-remaining'), '8')
+
     def test_write_rate_limit_rejects_burst_requests(self) -> None:
         """Write endpoints should enforce per-principal burst limits."""
         with patch.object(backend, 'WRITE_RATE_LIMIT_PER_WINDOW', 1):
             with patch.object(backend, 'WRITE_RATE_LIMIT_WINDOW_SECONDS', 60):
                 with patch('server.app.is_db_enabled', return_value=False):
-                    with backend.WRITE_RATE_LOCK:
-                        backend.WRITE_RATE_BUCKETS.clear()
+                    backend.WRITE_RATE_BUCKETS.clear()
                     first = self.client.post(
                         '/user/upsert',
                         json={'user_id': 'user_1234'},
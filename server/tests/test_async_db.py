@@ -0,0 +1,288 @@
+"""Unit tests for the async read path."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault('BACKEND_REQUIRE_AUTH', 'false')
+
+import server.app as backend
+from server.async_db import (
+    AsyncDatabase,
+    async_database_url,
+    build_async_database,
+)
+from server.async_persistence import (
+    fetch_archive_page,
+    fetch_selection,
+    fetch_user,
+    fetch_user_state,
+)
+from server.cursors import decode_archive_cursor
+from server.models import (
+    Archive,
+    Base,
+    Channel,
+    User,
+    UserChannel,
+    UserState,
+    Video,
+)
+from server.persistence import load_archive_page
+
+_ASYNC_DRIVERS_INSTALLED = all(
+    importlib.util.find_spec(name) is not None
+    for name in ('greenlet', 'aiosqlite')
+)
+
+
+class AsyncDatabaseConfigTest(unittest.TestCase):
+    """Validate async URL mapping and the synchronous fallback."""
+
+    def test_urls_map_to_async_drivers(self) -> None:
+        """Postgres and SQLite URLs should switch to their async driver."""
+        self.assertEqual(
+            async_database_url('postgresql+psycopg2://u:p@db:5432/app'),
+            'postgresql+asyncpg://u:p@db:5432/app',
+        )
+        self.assertEqual(
+            async_database_url('sqlite:///tmp/app.db'),
+            'sqlite+aiosqlite:///tmp/app.db',
+        )
+        self.assertIsNone(async_database_url('mysql://u:p@db/app'))
+
+    def test_disabled_or_unconfigured_stays_synchronous(self) -> None:
+        """No flag or no DATABASE_URL should leave reads synchronous."""
+        self.assertIsNone(
+            build_async_database(enabled=False, database_url='sqlite://'),
+        )
+        self.assertIsNone(
+            build_async_database(enabled=True, database_url=None),
+        )
+
+    def test_missing_driver_falls_back_with_warning(self) -> None:
+        """A missing async driver should log and keep the sync path."""
+        with patch(
+            'server.async_db.importlib.util.find_spec', return_value=None,
+        ):
+            with self.assertLogs(level='WARNING'):
+                database = build_async_database(
+                    enabled=True,
+                    database_url='postgresql+psycopg2://u:p@db/app',
+                )
+        self.assertIsNone(database)
+
+
+@unittest.skipUnless(_ASYNC_DRIVERS_INSTALLED, 'aiosqlite not installed')
+class AsyncReadHelpersTest(unittest.TestCase):
+    """Async reads should match the sync helpers on the same rows."""
+
+    def setUp(self) -> None:
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        engine = create_engine(f'sqlite:///{self.path}')
+        Base.metadata.create_all(engine)
+        self.sync_session = sessionmaker(bind=engine)
+        self.sync_engine = engine
+        now = datetime.now(timezone.utc)
+        with self.sync_session() as session:
+            session.add_all([
+                User(id='user_1', plan_tier='free', data_version=1),
+                UserState(
+                    user_id='user_1',
+                    selection_change_day=20240101,
+                    selection_changes_today=2,
+                    opened_video_ids='["abcdefghijk"]',
+                ),
+                Channel(
+                    id='channel-a',
+                    youtube_channel_id='channel-a',
+                    title='Channel A',
+                ),
+                Video(
+                    id='abcdefghijk',
+                    youtube_id='abcdefghijk',
+                    channel_id='channel-a',
+                    title='Video A',
+                ),
+                Archive(
+                    user_id='user_1',
+                    video_id='abcdefghijk',
+                    archived_at=now - timedelta(hours=1),
+                ),
+                Archive(
+                    user_id='user_1',
+                    video_id='lmnopqrstuv',
+                    archived_at=now,
+                ),
+            ])
+            session.add_all([
+                UserChannel(
+                    user_id='user_1',
+                    channel_id=channel_id,
+                    is_selected=selected,
+                )
+                for channel_id, selected in (
+                    ('channel-b', True),
+                    ('channel-a', True),
+                    ('channel-c', False),
+                )
+            ])
+            session.commit()
+        self.database = AsyncDatabase(f'sqlite+aiosqlite:///{self.path}')
+
+    def tearDown(self) -> None:
+        asyncio.run(self.database.dispose())
+        self.sync_engine.dispose()
+        os.unlink(self.path)
+
+    def _run(self, helper, *args):
+        async def _call():
+            async with self.database.session() as session:
+                return await helper(session, *args)
+        return asyncio.run(_call())
+
+    def test_archive_pages_match_the_sync_helper(self) -> None:
+        """Both paths should return the same pages and cursors."""
+        with self.sync_session() as session:
+            expected = load_archive_page(session, 'user_1', limit=1)
+        first = self._run_page(limit=1)
+        self.assertEqual(first, expected)
+        self.assertEqual(first['items'][0]['video_id'], 'lmnopqrstuv')
+        second = self._run_page(
+            limit=1, after=decode_archive_cursor(first['next_cursor']),
+        )
+        self.assertEqual(second['items'][0]['channel_title'], 'Channel A')
+        self.assertIsNone(second['next_cursor'])
+
+    def _run_page(self, **kwargs):
+        async def _call():
+            async with self.database.session() as session:
+                return await fetch_archive_page(session, 'user_1', **kwargs)
+        return asyncio.run(_call())
+
+    def test_user_state_and_selection_reads(self) -> None:
+        """User, state and selection reads should return the stored rows."""
+        self.assertEqual(self._run(fetch_user, 'user_1').plan_tier, 'free')
+        self.assertIsNone(self._run(fetch_user, 'user_missing'))
+        state = self._run(fetch_user_state, 'user_1')
+        self.assertEqual(state.selection_changes_today, 2)
+        self.assertEqual(
+            self._run(fetch_selection, 'user_1'),
+            ('free', ['channel-a', 'channel-b']),
+        )
+
+    def test_read_endpoints_use_the_async_session(self) -> None:
+        """Endpoints should serve reads from the async engine when enabled."""
+        with patch.object(backend, 'is_async_db_enabled', return_value=True):
+            with patch.object(
+                backend, 'get_async_session', self.database.session,
+            ):
+                with patch.object(backend, 'get_session') as sync_session:
+                    client = TestClient(backend.app)
+                    archives = client.get(
+                        '/archives', params={'user_id': 'user_1'},
+                    )
+                    state = client.get(
+                        '/user/state', params={'user_id': 'user_1'},
+                    )
+                    selection = client.get(
+                        '/selection', params={'user_id': 'user_1'},
+                    )
+                    missing = client.get(
+                        '/user', params={'user_id': 'user_missing'},
+                    )
+                    now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+                    calendar = client.get('/archives/calendar', params={
+                        'user_id': 'user_1',
+                        'from': now_ms - 86_400_000,
+                        'to': now_ms + 86_400_000,
+                    })
+                    cached = client.get(
+                        '/selection',
+                        params={'user_id': 'user_1'},
+                        headers={'If-None-Match': selection.headers['ETag']},
+                    )
+        sync_session.assert_not_called()
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(
+            sum(day['count'] for day in calendar.json()['days']), 2,
+        )
+        self.assertEqual(len(archives.json()['items']), 2)
+        self.assertEqual(state.json()['opened_video_ids'], ['abcdefghijk'])
+        self.assertEqual(state.json()['selection_changes_today'], 2)
+        self.assertEqual(
+            selection.json()['selected_ids'], ['channel-a', 'channel-b'],
+        )
+        self.assertEqual(missing.status_code, 404)
+
+    def test_async_reads_authorize_off_the_event_loop(self) -> None:
+        """Token checks can block on JWKS, so they must not run on the loop."""
+        on_loop = []
+
+        def _authorize(user_id, _authorization):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return user_id
+
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        with patch.object(backend, 'is_async_db_enabled', return_value=True):
+            with patch.object(
+                backend, 'get_async_session', self.database.session,
+            ):
+                with patch.object(
+                    backend, '_authorize_user', side_effect=_authorize,
+                ):
+                    client = TestClient(backend.app)
+                    for path, params in (
+                        ('/archives', {}),
+                        ('/archives/calendar', {
+                            'from': now_ms - 86_400_000, 'to': now_ms,
+                        }),
+                        ('/user', {}),
+                        ('/user/state', {}),
+                        ('/selection', {}),
+                    ):
+                        client.get(path, params={'user_id': 'user_1', **params})
+        self.assertEqual(on_loop, [False] * 5)
+
+
+    def test_async_read_errors_degrade_like_the_sync_path(self) -> None:
+        """Async archive and calendar reads should share one error policy."""
+        @asynccontextmanager
+        async def _broken():
+            raise OperationalError('SELECT 1', {}, Exception('down'))
+            yield  # pylint: disable=unreachable
+
+        params = {'user_id': 'user_1', 'from': 0, 'to': 86_400_000}
+        with patch.object(backend, 'is_async_db_enabled', return_value=True):
+            with patch.object(backend, 'get_async_session', _broken):
+                client = TestClient(backend.app)
+                for path, empty in (
+                    ('/archives/calendar', {'days': []}),
+                    ('/archives', {'items': [], 'next_cursor': None}),
+                ):
+                    response = client.get(path, params=params)
+                    self.assertEqual(response.json(), empty)
+                    self.assertNotIn('ETag', response.headers)
+                    with patch.object(
+                        backend, 'FAIL_CLOSED_WITHOUT_DB', True,
+                    ):
+                        response = client.get(path, params=params)
+                    self.assertEqual(response.status_code, 503)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Unit tests for the sharded verified-token cache."""
+
+import unittest
+from unittest.mock import patch
+
+from server.auth_cache import AuthCache, token_digest
+
+
+class AuthCacheTest(unittest.TestCase):
+    """Validate digest keys, expiry and LRU eviction."""
+
+    def test_keys_are_short_digests(self) -> None:
+        """Raw tokens should never be held as cache keys."""
+        token = 'header.' + 'x' * 1000 + '.signature'
+        self.assertEqual(len(token_digest(token)), 16)
+        cache = AuthCache()
+        cache.put(token, 'user_1', expires_at=2e9)
+        self.assertEqual(cache.get(token, now=1e9), 'user_1')
+        self.assertIsNone(cache.get(token + 'x', now=1e9))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_expired_entries_are_not_served_and_leave_by_heap(self) -> None:
+        """Expired tokens should miss and be dropped on the next write."""
+        cache = AuthCache(shards=1)
+        with patch('server.auth_cache.time.time', return_value=100.0):
+            cache.put('old', 'user_old', expires_at=150.0)
+            cache.put('new', 'user_new', expires_at=500.0)
+        self.assertIsNone(cache.get('old', now=200.0))
+        with patch('server.auth_cache.time.time', return_value=200.0):
+            cache.put('newer', 'user_newer', expires_at=600.0)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()['expired'], 1)
+
+    def test_capacity_evicts_least_recently_used(self) -> None:
+        """A full shard should drop the entry read longest ago."""
+        cache = AuthCache(max_items=2, shards=1)
+        cache.put('a', 'user_a', expires_at=2e9)
+        cache.put('b', 'user_b', expires_at=2e9)
+        self.assertEqual(cache.get('a', now=1e9), 'user_a')
+        cache.put('c', 'user_c', expires_at=2e9)
+        self.assertIsNone(cache.get('b', now=1e9))
+        self.assertEqual(cache.get('a', now=1e9), 'user_a')
+        self.assertEqual(cache.get('c', now=1e9), 'user_c')
+        self.assertEqual(cache.stats()['evicted'], 1)
+
+    def test_replaced_entries_keep_the_newest_expiry(self) -> None:
+        """Re-verifying a token should not be undone by its old heap entry."""
+        cache = AuthCache(shards=1)
+        with patch('server.auth_cache.time.time', return_value=100.0):
+            cache.put('t', 'user_t', expires_at=150.0)
+            cache.put('t', 'user_t', expires_at=900.0)
+        with patch('server.auth_cache.time.time', return_value=200.0):
+            cache.put('other', 'user_o', expires_at=900.0)
+        self.assertEqual(cache.get('t', now=200.0), 'user_t')
+
+    def test_heap_stays_bounded_under_churn(self) -> None:
+        """Evicted entries' heap items should be compacted away."""
+        cache = AuthCache(max_items=8, shards=1)
+        for index in range(1000):
+            cache.put(f'token-{index}', 'user', expires_at=2e9)
+        # pylint: disable=protected-access
+        shard = cache._shards[0]
+        self.assertEqual(len(shard.entries), 8)
+        self.assertLessEqual(len(shard.expiry), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+"""Unit tests for ETag matching on conditional GETs."""
+
+import unittest
+
+from server.conditional import etag_matches, version_etag
+
+
+class EtagMatchTest(unittest.TestCase):
+    """Validate If-None-Match parsing and weak comparison."""
+
+    def test_versions_become_weak_etags(self) -> None:
+        """The data version should lead the tag, followed by its scope."""
+        self.assertEqual(version_etag(7), 'W/"v7"')
+        scoped = version_etag(7, '/archives?[]')
+        self.assertRegex(scoped, r'^W/"v7-[0-9a-f]{16}"$')
+        self.assertNotEqual(scoped, version_etag(7, '/selection?[]'))
+        self.assertEqual(scoped, version_etag(7, '/archives?[]'))
+
+    def test_matching_is_weak_and_list_aware(self) -> None:
+        """Listed, strong-form and wildcard tags should all match."""
+        etag = version_etag(3)
+        self.assertTrue(etag_matches('W/"v3"', etag))
+        self.assertTrue(etag_matches('"v3"', etag))
+        self.assertTrue(etag_matches('W/"v1", W/"v3"', etag))
+        self.assertTrue(etag_matches('*', etag))
+
+    def test_other_or_missing_tags_do_not_match(self) -> None:
+        """Stale or absent validators should get a full response."""
+        etag = version_etag(3)
+        self.assertFalse(etag_matches(None, etag))
+        self.assertFalse(etag_matches('', etag))
+        self.assertFalse(etag_matches('W/"v2"', etag))
+        self.assertFalse(etag_matches('W/"v33"', etag))
+
+
+if __name__ == '__main__':
+    unittest.main()
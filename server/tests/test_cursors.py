@@ -0,0 +1,118 @@
+"""Unit tests for archive pagination cursors."""
+
+from datetime import datetime, timezone
+import unittest
+
+from fastapi import HTTPException
+
+from server.cursors import (
+    count_archive_file_days,
+    decode_archive_cursor,
+    encode_archive_cursor,
+    paginate_archive_file_items,
+)
+from server.validation import (
+    sanitize_archive_page_limit,
+    sanitize_archive_range,
+    sanitize_calendar_range,
+)
+
+
+class CursorTest(unittest.TestCase):
+    """Validate cursor round trips, rejection and file pagination."""
+
+    def test_archive_cursor_round_trips(self) -> None:
+        """A cursor should decode to the row it was built from."""
+        archived_at = datetime(2024, 5, 1, 12, 30, 0, 123456, timezone.utc)
+        cursor = encode_archive_cursor(archived_at, 42)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_archive_cursor(cursor), (archived_at, 42))
+        self.assertIsNone(decode_archive_cursor(None))
+
+    def test_malformed_cursors_are_rejected(self) -> None:
+        """Garbage, wrong shapes and wrong types should raise 400."""
+        for cursor in (
+            '!!!',
+            'bm90LWpzb24',
+            encode_archive_cursor(datetime.now(timezone.utc), 1)[:-4],
+            'WyJ4IiwxXQ',
+            'WzEsMl0',
+            'WyIyMDI0LTA1LTAxIix0cnVlXQ',
+        ):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(HTTPException) as context:
+                    decode_archive_cursor(cursor)
+                self.assertEqual(context.exception.status_code, 400)
+
+    def test_page_limit_is_clamped(self) -> None:
+        """Page sizes should default and stay within bounds."""
+        self.assertIsNone(sanitize_archive_page_limit(None))
+        self.assertEqual(sanitize_archive_page_limit(None, 'cursor'), 100)
+        self.assertEqual(sanitize_archive_page_limit(0), 1)
+        self.assertEqual(sanitize_archive_page_limit(10_000), 500)
+
+    def test_file_items_without_limit_are_not_paged(self) -> None:
+        """Legacy full-list reads should get every item and no cursor."""
+        items = [
+            {'video_id': f'video{index}', 'archived_at': index}
+            for index in range(5)
+        ]
+        page = paginate_archive_file_items(items, limit=None, raw_cursor=None)
+        self.assertEqual(len(page['items']), 5)
+        self.assertIsNone(page['next_cursor'])
+
+    def test_file_items_page_in_db_order(self) -> None:
+        """The file fallback should page newest first with a cursor."""
+        items = [
+            {'video_id': f'video{index}', 'archived_at': index // 2}
+            for index in range(5)
+        ]
+        first = paginate_archive_file_items(items, limit=2, raw_cursor=None)
+        self.assertEqual(
+            [item['video_id'] for item in first['items']],
+            ['video4', 'video3'],
+        )
+        rest = paginate_archive_file_items(
+            items, limit=10, raw_cursor=first['next_cursor'],
+        )
+        self.assertEqual(
+            [item['video_id'] for item in rest['items']],
+            ['video2', 'video1', 'video0'],
+        )
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_file_items_window_and_day_counts(self) -> None:
+        """The file fallback should window and bucket like the DB path."""
+        day_ms = 86_400_000
+        items = [
+            {'video_id': f'video{index}', 'archived_at': index * day_ms // 2}
+            for index in range(6)
+        ]
+        window = sanitize_archive_range(day_ms // 2, 2 * day_ms)
+        page = paginate_archive_file_items(
+            items, limit=10, raw_cursor=None, window=window,
+        )
+        self.assertEqual(
+            [item['video_id'] for item in page['items']],
+            ['video3', 'video2', 'video1'],
+        )
+        calendar = count_archive_file_days(
+            items, window=window, offset_minutes=-60,
+        )
+        self.assertEqual(calendar['days'], [
+            {'day': '1970-01-01', 'count': 2},
+            {'day': '1970-01-02', 'count': 1},
+        ])
+
+    def test_ranges_are_validated(self) -> None:
+        """Inverted, unbounded or overlong ranges should raise 400."""
+        self.assertEqual(sanitize_archive_range(None, None), (None, None))
+        for bounds in ((10, 10), (10, 5), (10**20, None)):
+            with self.assertRaises(HTTPException):
+                sanitize_archive_range(*bounds)
+        with self.assertRaises(HTTPException):
+            sanitize_calendar_range(0, 401 * 86_400_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
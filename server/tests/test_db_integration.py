@@ -3,6 +3,7 @@
 import importlib
 import os
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import threading
 import unittest
 import uuid
@@ -171,7 +172,7 @@ class DatabaseIntegrationTest(unittest.TestCase):
         with db_module.get_session() as session:
             session.add(models.User(id=user_id, plan_tier='free'))
             for channel_id in ('channel-a', 'channel-b', 'channel-c', 'channel-d'):
-                session.add(
+                session.merge(
                     models.Channel(
                         id=channel_id,
                         youtube_channel_id=channel_id,
@@ -263,6 +264,245 @@ class DatabaseIntegrationTest(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json().get('items', []), [])
 
+    def test_archive_toggle_upserts_merge_metadata(self) -> None:
+        """Dialect upserts should archive, unarchive and merge metadata."""
+        import server.db as db_module
+        import server.models as models
+
+        user_id = f'user_{uuid.uuid4().hex}'
+        video_id = f'video_{uuid.uuid4().hex}'
+
+        def _toggle(**fields):
+            response = self.client.post(
+                '/archives/toggle',
+                json={'user_id': user_id, 'video_id': video_id, **fields},
+            )
+            self.assertEqual(response.status_code, 200)
+            return response.json()
+
+        def _data_version():
+            with db_module.get_session() as session:
+                return session.get(models.User, user_id).data_version
+
+        first = _toggle(
+            archived=True,
+            title='First title',
+            thumbnail_url='https://example.com/first.jpg',
+            channel_id='channel-merge',
+            channel_title='Merge Channel',
+            channel_thumbnail_url='https://example.com/channel.jpg',
+        )
+        self.assertEqual(first['channel_id'], 'channel-merge')
+        version = _data_version()
+
+        # Missing fields keep the stored values instead of clearing them.
+        second = _toggle(archived=True, title='Second title')
+        self.assertEqual(second['title'], 'Second title')
+        self.assertEqual(
+            second['thumbnail_url'], 'https://example.com/first.jpg',
+        )
+        self.assertEqual(second['channel_id'], 'channel-merge')
+        self.assertEqual(second['channel_title'], 'Merge Channel')
+        self.assertEqual(
+            second['channel_thumbnail_url'],
+            'https://example.com/channel.jpg',
+        )
+        self.assertEqual(second['archived_at'], first['archived_at'])
+        self.assertGreater(_data_version(), version)
+
+        self.assertFalse(_toggle()['archived'])
+        self.assertFalse(_toggle(archived=False)['archived'])
+        implicit = _toggle()
+        self.assertTrue(implicit['archived'])
+        self.assertEqual(implicit['title'], 'Second title')
+
+        with db_module.get_session() as session:
+            archives = (
+                session.query(models.Archive)
+                .filter(models.Archive.user_id == user_id)
+                .all()
+            )
+            video = session.get(models.Video, video_id)
+            channel = session.get(models.Channel, 'channel-merge')
+            self.assertEqual(
+                [archive.video_id for archive in archives], [video_id],
+            )
+            self.assertEqual(video.channel_id, 'channel-merge')
+            self.assertEqual(video.title, 'Second title')
+            self.assertEqual(channel.title, 'Merge Channel')
+
+    def test_shared_metadata_changes_bump_other_archivers(self) -> None:
+        """A new title from one user should move every archiver's ETag."""
+        owner = f'user_{uuid.uuid4().hex}'
+        other = f'user_{uuid.uuid4().hex}'
+        video_id = f'video_{uuid.uuid4().hex}'
+
+        def _archive(user_id: str, title: str) -> None:
+            response = self.client.post('/archives/toggle', json={
+                'user_id': user_id,
+                'video_id': video_id,
+                'archived': True,
+                'title': title,
+            })
+            self.assertEqual(response.status_code, 200)
+
+        def _archives(etag: str = ''):
+            return self.client.get(
+                '/archives',
+                params={'user_id': owner},
+                headers={'If-None-Match': etag} if etag else {},
+            )
+
+        _archive(owner, 'Old title')
+        etag = _archives().headers['ETag']
+        _archive(other, 'Old title')
+        self.assertEqual(_archives(etag).status_code, 304)
+        _archive(other, 'New title')
+        response = _archives(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items'][0]['title'], 'New title')
+
+    def test_archive_without_channel_uses_placeholder(self) -> None:
+        """A first archive without channel data should use the placeholder."""
+        from server.config import (
+            ARCHIVE_PLACEHOLDER_CHANNEL_ID,
+            ARCHIVE_PLACEHOLDER_VIDEO_TITLE,
+        )
+
+        response = self.client.post(
+            '/archives/toggle',
+            json={
+                'user_id': f'user_{uuid.uuid4().hex}',
+                'video_id': f'video_{uuid.uuid4().hex}',
+                'archived': True,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['channel_id'], ARCHIVE_PLACEHOLDER_CHANNEL_ID)
+        self.assertEqual(body['title'], ARCHIVE_PLACEHOLDER_VIDEO_TITLE)
+
+    def test_archive_batch_bulk_upserts(self) -> None:
+        """Batches should archive, merge and remove in one transaction."""
+        user_id = f'user_{uuid.uuid4().hex}'
+        prefix = uuid.uuid4().hex[:12]
+        kept, renamed, removed = (
+            f'video_{prefix}_{name}' for name in ('kept', 'renamed', 'gone')
+        )
+        for video_id in (renamed, removed):
+            response = self.client.post(
+                '/archives/toggle',
+                json={
+                    'user_id': user_id,
+                    'video_id': video_id,
+                    'archived': True,
+                    'title': 'Old title',
+                    'thumbnail_url': 'https://example.com/old.jpg',
+                    'channel_id': 'channel-batch',
+                    'channel_title': 'Batch Channel',
+                },
+            )
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(
+            '/archives/batch',
+            json={
+                'user_id': user_id,
+                'items': [
+                    {
+                        'video_id': kept,
+                        'archived': True,
+                        'title': 'Kept title',
+                        'channel_id': 'channel-batch',
+                    },
+                    {'video_id': removed, 'archived': False},
+                    {
+                        'video_id': renamed,
+                        'archived': True,
+                        'title': 'New title',
+                    },
+                ],
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['archived'], body['unarchived']), (2, 1))
+        results = body['results']
+        self.assertEqual(
+            [result['video_id'] for result in results],
+            [kept, removed, renamed],
+        )
+        self.assertEqual(results[0]['channel_title'], 'Batch Channel')
+        self.assertFalse(results[1]['archived'])
+        self.assertEqual(results[2]['title'], 'New title')
+        self.assertEqual(
+            results[2]['thumbnail_url'], 'https://example.com/old.jpg',
+        )
+        self.assertEqual(results[2]['channel_id'], 'channel-batch')
+
+        response = self.client.get('/archives', params={'user_id': user_id})
+        self.assertEqual(
+            {item['video_id'] for item in response.json()['items']},
+            {kept, renamed},
+        )
+
+    def test_archive_calendar_buckets_days_in_sql(self) -> None:
+        """Postgres should bucket archives into days at the given offset."""
+        import server.db as db_module
+        import server.models as models
+
+        user_id = f'user_{uuid.uuid4().hex}'
+        base = datetime(2026, 3, 10, tzinfo=timezone.utc)
+        stamps = [
+            base + timedelta(hours=1),
+            base + timedelta(hours=10),
+            base + timedelta(hours=23, minutes=30),
+            base + timedelta(days=1, hours=12),
+        ]
+        for index, archived_at in enumerate(stamps):
+            video_id = f'video_{uuid.uuid4().hex[:12]}_{index}'
+            response = self.client.post(
+                '/archives/toggle',
+                json={
+                    'user_id': user_id,
+                    'video_id': video_id,
+                    'archived': True,
+                },
+            )
+            self.assertEqual(response.status_code, 200)
+            with db_module.get_session() as session:
+                session.query(models.Archive).filter(
+                    models.Archive.user_id == user_id,
+                    models.Archive.video_id == video_id,
+                ).update({'archived_at': archived_at})
+                session.commit()
+
+        window = {
+            'from': int((base - timedelta(days=1)).timestamp() * 1000),
+            'to': int((base + timedelta(days=3)).timestamp() * 1000),
+        }
+        expected = {
+            0: [('2026-03-10', 3), ('2026-03-11', 1)],
+            540: [('2026-03-10', 2), ('2026-03-11', 2)],
+            -300: [('2026-03-09', 1), ('2026-03-10', 2), ('2026-03-11', 1)],
+        }
+        for offset, days in expected.items():
+            with self.subTest(offset=offset):
+                response = self.client.get(
+                    '/archives/calendar',
+                    params={
+                        'user_id': user_id,
+                        'utc_offset_minutes': offset,
+                        **window,
+                    },
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [(day['day'], day['count'])
+                     for day in response.json()['days']],
+                    days,
+                )
+
     def test_user_state_roundtrip(self) -> None:
         """Persist and fetch per-user app state using the database."""
         user_id = f'user_{uuid.uuid4().hex}'
@@ -436,6 +676,94 @@ class DatabaseIntegrationTest(unittest.TestCase):
         self.assertEqual(upsert_response.status_code, 200)
         self.assertEqual(state_response.status_code, 200)
 
+    def test_cache_sweeper_deletes_expired_rows_in_batches(self) -> None:
+        """Expired transcript cache rows should be swept, fresh ones kept."""
+        import server.cache_sweeper as cache_sweeper
+        import server.db as db
+        from server.models import TranscriptCache
+
+        importlib.reload(cache_sweeper)
+        now = datetime.now(timezone.utc)
+        prefix = uuid.uuid4().hex[:8]
+        with db.get_session() as session:
+            for index in range(5):
+                session.add(
+                    TranscriptCache(
+                        video_id=f'{prefix}old{index}',
+                        text='old',
+                        created_at=now - timedelta(days=30),
+                    )
+                )
+            session.add(
+                TranscriptCache(video_id=f'{prefix}new', text='new')
+            )
+            session.commit()
+
+        sweeper = cache_sweeper.CacheSweeper(
+            batch_size=2,
+            max_batches=10,
+            retention_seconds=3600,
+        )
+        self.assertGreaterEqual(sweeper.sweep_database(), 5)
+
+        with db.get_session() as session:
+            remaining = {
+                row.video_id
+                for row in session.query(TranscriptCache).filter(
+                    TranscriptCache.video_id.like(f'{prefix}%')
+                )
+            }
+        self.assertEqual(remaining, {f'{prefix}new'})
+
+    def test_single_flight_holds_advisory_lock_while_computing(self) -> None:
+        """Other sessions should see the lock only while compute runs."""
+        import server.db as db
+        import server.single_flight as single_flight
+
+        importlib.reload(single_flight)
+        video_id = f'vid{uuid.uuid4().hex[:8]}'
+        lock_id = single_flight.advisory_lock_id(video_id)
+
+        def _try_lock() -> bool:
+            with db.get_session() as session:
+                acquired = session.execute(
+                    text('SELECT pg_try_advisory_lock(:lock_id)'),
+                    {'lock_id': lock_id},
+                ).scalar()
+                if acquired:
+                    session.execute(
+                        text('SELECT pg_advisory_unlock(:lock_id)'),
+                        {'lock_id': lock_id},
+                    )
+                return bool(acquired)
+
+        flight = single_flight.AdvisoryLockSingleFlight(enabled=True)
+        seen_during_compute = []
+        result = flight.run(
+            video_id,
+            lambda: seen_during_compute.append(_try_lock()) or 'done',
+            lambda: None,
+        )
+        self.assertEqual(result, 'done')
+        self.assertEqual(seen_during_compute, [False])
+        self.assertTrue(_try_lock())
+        self.assertEqual(flight.stats()['acquired'], 1)
+
+    def test_rate_limit_counter_is_exact_under_concurrency(self) -> None:
+        """Concurrent upserts should never lose or double-count hits."""
+        import server.rate_limit as rate_limit
+
+        importlib.reload(rate_limit)
+        backend = rate_limit.DatabaseRateLimitBackend()
+        key = f'transcript:{uuid.uuid4().hex}'
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda _: backend.hit(key, limit=10, window_seconds=3600)[0],
+                range(16),
+            ))
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(results.count(False), 6)
+
 
 if __name__ == '__main__':
     unittest.main()
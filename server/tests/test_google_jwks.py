@@ -0,0 +1,137 @@
+"""Unit tests for the background-refreshed Google JWKS store."""
+
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from server.google_jwks import (
+    GoogleJwksStore,
+    JwksUnavailableError,
+    extract_max_age,
+)
+
+
+class _FakeResponse:
+    def __init__(self, kids, max_age=1000, status_code=200) -> None:
+        self.status_code = status_code
+        self.headers = {'Cache-Control': f'public, max-age={max_age}'}
+        self._kids = kids
+
+    def json(self):
+        """Return a JWKS document with one symmetric key per kid."""
+        return {
+            'keys': [
+                {'kty': 'oct', 'kid': kid, 'k': 'c2VjcmV0', 'alg': 'HS256'}
+                for kid in self._kids
+            ],
+        }
+
+
+class _FakeFetch:
+    def __init__(self, *responses) -> None:
+        self.responses = list(responses)
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self, url, timeout):
+        del url, timeout
+        self.calls += 1
+        self.called.set()
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class GoogleJwksStoreTest(unittest.TestCase):
+    """Validate refresh timing, atomic swaps and failure handling."""
+
+    def test_max_age_parsing(self) -> None:
+        """Cache-Control max-age should be extracted when present."""
+        self.assertEqual(extract_max_age('public, max-age=19800'), 19800)
+        self.assertIsNone(extract_max_age('no-cache'))
+
+    def test_fresh_keys_are_served_without_fetching(self) -> None:
+        """Only the first read of an empty store should fetch."""
+        fetch = _FakeFetch(_FakeResponse(['a']))
+        store = GoogleJwksStore(fetch=fetch)
+        first = store.keys()
+        second = store.keys()
+        self.assertIs(first, second)
+        self.assertEqual(set(first), {'a'})
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(store.stats()['blocking_fetches'], 1)
+
+    def test_refresh_is_scheduled_before_expiry(self) -> None:
+        """The background refresh should fire at the configured fraction."""
+        store = GoogleJwksStore(
+            fetch=_FakeFetch(_FakeResponse(['a'], max_age=1000)),
+            refresh_fraction=0.8,
+        )
+        with patch('server.google_jwks.time.time', return_value=5000.0):
+            store.refresh()
+            stats = store.stats()
+        self.assertEqual(stats['refresh_in_seconds'], 800)
+        self.assertEqual(stats['expires_in_seconds'], 1000)
+
+    def test_refresh_swaps_the_whole_map(self) -> None:
+        """Readers holding the old map should never see it change."""
+        store = GoogleJwksStore(
+            fetch=_FakeFetch(_FakeResponse(['a']), _FakeResponse(['b'])),
+        )
+        old = store.keys()
+        new = store.refresh()
+        self.assertEqual(set(old), {'a'})
+        self.assertEqual(set(new), {'b'})
+        self.assertIs(store.keys(), new)
+
+    def test_failed_refresh_keeps_the_current_keys(self) -> None:
+        """A failing fetch should raise but leave valid keys in place."""
+        store = GoogleJwksStore(
+            fetch=_FakeFetch(
+                _FakeResponse(['a']),
+                requests.ConnectionError('down'),
+                _FakeResponse([], status_code=503),
+            ),
+        )
+        keys = store.keys()
+        for _ in range(2):
+            with self.assertRaises(JwksUnavailableError):
+                store.refresh()
+        self.assertIs(store.keys(), keys)
+        self.assertEqual(store.stats()['refresh_failures'], 2)
+
+    def test_unknown_kid_refreshes_are_throttled(self) -> None:
+        """A flood of unknown kids should trigger one fetch per interval."""
+        fetch = _FakeFetch(_FakeResponse(['a']), _FakeResponse(['a', 'b']))
+        store = GoogleJwksStore(fetch=fetch, unknown_kid_refresh_seconds=60)
+        store.keys()
+        clock = patch('server.google_jwks.time.monotonic', return_value=10.0)
+        with clock as monotonic:
+            results = [store.refresh_for_unknown_kid() for _ in range(50)]
+            self.assertEqual(fetch.calls, 2)
+            self.assertEqual(set(results[-1]), {'a', 'b'})
+            monotonic.return_value = 71.0
+            store.refresh_for_unknown_kid()
+        self.assertEqual(fetch.calls, 3)
+        stats = store.stats()
+        self.assertEqual(stats['unknown_kid_refreshes'], 2)
+        self.assertEqual(stats['unknown_kid_throttled'], 49)
+
+    def test_background_thread_fills_an_empty_store(self) -> None:
+        """Starting the refresher should fetch keys without a request."""
+        fetch = _FakeFetch(_FakeResponse(['a']))
+        store = GoogleJwksStore(fetch=fetch)
+        store.start()
+        try:
+            self.assertTrue(fetch.called.wait(timeout=5))
+        finally:
+            store.stop()
+        self.assertEqual(set(store.keys()), {'a'})
+        self.assertEqual(store.stats()['blocking_fetches'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
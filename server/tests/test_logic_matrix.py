@@ -12,6 +12,7 @@ import server.app as backend
 from server.transcript_utils import (
     build_transcript_cache_key as _build_transcript_cache_key,
     sanitize_max_chars as _sanitize_max_chars,
+    truncate_summary as _truncate_summary,
 )
 
 
@@ -51,9 +52,11 @@ _CACHE_KEY_CASES = list(
         ['video_alpha01', 'video_beta_02'],
         [300, 1200, 10000],
         [False, True],
-        [None, 1, 3, 5],
     )
 )
+_TRUNCATE_SUMMARY_CASES = list(
+    product(range(1, len(_SUMMARY_LINES) + 1), [None, -1, 0, 1, 3, 5, 9])
+)
 _PARSER_CASES = [
     ('WEBVTT\n\n00:00.000 --> 00:01.000\nhello', 'vtt', 'hello'),
     ('{"events":[{"segs":[{"utf8":"hello"},{"utf8":" world"}]}]}', 'json3', 'hello world'),
@@ -66,6 +69,7 @@ _TOTAL_LOGIC_CASES = (
     + len(_SUMMARY_CASES)
     + len(_OPENED_VIDEO_CASES)
     + len(_CACHE_KEY_CASES)
+    + len(_TRUNCATE_SUMMARY_CASES)
     + len(_PARSER_CASES)
 )
 
@@ -173,25 +177,18 @@ class LogicMatrixTest(unittest.TestCase):
     def test_transcript_cache_key_matrix(self) -> None:
         """Transcript cache keys should be stable for normalized request shapes."""
         seen_by_signature = {}
-        for video_id, max_chars, summarize, summary_lines in _CACHE_KEY_CASES:
+        for video_id, max_chars, summarize in _CACHE_KEY_CASES:
             with self.subTest(
                 video_id=video_id,
                 max_chars=max_chars,
                 summarize=summarize,
-                summary_lines=summary_lines,
             ):
                 key = _build_transcript_cache_key(
                     video_id=video_id,
                     max_chars=max_chars,
                     summarize=summarize,
-                    summary_lines=summary_lines,
-                )
-                normalized_signature = (
-                    video_id,
-                    max_chars,
-                    summarize,
-                    max(1, min(5, summary_lines or 3)),
                 )
+                normalized_signature = (video_id, max_chars, summarize)
                 self.assertEqual(len(key), 32)
                 existing = seen_by_signature.get(normalized_signature)
                 if existing is None:
@@ -204,6 +201,23 @@ class LogicMatrixTest(unittest.TestCase):
             len(seen_by_signature),
         )
 
+    def test_truncate_summary_matrix(self) -> None:
+        """Ranked summaries should truncate to the clamped requested lines."""
+        for available_lines, requested_lines in _TRUNCATE_SUMMARY_CASES:
+            with self.subTest(
+                available_lines=available_lines,
+                requested_lines=requested_lines,
+            ):
+                source = '\n'.join(_SUMMARY_LINES[:available_lines])
+                expected_lines = min(
+                    available_lines,
+                    max(1, min(5, requested_lines or 3)),
+                )
+                self.assertEqual(
+                    _truncate_summary(source, requested_lines).splitlines(),
+                    _SUMMARY_LINES[:expected_lines],
+                )
+
     def test_caption_payload_parser_matrix(self) -> None:
         """Caption payload dispatch should select the correct parser."""
         for raw, ext, expected in _PARSER_CASES:
@@ -0,0 +1,231 @@
+"""Unit tests for background transcript pre-warming."""
+
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+os.environ.setdefault('BACKEND_REQUIRE_AUTH', 'false')
+
+import server.app as backend
+from server.prewarm import (
+    FeedSource,
+    PrewarmScheduler,
+    StaticFeedSource,
+    parse_upload_feed,
+)
+
+
+class PrewarmSchedulerTest(unittest.TestCase):
+    """Validate candidate selection, budgets, and cache warm-up."""
+
+    def _scheduler(self, feed, warm_video, **overrides):
+        options = {
+            'feed_source': feed,
+            'warm_video': warm_video,
+            'channel_loader': lambda: ['chan-a', 'chan-b'],
+            'max_concurrency': 2,
+            'max_videos_per_channel': 3,
+            'max_video_age_seconds': 3600,
+            'cost_budget': 100,
+            'captions_cost': 1,
+            'audio_cost': 10,
+        }
+        options.update(overrides)
+        return PrewarmScheduler(**options)
+
+    def test_warms_union_of_channels_once(self) -> None:
+        """Shared uploads should be warmed once and never re-queued."""
+        now = time.time()
+        feed = StaticFeedSource({
+            'chan-a': [
+                {'video_id': 'video_0001', 'published_at': now},
+                {'video_id': 'video_0002', 'published_at': now},
+            ],
+            'chan-b': [
+                {'video_id': 'video_0002', 'published_at': now},
+                {'video_id': 'video_0003', 'published_at': now - 7200},
+            ],
+        })
+        warmed = []
+        scheduler = self._scheduler(
+            feed,
+            lambda video_id, _allow_audio: warmed.append(video_id)
+            or 'captions',
+        )
+        self.assertEqual(scheduler.run_once(), 2)
+        self.assertEqual(sorted(warmed), ['video_0001', 'video_0002'])
+        self.assertEqual(scheduler.run_once(), 0)
+        self.assertEqual(len(warmed), 2)
+
+    def test_cost_budget_is_a_rolling_window(self) -> None:
+        """The budget should span cycles and free up as spend ages out."""
+        feed = StaticFeedSource({
+            'chan-a': [
+                {'video_id': f'video_000{index}', 'published_at': None}
+                for index in range(3)
+            ],
+        })
+        scheduler = self._scheduler(
+            feed,
+            lambda _video_id, _allow_audio: 'captions',
+            channel_loader=lambda: ['chan-a'],
+            max_concurrency=1,
+            cost_budget=2,
+            cost_window_seconds=600,
+        )
+        self.assertEqual(scheduler.run_once(), 2)
+        self.assertEqual(scheduler.run_once(), 0)
+        stats = scheduler.stats()
+        self.assertEqual(stats['skipped_budget'], 2)
+        self.assertEqual(stats['cost_spent'], 2)
+        with patch('server.prewarm.time.time', return_value=time.time() + 601):
+            self.assertEqual(scheduler.run_once(), 1)
+        self.assertEqual(scheduler.stats()['cost_spent'], 3)
+
+    def test_cache_hits_and_failures_are_free(self) -> None:
+        """Only jobs that fetched captions or ran Whisper use the budget."""
+        feed = StaticFeedSource({
+            'chan-a': [
+                {'video_id': f'video_000{index}', 'published_at': None}
+                for index in range(4)
+            ],
+        })
+        outcomes = ['cached', None, 'cached', 'captions']
+
+        def _warm(_video_id, _allow_audio):
+            outcome = outcomes.pop(0)
+            if outcome is None:
+                raise RuntimeError('feed went away')
+            return outcome
+
+        scheduler = self._scheduler(
+            feed,
+            _warm,
+            channel_loader=lambda: ['chan-a'],
+            max_concurrency=1,
+            max_videos_per_channel=4,
+            cost_budget=1,
+        )
+        with self.assertLogs(level='ERROR'):
+            self.assertEqual(scheduler.run_once(), 1)
+        stats = scheduler.stats()
+        self.assertEqual(stats['cost_spent'], 1)
+        self.assertEqual(stats['already_cached'], 2)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_failed_jobs_are_retried_with_backoff(self) -> None:
+        """Failures and caption-less uploads should be retried later."""
+        feed = StaticFeedSource({
+            'chan-a': [{'video_id': 'video_0001', 'published_at': None}],
+        })
+        outcomes = [None, 'captions']
+        attempts = []
+
+        def _warm(video_id, _allow_audio):
+            attempts.append(video_id)
+            return outcomes.pop(0)
+
+        scheduler = self._scheduler(
+            feed,
+            _warm,
+            channel_loader=lambda: ['chan-a'],
+            interval_seconds=60,
+        )
+        self.assertEqual(scheduler.run_once(), 0)
+        self.assertEqual(scheduler.run_once(), 0)
+        self.assertEqual(len(attempts), 1)
+        with patch('server.prewarm.time.time', return_value=time.time() + 61):
+            self.assertEqual(scheduler.run_once(), 1)
+        self.assertEqual(scheduler.run_once(), 0)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(scheduler.stats()['failed'], 1)
+
+    def test_audio_jobs_reserve_worst_case_cost(self) -> None:
+        """The budget should never be overspent by Whisper fallbacks."""
+        feed = StaticFeedSource({
+            'chan-a': [
+                {'video_id': f'video_000{index}', 'published_at': None}
+                for index in range(3)
+            ],
+        })
+        scheduler = self._scheduler(
+            feed,
+            lambda _video_id, _allow_audio: 'whisper',
+            channel_loader=lambda: ['chan-a'],
+            max_concurrency=1,
+            cost_budget=15,
+            allow_audio=True,
+        )
+        self.assertEqual(scheduler.run_once(), 1)
+        stats = scheduler.stats()
+        self.assertEqual(stats['cost_spent'], 10)
+        self.assertEqual(stats['skipped_budget'], 2)
+
+    def test_feed_source_is_abstract(self) -> None:
+        """Feed sources must implement recent_uploads."""
+        with self.assertRaises(TypeError):
+            FeedSource()  # pylint: disable=abstract-class-instantiated
+
+    def test_parse_upload_feed_extracts_ids_and_dates(self) -> None:
+        """RSS entries should yield video ids with publish timestamps."""
+        raw = (
+            '<feed><entry><yt:videoId>abc12345xyz</yt:videoId>'
+            '<published>2026-10-18T12:00:00+00:00</published></entry>'
+            '<entry><yt:videoId>../bad</yt:videoId></entry></feed>'
+        )
+        uploads = parse_upload_feed(raw)
+        self.assertEqual(len(uploads), 1)
+        self.assertEqual(uploads[0]['video_id'], 'abc12345xyz')
+        self.assertIsNotNone(uploads[0]['published_at'])
+
+    def test_prewarmed_video_is_cache_hit_on_first_open(self) -> None:
+        """A pre-warmed upload should be served from cache on first open."""
+        store: dict[str, dict] = {}
+        with patch.object(backend, 'load_cache', side_effect=store.get):
+            with patch.object(
+                backend,
+                'save_cache',
+                side_effect=store.__setitem__,
+            ):
+                with patch(
+                    'server.transcript_utils.fetch_caption_text',
+                    return_value='caption text',
+                ):
+                    with patch(
+                        'server.transcript_utils.build_summary',
+                        return_value='요약',
+                    ):
+                        source = backend._warm_transcript('abc12345xyz', False)
+                response = TestClient(backend.app).post(
+                    '/transcript',
+                    json={'video_id': 'abc12345xyz'},
+                )
+        self.assertEqual(source, 'captions')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json().get('cached'))
+
+    def test_prewarm_does_not_take_user_transcript_slots(self) -> None:
+        """Pre-warm jobs should run even when every user slot is busy."""
+        user_slots = backend.threading.Semaphore(0)
+        with patch.object(backend, 'TRANSCRIPT_SEMAPHORE', user_slots):
+            with patch.object(backend, 'load_cache', return_value=None):
+                with patch.object(backend, 'save_cache'):
+                    with patch(
+                        'server.transcript_utils.fetch_caption_text',
+                        return_value='caption text',
+                    ):
+                        with patch(
+                            'server.transcript_utils.build_summary',
+                            return_value='요약',
+                        ):
+                            source = backend._warm_transcript(
+                                'abc12345xyz', False,
+                            )
+        self.assertEqual(source, 'captions')
+
+
+if __name__ == '__main__':
+    unittest.main()
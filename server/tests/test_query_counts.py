@@ -0,0 +1,605 @@
+"""Statement-count budgets for the hot database endpoints."""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault('BACKEND_REQUIRE_AUTH', 'false')
+
+import server.app as backend
+from server.config import (
+    ARCHIVE_PAGE_DEFAULT_LIMIT,
+    ARCHIVE_PLACEHOLDER_CHANNEL_ID,
+)
+from server.models import Archive, Base, User, UserChannel, UserState
+from server.persistence import archive_calendar_query, upsert_archive
+
+
+class QueryCountTest(unittest.TestCase):
+    """Each endpoint should stay within its statement budget on SQLite."""
+
+    def setUp(self) -> None:
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.engine = create_engine(f'sqlite:///{self.path}')
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(
+            bind=self.engine, autoflush=False,
+        )
+        self.statements: list[str] = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        backend.WRITE_RATE_BUCKETS.clear()
+        self.client = TestClient(backend.app)
+        patches = (
+            patch.object(backend, 'is_db_enabled', return_value=True),
+            patch.object(backend, 'get_session', self._session_scope),
+        )
+        for active in patches:
+            active.start()
+            self.addCleanup(active.stop)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        os.unlink(self.path)
+
+    def _record(self, _conn, _cursor, statement, *_args) -> None:
+        self.statements.append(statement)
+
+    @contextmanager
+    def _session_scope(self):
+        session = self.session_factory()
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @contextmanager
+    def assert_statements(self, expected: int):
+        """Fail when the block runs a different number of statements."""
+        self.statements.clear()
+        yield
+        self.assertEqual(
+            len(self.statements), expected, '\n\n'.join(self.statements),
+        )
+
+    def _save_selection(self, user_id: str, selected_ids: list[str]):
+        return self.client.post(
+            '/selection',
+            json={
+                'user_id': user_id,
+                'channels': [
+                    {'id': channel_id, 'title': channel_id.upper()}
+                    for channel_id in ('chan-a', 'chan-b', 'chan-c')
+                ],
+                'selected_ids': selected_ids,
+            },
+        )
+
+    def test_selection_save_and_read(self) -> None:
+        """Saving takes five statements and reading takes two."""
+        with self.assert_statements(5):
+            response = self._save_selection('user_1', ['chan-a', 'chan-b'])
+        self.assertEqual(response.status_code, 200)
+        with self.assert_statements(2):
+            response = self.client.get(
+                '/selection', params={'user_id': 'user_1'},
+            )
+        self.assertEqual(
+            response.json(), {'selected_ids': ['chan-a', 'chan-b']},
+        )
+
+    def test_selection_read_trims_to_plan_limit(self) -> None:
+        """The joined plan tier should still cap the returned IDs."""
+        with self.session_factory() as session:
+            session.add(User(id='user_2', plan_tier='free'))
+            session.add_all([
+                UserChannel(
+                    user_id='user_2',
+                    channel_id=f'chan-{index}',
+                    is_selected=True,
+                )
+                for index in range(5)
+            ])
+            session.commit()
+        with self.assert_statements(2):
+            response = self.client.get(
+                '/selection', params={'user_id': 'user_2'},
+            )
+        self.assertEqual(
+            response.json()['selected_ids'], ['chan-0', 'chan-1', 'chan-2'],
+        )
+
+    def test_selection_read_without_user_row(self) -> None:
+        """Unknown users should read an empty selection."""
+        with self.assert_statements(2):
+            response = self.client.get(
+                '/selection', params={'user_id': 'user_missing'},
+            )
+        self.assertEqual(response.json(), {'selected_ids': []})
+
+    def test_user_state_read(self) -> None:
+        """Reading synced state should take the version and one SELECT."""
+        with self.session_factory() as session:
+            session.add_all([
+                User(id='user_3', plan_tier='free'),
+                UserState(
+                    user_id='user_3',
+                    selection_change_day=20240101,
+                    selection_changes_today=1,
+                    opened_video_ids='["abcdefghijk"]',
+                ),
+            ])
+            session.commit()
+        with self.assert_statements(2):
+            response = self.client.get(
+                '/user/state', params={'user_id': 'user_3'},
+            )
+        self.assertEqual(response.json()['opened_video_ids'], ['abcdefghijk'])
+
+    def test_user_upsert_returns_the_row(self) -> None:
+        """Upserting a profile should not re-select the user."""
+        with self.assert_statements(1):
+            response = self.client.post(
+                '/user/upsert',
+                json={'user_id': 'user_4', 'email': 'user4@example.com'},
+            )
+        self.assertEqual(response.json()['email'], 'user4@example.com')
+        self.assertEqual(response.json()['plan_tier'], 'free')
+
+
+    def _toggle(self, **payload):
+        return self.client.post(
+            '/archives/toggle',
+            json={'user_id': 'user_5', 'video_id': 'abcdefghijk', **payload},
+        )
+
+    def test_archive_toggle_upserts_and_returns_the_row(self) -> None:
+        """Archiving runs the upserts and no follow-up SELECTs.
+
+        Metadata adds the UPDATE that bumps other archivers of the video.
+        """
+        with self.assert_statements(5):
+            response = self._toggle(
+                archived=True,
+                title='Video title',
+                channel_id='chan-a',
+                channel_title='Channel A',
+            )
+        body = response.json()
+        self.assertEqual(
+            set(body),
+            {
+                'archived',
+                'video_id',
+                'archived_at',
+                'title',
+                'thumbnail_url',
+                'channel_id',
+                'channel_title',
+                'channel_thumbnail_url',
+            },
+        )
+        self.assertEqual(body['title'], 'Video title')
+        self.assertEqual(body['channel_title'], 'Channel A')
+
+        with self.assert_statements(4):
+            again = self._toggle(archived=True).json()
+        self.assertEqual(again['archived_at'], body['archived_at'])
+        self.assertEqual(again['title'], 'Video title')
+        self.assertEqual(again['channel_id'], 'chan-a')
+        self.assertEqual(again['channel_title'], 'Channel A')
+
+    def test_archive_toggle_flips_state(self) -> None:
+        """An implicit toggle should delete, then re-create, the archive."""
+        self._toggle(archived=True)
+        with self.assert_statements(2):
+            response = self._toggle()
+        self.assertEqual(
+            response.json(), {'archived': False, 'video_id': 'abcdefghijk'},
+        )
+        response = self._toggle()
+        self.assertTrue(response.json()['archived'])
+        self.assertEqual(
+            response.json()['channel_id'], ARCHIVE_PLACEHOLDER_CHANNEL_ID,
+        )
+        with self.session_factory() as session:
+            self.assertEqual(session.query(Archive).count(), 1)
+            self.assertIsNotNone(session.get(User, 'user_5'))
+
+    def test_postgres_archive_upsert_is_one_statement(self) -> None:
+        """Postgres should get the whole upsert as one CTE statement."""
+        session = MagicMock()
+        session.bind.dialect.name = 'postgresql'
+        session.execute.return_value.one.return_value = MagicMock(
+            archived_at=datetime.now(timezone.utc),
+        )
+        upsert_archive(
+            session,
+            'user_6',
+            'abcdefghijk',
+            {
+                'title': 'New title',
+                'thumbnail_url': None,
+                'channel_id': None,
+                'channel_title': None,
+                'channel_thumbnail_url': None,
+            },
+        )
+        self.assertEqual(session.execute.call_count, 1)
+        sql = str(
+            session.execute.call_args[0][0].compile(
+                dialect=postgresql.dialect(),
+            )
+        )
+        for table in ('users', 'channels', 'videos', 'archives'):
+            self.assertIn(f'INSERT INTO {table}', sql)
+        self.assertIn('UPDATE users', sql)
+
+
+    def test_archive_listing_pages_with_a_cursor(self) -> None:
+        """Pages should cover every archive once, ties included."""
+        same_time = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        with self.session_factory() as session:
+            session.add(User(id='user_7', plan_tier='free'))
+            session.add_all([
+                Archive(
+                    user_id='user_7',
+                    video_id=f'video{index:06d}',
+                    archived_at=same_time if index < 4 else datetime(
+                        2024, 5, index, tzinfo=timezone.utc,
+                    ),
+                )
+                for index in range(8)
+            ])
+            session.commit()
+        seen: list[str] = []
+        cursor = None
+        while True:
+            params = {'user_id': 'user_7', 'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            with self.assert_statements(3):
+                body = self.client.get('/archives', params=params).json()
+            self.assertLessEqual(len(body['items']), 3)
+            seen.extend(item['video_id'] for item in body['items'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(
+            seen[:4],
+            ['video000007', 'video000006', 'video000005', 'video000004'],
+        )
+        self.assertEqual(
+            sorted(seen[4:]), [f'video{index:06d}' for index in range(4)],
+        )
+
+    def test_archive_listing_without_paging_returns_everything(self) -> None:
+        """Clients that predate paging should still get the full list."""
+        with self.session_factory() as session:
+            session.add(User(id='user_9', plan_tier='free'))
+            session.add_all([
+                Archive(user_id='user_9', video_id=f'video{index:06d}')
+                for index in range(ARCHIVE_PAGE_DEFAULT_LIMIT + 5)
+            ])
+            session.commit()
+        with self.assert_statements(3):
+            body = self.client.get(
+                '/archives', params={'user_id': 'user_9'},
+            ).json()
+        self.assertEqual(len(body['items']), ARCHIVE_PAGE_DEFAULT_LIMIT + 5)
+        self.assertIsNone(body['next_cursor'])
+
+    def test_archive_listing_rejects_bad_cursors(self) -> None:
+        """A malformed cursor should be a client error."""
+        response = self.client.get(
+            '/archives', params={'user_id': 'user_8', 'cursor': 'not-json'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['detail'], 'invalid cursor')
+
+    def _batch(self, items):
+        return self.client.post(
+            '/archives/batch', json={'user_id': 'user_10', 'items': items},
+        )
+
+    def test_archive_batch_runs_a_fixed_number_of_statements(self) -> None:
+        """Bulk upserts and one delete should cover any batch size."""
+        self._toggle(archived=True, channel_id='chan-a', title='Old title')
+        items = [
+            {
+                'video_id': f'video{index:06d}',
+                'archived': True,
+                'title': f'Video {index}',
+                'channel_id': 'chan-b' if index % 2 else None,
+                'channel_title': 'Channel B' if index % 2 else None,
+            }
+            for index in range(20)
+        ]
+        items.append({'video_id': 'abcdefghijk', 'archived': False})
+        with self.assert_statements(8):
+            response = self._batch(items)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['archived'], body['unarchived']), (20, 1))
+        results = body['results']
+        self.assertEqual(
+            [result['video_id'] for result in results],
+            [item['video_id'] for item in items],
+        )
+        self.assertEqual(results[1]['channel_title'], 'Channel B')
+        self.assertEqual(
+            results[0]['channel_id'], ARCHIVE_PLACEHOLDER_CHANNEL_ID,
+        )
+        self.assertEqual(results[0]['title'], 'Video 0')
+        self.assertEqual(
+            results[-1], {'archived': False, 'video_id': 'abcdefghijk'},
+        )
+
+        again = self._batch([
+            {'video_id': 'video000001', 'archived': True},
+            {'video_id': 'abcdefghijk', 'archived': True},
+        ]).json()['results']
+        self.assertEqual(again[0]['archived_at'], results[1]['archived_at'])
+        self.assertEqual(again[0]['title'], 'Video 1')
+        self.assertEqual(again[0]['channel_id'], 'chan-b')
+        self.assertEqual(again[1]['title'], 'Old title')
+        self.assertEqual(again[1]['channel_id'], 'chan-a')
+        with self.session_factory() as session:
+            self.assertEqual(
+                session.query(Archive).filter_by(user_id='user_10').count(),
+                21,
+            )
+
+    def test_archive_batch_rejects_bad_batches(self) -> None:
+        """Empty, duplicated or oversized batches should be refused."""
+        duplicate = {'video_id': 'abcdefghijk', 'archived': True}
+        for items in ([], [duplicate, duplicate]):
+            self.assertEqual(self._batch(items).status_code, 400)
+        oversized = [
+            {'video_id': f'video{index:06d}', 'archived': False}
+            for index in range(201)
+        ]
+        self.assertEqual(self._batch(oversized).status_code, 400)
+
+    def test_archive_batch_is_one_weighted_write(self) -> None:
+        """A batch should spend write budget by size in one charge."""
+        items = [
+            {'video_id': f'video{index:06d}', 'archived': False}
+            for index in range(25)
+        ]
+        with patch.object(backend, 'WRITE_RATE_LIMIT_PER_WINDOW', 5):
+            self.assertEqual(self._batch(items).status_code, 200)
+            self.assertEqual(self._batch(items).status_code, 429)
+
+    def _add_archives(self, user_id: str, times: list[datetime]) -> None:
+        with self.session_factory() as session:
+            session.add(User(id=user_id, plan_tier='free'))
+            session.add_all([
+                Archive(
+                    user_id=user_id,
+                    video_id=f'video{index:06d}',
+                    archived_at=archived_at,
+                )
+                for index, archived_at in enumerate(times)
+            ])
+            session.commit()
+
+    def test_archive_listing_filters_by_date_range(self) -> None:
+        """from/to should bound the page, end exclusive, across cursors."""
+        start = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        self._add_archives(
+            'user_11', [start + timedelta(hours=12 * i) for i in range(8)],
+        )
+        params = {
+            'user_id': 'user_11',
+            'limit': 2,
+            'from': int((start + timedelta(days=1)).timestamp() * 1000),
+            'to': int((start + timedelta(days=3)).timestamp() * 1000),
+        }
+        seen: list[str] = []
+        while True:
+            body = self.client.get('/archives', params=params).json()
+            seen.extend(item['video_id'] for item in body['items'])
+            if body['next_cursor'] is None:
+                break
+            params['cursor'] = body['next_cursor']
+        self.assertEqual(
+            seen, ['video000005', 'video000004', 'video000003', 'video000002'],
+        )
+        params['from'] = params['to']
+        response = self.client.get('/archives', params=params)
+        self.assertEqual(response.status_code, 400)
+
+    def test_calendar_counts_days_in_sql(self) -> None:
+        """Per-day counts should come from one grouped query."""
+        start = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        self._add_archives('user_12', [
+            start + timedelta(hours=hours) for hours in (1, 2, 23, 30, 80)
+        ])
+        params = {
+            'user_id': 'user_12',
+            'from': int(start.timestamp() * 1000),
+            'to': int((start + timedelta(days=3)).timestamp() * 1000),
+        }
+        with self.assert_statements(2):
+            body = self.client.get('/archives/calendar', params=params).json()
+        self.assertEqual(body['days'], [
+            {'day': '2024-05-01', 'count': 3},
+            {'day': '2024-05-02', 'count': 1},
+        ])
+        params['utc_offset_minutes'] = 120
+        body = self.client.get('/archives/calendar', params=params).json()
+        self.assertEqual(body['days'], [
+            {'day': '2024-05-01', 'count': 2},
+            {'day': '2024-05-02', 'count': 2},
+        ])
+        params['utc_offset_minutes'] = 15 * 60
+        response = self.client.get('/archives/calendar', params=params)
+        self.assertEqual(response.status_code, 400)
+        del params['from']
+        response = self.client.get('/archives/calendar', params=params)
+        self.assertEqual(response.status_code, 422)
+
+    def test_read_errors_degrade_like_archives(self) -> None:
+        """Calendar and archive reads should share the DB error policy."""
+        @contextmanager
+        def _broken():
+            raise OperationalError('SELECT 1', {}, Exception('down'))
+            yield  # pylint: disable=unreachable
+
+        params = {'user_id': 'user_12', 'from': 0, 'to': 86_400_000}
+        reads = (
+            ('/archives/calendar', {'days': []}),
+            ('/archives', {'items': [], 'next_cursor': None}),
+        )
+        with patch.object(backend, 'get_session', _broken):
+            for path, empty in reads:
+                response = self.client.get(path, params=params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), empty)
+                self.assertNotIn('ETag', response.headers)
+                with patch.object(backend, 'FAIL_CLOSED_WITHOUT_DB', True):
+                    response = self.client.get(path, params=params)
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(
+                    response.json()['detail'], 'database required',
+                )
+
+    def test_postgres_calendar_buckets_in_utc(self) -> None:
+        """Postgres should shift UTC timestamps before taking the day."""
+        sql = str(
+            archive_calendar_query(
+                'user_13',
+                window=(None, None),
+                offset_minutes=-300,
+                dialect='postgresql',
+            ).compile(dialect=postgresql.dialect())
+        )
+        self.assertIn('to_char(timezone(', sql)
+        self.assertIn('GROUP BY archive_days.day', sql)
+
+    def _get(self, path: str, etag: str = '', **params):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(
+            path, params={'user_id': 'user_9', **params}, headers=headers,
+        )
+
+    def test_matching_etags_skip_the_payload_queries(self) -> None:
+        """A current copy should get a bare 304 after one statement."""
+        self._save_selection('user_9', ['chan-a'])
+        for path in ('/selection', '/user', '/user/state', '/archives'):
+            first = self._get(path)
+            self.assertTrue(first.headers['ETag'].startswith('W/"v1-'))
+            self.assertEqual(
+                first.headers['Cache-Control'], 'private, no-cache',
+            )
+            with self.assert_statements(1):
+                cached = self._get(path, first.headers['ETag'])
+            self.assertEqual(cached.status_code, 304)
+            self.assertEqual(cached.content, b'')
+            self.assertEqual(cached.headers['ETag'], first.headers['ETag'])
+
+    def test_archive_etags_cover_shared_metadata(self) -> None:
+        """Other users' changes to shared rows should move the archive tag."""
+        toggle = {'video_id': 'abcdefghijk', 'archived': True}
+        self.client.post('/archives/toggle', json={
+            'user_id': 'user_9', 'title': 'Old title', 'channel_id': 'chan-a',
+            **toggle,
+        })
+        writes = (
+            ('/archives/toggle', {
+                'user_id': 'user_10', 'title': 'New title', **toggle,
+            }),
+            ('/archives/batch', {'user_id': 'user_10', 'items': [
+                {**toggle, 'thumbnail_url': 'https://i.ytimg.com/a.jpg'},
+            ]}),
+            ('/selection', {
+                'user_id': 'user_10',
+                'channels': [{'id': 'chan-a', 'title': 'Renamed'}],
+                'selected_ids': ['chan-a'],
+            }),
+        )
+        etag = self._get('/archives').headers['ETag']
+        for path, payload in writes:
+            response = self.client.post(path, json=payload)
+            self.assertEqual(response.status_code, 200)
+            response = self._get('/archives', etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers['ETag']
+        item = response.json()['items'][0]
+        self.assertEqual(item['title'], 'New title')
+        self.assertEqual(item['channel_title'], 'Renamed')
+        # Repeating the same metadata changes nothing for other users.
+        for path, payload in writes:
+            self.client.post(path, json=payload)
+        self.assertEqual(self._get('/archives', etag).status_code, 304)
+
+    def test_etags_differ_per_route_and_query(self) -> None:
+        """Pages, windows and routes should never share a validator."""
+        self._save_selection('user_9', ['chan-a'])
+        etags = {
+            self._get('/selection').headers['ETag'],
+            self._get('/user/state').headers['ETag'],
+            self._get('/archives').headers['ETag'],
+            self._get('/archives', limit=1).headers['ETag'],
+            self._get('/archives', limit=2).headers['ETag'],
+        }
+        self.assertEqual(len(etags), 5)
+        first = self._get('/archives', limit=1)
+        response = self._get('/archives', first.headers['ETag'], limit=2)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_users_never_get_a_304(self) -> None:
+        """Version 0 means no user row, which is not a cacheable state."""
+        for etag in ('W/"v0"', '*'):
+            response = self._get('/user', etag)
+            self.assertEqual(response.status_code, 404)
+            response = self._get('/selection', etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('ETag', response.headers)
+
+    def test_every_write_moves_the_etag(self) -> None:
+        """Archive, selection and state writes should all invalidate."""
+        etag = ''
+        writes = (
+            lambda: self._save_selection('user_9', ['chan-b']),
+            lambda: self.client.post('/archives/toggle', json={
+                'user_id': 'user_9', 'video_id': 'abcdefghijk',
+            }),
+            lambda: self.client.post('/archives/toggle', json={
+                'user_id': 'user_9', 'video_id': 'abcdefghijk',
+            }),
+            lambda: self.client.post(
+                '/archives/clear', json={'user_id': 'user_9'},
+            ),
+            lambda: self.client.post('/user/state', json={
+                'user_id': 'user_9',
+                'selection_change_day': 20240101,
+                'selection_changes_today': 1,
+                'opened_video_ids': [],
+            }),
+            lambda: self.client.post('/user/upsert', json={
+                'user_id': 'user_9', 'email': 'user9@example.com',
+            }),
+        )
+        for write in writes:
+            self.assertEqual(write().status_code, 200)
+            response = self._get('/selection', etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+            etag = response.headers['ETag']
+
+if __name__ == '__main__':
+    unittest.main()
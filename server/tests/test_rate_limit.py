@@ -0,0 +1,367 @@
+"""Unit tests for the pluggable rate-limit backends."""
+
+from contextlib import contextmanager
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from server import db
+from server.cache_sweeper import CacheSweeper
+from server.db_base import Base
+from server.models import RateLimitCounter
+from server.rate_limit import (
+    DatabaseRateLimitBackend,
+    InMemoryRateLimitBackend,
+    RateLimitBackend,
+    RateLimitBackendError,
+    RateLimitBuckets,
+    RateLimiter,
+    RedisRateLimitBackend,
+    build_rate_limit_backend,
+)
+from server.redis_client import RedisError
+
+
+class _FakeRedis:
+    """Evaluates the increment script against a local dict."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.values: dict[str, int] = {}
+        self.expiry_ms: dict[str, int] = {}
+        self.fail = False
+
+    def execute(self, *args):
+        """Emulate ``EVAL <script> 1 <key> <ttl_ms> <cost> <limit> <force>``."""
+        if self.fail:
+            raise RedisError('connection refused')
+        command, _script, num_keys, key, ttl_ms, cost, limit, force = args
+        assert command == 'EVAL' and num_keys == 1
+        with self.lock:
+            hits = self.values.get(key, 0) + cost
+            self.values[key] = hits
+            self.expiry_ms.setdefault(key, ttl_ms)
+            if hits > limit and not force:
+                self.values[key] = hits - cost
+                return [0, hits - cost]
+            return [1, hits]
+
+
+class _FailingBackend(RateLimitBackend):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def hit(self, key, *, limit, window_seconds, cost=1, force=False):
+        self.calls += 1
+        raise RateLimitBackendError('down')
+
+
+def _sqlite_session_factory():
+    engine = create_engine(
+        'sqlite://',
+        connect_args={'check_same_thread': False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    @contextmanager
+    def _session():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    return _session
+
+
+class InMemoryBackendTest(unittest.TestCase):
+    """The default backend stores one GCRA arrival time per key."""
+
+    def test_rejects_after_limit(self) -> None:
+        """A burst past the limit inside one window should be denied."""
+        buckets = RateLimitBuckets()
+        backend = InMemoryRateLimitBackend(buckets)
+        with patch('server.rate_limit.time.monotonic', return_value=100.0):
+            results = [
+                backend.hit('k', limit=2, window_seconds=60)
+                for _ in range(3)
+            ]
+        self.assertEqual(results, [(True, 1), (True, 0), (False, 0)])
+        self.assertEqual(len(buckets), 1)
+        self.assertEqual(buckets.get('k'), 160.0)
+
+    def test_allowance_refills_one_interval_at_a_time(self) -> None:
+        """Each ``window / limit`` seconds should free exactly one request."""
+        backend = InMemoryRateLimitBackend()
+        clock = MagicMock(return_value=0.0)
+        with patch('server.rate_limit.time.monotonic', clock):
+            for _ in range(4):
+                self.assertTrue(backend.hit('k', limit=4, window_seconds=60)[0])
+            self.assertFalse(backend.hit('k', limit=4, window_seconds=60)[0])
+            clock.return_value = 14.9
+            self.assertFalse(backend.hit('k', limit=4, window_seconds=60)[0])
+            clock.return_value = 15.0
+            self.assertTrue(backend.hit('k', limit=4, window_seconds=60)[0])
+            self.assertFalse(backend.hit('k', limit=4, window_seconds=60)[0])
+
+    def test_costs_consume_budget_and_refusals_are_free(self) -> None:
+        """Refused charges should not count; forced ones may go into debt."""
+        backend = InMemoryRateLimitBackend()
+        clock = MagicMock(return_value=0.0)
+
+        def charge(cost, force=False):
+            return backend.hit(
+                'k', limit=10, window_seconds=60, cost=cost, force=force,
+            )
+
+        with patch('server.rate_limit.time.monotonic', clock):
+            self.assertEqual(charge(4), (True, 6))
+            self.assertEqual(charge(7), (False, 6))
+            self.assertEqual(charge(0), (True, 6))
+            self.assertEqual(charge(20, force=True), (False, 0))
+            self.assertEqual(charge(0), (False, 0))
+            # 14 units of debt plus one unit take 90 seconds to repay.
+            clock.return_value = 90.0
+            self.assertEqual(charge(1), (True, 0))
+
+    def test_drained_keys_expire_without_a_full_scan(self) -> None:
+        """Keys back at a full allowance should leave via the expiry heap."""
+        buckets = RateLimitBuckets(shards=1)
+        backend = InMemoryRateLimitBackend(buckets)
+        clock = MagicMock(return_value=0.0)
+        with patch('server.rate_limit.time.monotonic', clock):
+            backend.hit('a', limit=1, window_seconds=10)
+            backend.hit('b', limit=2, window_seconds=40)
+            backend.hit('b', limit=2, window_seconds=40)
+            clock.return_value = 25.0
+            backend.hit('c', limit=1, window_seconds=10)
+            # 'b' came due at 20s but was re-armed for 40s, so it stays.
+            self.assertIsNone(buckets.get('a'))
+            self.assertEqual(buckets.get('b'), 40.0)
+            self.assertEqual(len(buckets), 2)
+            clock.return_value = 41.0
+            backend.hit('d', limit=1, window_seconds=10)
+        self.assertEqual(len(buckets), 1)
+        self.assertEqual(buckets.get('d'), 51.0)
+
+    def test_full_shard_evicts_the_soonest_to_drain(self) -> None:
+        """A shard at capacity should forget the key closest to refilled."""
+        buckets = RateLimitBuckets(shards=1, max_buckets=2)
+        backend = InMemoryRateLimitBackend(buckets)
+        with patch('server.rate_limit.time.monotonic', return_value=0.0):
+            backend.hit('short', limit=1, window_seconds=10)
+            backend.hit('long', limit=1, window_seconds=60)
+            backend.hit('new', limit=1, window_seconds=30)
+        self.assertIsNone(buckets.get('short'))
+        self.assertEqual(buckets.get('long'), 60.0)
+        self.assertEqual(buckets.get('new'), 30.0)
+
+    def test_keys_spread_across_shards(self) -> None:
+        """Different keys should land on independently locked shards."""
+        buckets = RateLimitBuckets(shards=8)
+        shards = {id(buckets.shard_for(f'ip:{i}')) for i in range(64)}
+        self.assertGreater(len(shards), 1)
+        backend = InMemoryRateLimitBackend(buckets)
+        for i in range(64):
+            backend.hit(f'ip:{i}', limit=1, window_seconds=60)
+        self.assertEqual(len(buckets), 64)
+        buckets.clear()
+        self.assertEqual(len(buckets), 0)
+
+
+class DatabaseBackendTest(unittest.TestCase):
+    """Counters in the database are shared by every limiter instance."""
+
+    def test_instances_share_one_counter(self) -> None:
+        """Two instances on one database should see each other's hits."""
+        factory = _sqlite_session_factory()
+        first = DatabaseRateLimitBackend(session_factory=factory)
+        second = DatabaseRateLimitBackend(session_factory=factory)
+        results = [
+            backend.hit('transcript:ip', limit=3, window_seconds=60)
+            for backend in (first, second, first, second)
+        ]
+        self.assertEqual(
+            results, [(True, 2), (True, 1), (True, 0), (False, 0)],
+        )
+        with factory() as session:
+            counter = session.get(RateLimitCounter, 'transcript:ip')
+            self.assertEqual(counter.hits, 3)
+
+    def test_new_window_resets_the_counter(self) -> None:
+        """A row from a closed window should restart at one hit."""
+        factory = _sqlite_session_factory()
+        with factory() as session:
+            session.add(RateLimitCounter(
+                bucket_key='write:user:a',
+                window_start=0,
+                hits=99,
+                expires_at=60.0,
+            ))
+            session.commit()
+        backend = DatabaseRateLimitBackend(session_factory=factory)
+        self.assertEqual(
+            backend.hit('write:user:a', limit=1, window_seconds=60),
+            (True, 0),
+        )
+        with factory() as session:
+            self.assertEqual(
+                session.get(RateLimitCounter, 'write:user:a').hits, 1,
+            )
+
+    def test_closed_windows_are_left_to_the_sweeper(self) -> None:
+        """Hits should not delete old rows; the cache sweeper should."""
+        factory = _sqlite_session_factory()
+        with factory() as session:
+            session.add(RateLimitCounter(
+                bucket_key='write:user:old',
+                window_start=0,
+                hits=1,
+                expires_at=60.0,
+            ))
+            session.commit()
+        backend = DatabaseRateLimitBackend(session_factory=factory)
+        backend.hit('write:user:new', limit=1, window_seconds=60)
+        with factory() as session:
+            self.assertIsNotNone(
+                session.get(RateLimitCounter, 'write:user:old'),
+            )
+        sweeper = CacheSweeper()
+        with patch('server.cache_sweeper.is_db_enabled', return_value=True):
+            with patch('server.cache_sweeper.get_session', factory):
+                self.assertEqual(sweeper.sweep_rate_limits(), 1)
+        with factory() as session:
+            self.assertIsNone(session.get(RateLimitCounter, 'write:user:old'))
+            self.assertIsNotNone(
+                session.get(RateLimitCounter, 'write:user:new'),
+            )
+        self.assertEqual(sweeper.stats()['rate_limit_rows_deleted'], 1)
+
+    def test_database_errors_raise_backend_error(self) -> None:
+        """Missing or failing databases should surface as backend errors."""
+        @contextmanager
+        def _no_db():
+            yield None
+
+        @contextmanager
+        def _broken():
+            raise OperationalError('SELECT 1', {}, Exception('down'))
+            yield  # pylint: disable=unreachable
+
+        for factory in (_no_db, _broken):
+            backend = DatabaseRateLimitBackend(session_factory=factory)
+            with self.assertRaises(RateLimitBackendError):
+                backend.hit('k', limit=1, window_seconds=60)
+
+    def test_schema_check_requires_counter_table(self) -> None:
+        """Startup validation should flag a missing rate_limit_counters."""
+        engine = create_engine('sqlite://', poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        with patch.object(db, '_ENGINE', engine):
+            self.assertEqual(db.validate_schema(), (True, None))
+            RateLimitCounter.__table__.drop(engine)
+            ok, detail = db.validate_schema()
+        self.assertFalse(ok)
+        self.assertIn('rate_limit_counters', detail)
+
+    def test_backend_interface_is_abstract(self) -> None:
+        """Backends must implement hit."""
+        with self.assertRaises(TypeError):
+            RateLimitBackend()  # pylint: disable=abstract-class-instantiated
+
+
+class RedisBackendTest(unittest.TestCase):
+    """Redis counters are namespaced per window and expire with it."""
+
+    def test_counts_and_expires_per_window(self) -> None:
+        """Hits past the limit should be denied and keys get a TTL."""
+        client = _FakeRedis()
+        backend = RedisRateLimitBackend(client, key_prefix='test')
+        results = [
+            backend.hit('write:ip:1', limit=2, window_seconds=30)
+            for _ in range(3)
+        ]
+        self.assertEqual(results, [(True, 1), (True, 0), (False, 0)])
+        (key,) = client.values
+        self.assertTrue(key.startswith('test:ratelimit:write:ip:1:'))
+        self.assertEqual(client.expiry_ms[key], 30000)
+
+    def test_refused_charges_are_taken_back(self) -> None:
+        """Only forced charges should push the counter past the limit."""
+        client = _FakeRedis()
+        backend = RedisRateLimitBackend(client)
+        self.assertEqual(
+            backend.hit('k', limit=10, window_seconds=60, cost=8), (True, 2),
+        )
+        self.assertEqual(
+            backend.hit('k', limit=10, window_seconds=60, cost=5), (False, 2),
+        )
+        self.assertEqual(
+            backend.hit('k', limit=10, window_seconds=60, cost=5, force=True),
+            (False, 0),
+        )
+        self.assertEqual(list(client.values.values()), [13])
+
+    def test_redis_errors_raise_backend_error(self) -> None:
+        """Connection failures should surface as backend errors."""
+        client = _FakeRedis()
+        client.fail = True
+        backend = RedisRateLimitBackend(client)
+        with self.assertRaises(RateLimitBackendError):
+            backend.hit('k', limit=1, window_seconds=60)
+
+    def test_builder_requires_a_redis_url(self) -> None:
+        """Unsupported backends and URLs should fall back to memory."""
+        self.assertIsNone(build_rate_limit_backend('memory', ''))
+        self.assertIsNone(build_rate_limit_backend('redis', 'memory://'))
+        self.assertIsNone(build_rate_limit_backend('bogus', ''))
+        self.assertIsInstance(
+            build_rate_limit_backend('redis', 'redis://localhost:6379/0'),
+            RedisRateLimitBackend,
+        )
+
+    def test_non_numeric_database_falls_back_to_zero(self) -> None:
+        """A bad database path should log a warning, not raise."""
+        with self.assertLogs(level='WARNING') as logs:
+            backend = build_rate_limit_backend(
+                'redis', 'redis://localhost:6379/cache',
+            )
+        self.assertIsInstance(backend, RedisRateLimitBackend)
+        self.assertIn('cache', logs.output[0])
+
+
+class RateLimiterTest(unittest.TestCase):
+    """The limiter degrades to in-memory counting on backend failures."""
+
+    def test_falls_back_and_skips_backend_while_failing(self) -> None:
+        """After one failure the backend should be bypassed for a while."""
+        backend = _FailingBackend()
+        limiter = RateLimiter(
+            backend, InMemoryRateLimitBackend(), retry_seconds=60,
+        )
+        results = [
+            limiter.allow('k', limit=1, window_seconds=60) for _ in range(2)
+        ]
+        self.assertEqual(results, [True, False])
+        self.assertEqual(backend.calls, 1)
+        stats = limiter.stats()
+        self.assertEqual(stats['backend_errors'], 1)
+        self.assertEqual(stats['fallback_checks'], 2)
+        self.assertFalse(stats['available'])
+
+    def test_zero_limit_disables_limiting(self) -> None:
+        """A non-positive limit should admit every request."""
+        limiter = RateLimiter(_FailingBackend(), InMemoryRateLimitBackend())
+        self.assertTrue(limiter.allow('k', limit=0, window_seconds=60))
+        self.assertEqual(limiter.stats()['allowed'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Unit tests for server-signed session tokens."""
+
+import unittest
+
+from server.session_tokens import (
+    SessionTokenError,
+    is_session_token,
+    issue_session_token,
+    verify_session_token,
+)
+
+
+class SessionTokenTest(unittest.TestCase):
+    """Validate signing, expiry and secret rotation."""
+
+    def test_round_trip(self) -> None:
+        """A fresh token should verify to its subject."""
+        token = issue_session_token(
+            'user.with:dots', secret='s1', expires_at=2000,
+        )
+        self.assertTrue(is_session_token(token))
+        self.assertEqual(
+            verify_session_token(token, secrets=('s1',), now=1000),
+            'user.with:dots',
+        )
+
+    def test_rejects_tampering_and_wrong_secret(self) -> None:
+        """Changed claims or an unknown secret should fail the HMAC check."""
+        token = issue_session_token('user_1', secret='s1', expires_at=2000)
+        forged = issue_session_token('user_2', secret='s1', expires_at=2000)
+        spliced = f'{forged.rsplit(".", 1)[0]}.{token.rsplit(".", 1)[1]}'
+        for candidate, secrets in (
+            (spliced, ('s1',)),
+            (token, ('other',)),
+            (token + 'A', ('s1',)),
+            ('tts1.not-base64!.sig', ('s1',)),
+            ('google.id.token', ('s1',)),
+        ):
+            with self.assertRaises(SessionTokenError) as raised:
+                verify_session_token(candidate, secrets=secrets, now=1000)
+            self.assertEqual(str(raised.exception), 'invalid access token')
+
+    def test_expiry_with_leeway(self) -> None:
+        """Tokens past their expiry plus leeway should be rejected."""
+        token = issue_session_token('user_1', secret='s1', expires_at=1000)
+        self.assertEqual(
+            verify_session_token(
+                token, secrets=('s1',), leeway_seconds=60, now=1030,
+            ),
+            'user_1',
+        )
+        with self.assertRaises(SessionTokenError) as raised:
+            verify_session_token(token, secrets=('s1',), now=1000)
+        self.assertEqual(str(raised.exception), 'token expired')
+
+    def test_previous_secret_still_verifies(self) -> None:
+        """Tokens signed before a rotation should stay valid until expiry."""
+        token = issue_session_token('user_1', secret='old', expires_at=2000)
+        self.assertEqual(
+            verify_session_token(token, secrets=('new', 'old'), now=1000),
+            'user_1',
+        )
+        self.assertEqual(
+            verify_session_token(token, secrets=('new', '', 'old'), now=1000),
+            'user_1',
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
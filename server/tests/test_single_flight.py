@@ -0,0 +1,335 @@
+"""Unit tests for the advisory-lock transcript single-flight."""
+
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+os.environ.setdefault('BACKEND_REQUIRE_AUTH', 'false')
+
+import server.app as backend
+from server import transcript_utils as tu
+from server.config import (
+    TRANSCRIPT_PENDING_RETRY_SECONDS,
+    TRANSCRIPT_QUEUE_TIMEOUT,
+    TRANSCRIPT_SINGLE_FLIGHT_WAIT_SECONDS,
+)
+from server.single_flight import (
+    AdvisoryLockSingleFlight,
+    SingleFlightPending,
+    advisory_lock_id,
+)
+
+
+class _FakeLocks:
+    """Shared advisory lock table standing in for a Postgres server."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.held: set[int] = set()
+        self.fail = False
+
+
+class _FakeResult:
+    def __init__(self, value) -> None:
+        self._value = value
+
+    def scalar(self):
+        """Return the single column value."""
+        return self._value
+
+
+class _FakeConnection:
+    def __init__(self, locks: _FakeLocks) -> None:
+        self._locks = locks
+
+    def execute(self, statement, params):
+        """Emulate pg_try_advisory_lock / pg_advisory_unlock."""
+        if self._locks.fail:
+            raise OperationalError('SELECT 1', {}, Exception('down'))
+        lock_id = params['lock_id']
+        with self._locks.lock:
+            if 'pg_try_advisory_lock' in str(statement):
+                if lock_id in self._locks.held:
+                    return _FakeResult(False)
+                self._locks.held.add(lock_id)
+                return _FakeResult(True)
+            self._locks.held.discard(lock_id)
+            return _FakeResult(True)
+
+    def invalidate(self) -> None:
+        """Match the SQLAlchemy connection API."""
+
+
+class _FakeSession:
+    def __init__(self, locks: _FakeLocks, dialect: str) -> None:
+        self._locks = locks
+        self.bind = type(
+            'Bind', (), {'dialect': type('Dialect', (), {'name': dialect})},
+        )()
+
+    def connection(self, execution_options=None):
+        """Return a connection bound to the shared lock table."""
+        del execution_options
+        return _FakeConnection(self._locks)
+
+
+def _session_factory(locks: _FakeLocks, dialect: str = 'postgresql'):
+    @contextmanager
+    def _factory():
+        yield _FakeSession(locks, dialect)
+
+    return _factory
+
+
+class AdvisoryLockSingleFlightTest(unittest.TestCase):
+    """Validate lock ownership, waiting and fallbacks."""
+
+    def setUp(self) -> None:
+        # Endpoint tests reach the real cache helpers; keep their files out
+        # of the source tree.
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        patcher = patch.object(tu, 'CACHE_DIR', Path(tmpdir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tu.TRANSCRIPT_MEMORY_CACHE.clear()
+        self.addCleanup(tu.TRANSCRIPT_MEMORY_CACHE.clear)
+
+    def test_concurrent_callers_compute_once(self) -> None:
+        """A contended caller should be served from cache, not recompute."""
+        locks = _FakeLocks()
+        flight = AdvisoryLockSingleFlight(
+            enabled=True,
+            wait_seconds=5,
+            poll_seconds=0.01,
+            session_factory=_session_factory(locks),
+        )
+        cache: dict[str, str] = {}
+        started = threading.Event()
+        release = threading.Event()
+        computed = []
+
+        def _compute():
+            computed.append(1)
+            started.set()
+            release.wait(timeout=5)
+            cache['video'] = 'payload'
+            return 'payload'
+
+        results = []
+        holder = threading.Thread(
+            target=lambda: results.append(
+                flight.run('video', _compute, lambda: cache.get('video'))
+            ),
+        )
+        holder.start()
+        started.wait(timeout=5)
+        waiter = threading.Thread(
+            target=lambda: results.append(
+                flight.run('video', _compute, lambda: cache.get('video'))
+            ),
+        )
+        waiter.start()
+        release.set()
+        holder.join(timeout=5)
+        waiter.join(timeout=5)
+
+        self.assertEqual(results, ['payload', 'payload'])
+        self.assertEqual(len(computed), 1)
+        stats = flight.stats()
+        self.assertEqual(stats['acquired'], 1)
+        self.assertEqual(stats['contended'], 1)
+        self.assertEqual(stats['served_from_cache'], 1)
+        self.assertFalse(locks.held)
+
+    def test_wait_timeout_reports_pending(self) -> None:
+        """A waiter past the deadline must not start a duplicate job."""
+        locks = _FakeLocks()
+        locks.held.add(advisory_lock_id('video'))
+        flight = AdvisoryLockSingleFlight(
+            enabled=True,
+            wait_seconds=0.05,
+            poll_seconds=0.01,
+            session_factory=_session_factory(locks),
+        )
+        computed = []
+        with self.assertRaises(SingleFlightPending):
+            flight.run('video', lambda: computed.append(1), lambda: None)
+        self.assertEqual(computed, [])
+        self.assertEqual(flight.stats()['wait_timeouts'], 1)
+
+    def test_lock_is_only_held_inside_the_slot(self) -> None:
+        """Queued and polling callers should not hold a DB connection."""
+        locks = _FakeLocks()
+        events = []
+        inner = _session_factory(locks)
+
+        @contextmanager
+        def _slot():
+            events.append('slot')
+            yield
+            events.append('release')
+
+        @contextmanager
+        def _sessions():
+            events.append('session')
+            with inner() as session:
+                yield session
+            events.append('close')
+
+        flight = AdvisoryLockSingleFlight(
+            enabled=True,
+            wait_seconds=0.05,
+            poll_seconds=0.01,
+            session_factory=_sessions,
+        )
+        flight.run(
+            'video', lambda: events.append('compute'), lambda: None,
+            slot=_slot,
+        )
+        self.assertEqual(
+            events, ['slot', 'session', 'compute', 'close', 'release'],
+        )
+        events.clear()
+        locks.held.add(advisory_lock_id('video'))
+        with self.assertRaises(SingleFlightPending):
+            flight.run('video', lambda: None, lambda: None, slot=_slot)
+        self.assertGreater(len(events), 4)
+        # Every lock attempt opens and closes inside a slot, and the slot
+        # is released before the waiter polls again.
+        self.assertEqual(
+            set(zip(events[::4], events[1::4], events[2::4], events[3::4])),
+            {('slot', 'session', 'close', 'release')},
+        )
+
+    def test_pending_waiters_get_retry_after(self) -> None:
+        """The endpoint should answer 503 with Retry-After while pending."""
+        client = TestClient(backend.app)
+        with patch.object(backend, 'TRANSCRIPT_SINGLE_FLIGHT') as mocked:
+            mocked.run.side_effect = SingleFlightPending('cache-key')
+            with patch.object(backend, 'load_cache', return_value=None):
+                response = client.post(
+                    '/transcript', json={'video_id': 'abc12345xyz'},
+                )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            response.headers['Retry-After'],
+            str(TRANSCRIPT_PENDING_RETRY_SECONDS),
+        )
+
+    def test_falls_back_without_postgres(self) -> None:
+        """Non-Postgres, missing or failing databases should not block."""
+        failing = _FakeLocks()
+        failing.fail = True
+
+        @contextmanager
+        def _no_db():
+            yield None
+
+        for factory in (
+            _session_factory(_FakeLocks(), dialect='sqlite'),
+            _session_factory(failing),
+            _no_db,
+        ):
+            flight = AdvisoryLockSingleFlight(
+                enabled=True, session_factory=factory,
+            )
+            self.assertEqual(
+                flight.run('video', lambda: 'ok', lambda: None), 'ok',
+            )
+            self.assertEqual(flight.stats()['fallbacks'], 1)
+
+    def test_compute_errors_release_the_lock(self) -> None:
+        """Exceptions from the computation should still unlock."""
+        locks = _FakeLocks()
+        flight = AdvisoryLockSingleFlight(
+            enabled=True, session_factory=_session_factory(locks),
+        )
+
+        def _boom():
+            raise RuntimeError('failed')
+
+        with self.assertRaises(RuntimeError):
+            flight.run('video', _boom, lambda: None)
+        self.assertFalse(locks.held)
+
+    def test_lock_and_poll_share_the_cache_key(self) -> None:
+        """Variants of one video should not serialize behind each other."""
+        keys = []
+
+        def _run(key, compute, poll, slot):
+            keys.append(key)
+            with slot():
+                return poll() or compute()
+
+        with patch.object(backend, 'TRANSCRIPT_SINGLE_FLIGHT') as mocked:
+            mocked.run.side_effect = _run
+            with patch.object(
+                backend,
+                '_compute_transcript_payload',
+                return_value={'source': 'captions'},
+            ):
+                with patch.object(backend, 'load_cache', return_value=None):
+                    with patch.object(backend, 'save_cache') as save_cache:
+                        backend._recompute_transcript_cache(
+                            'cache-key',
+                            'video',
+                            summarize=True,
+                            max_chars=1200,
+                        )
+        self.assertEqual(keys, ['cache-key'])
+        save_cache.assert_called_once_with('cache-key', {'source': 'captions'})
+
+    def test_waiters_are_not_charged_for_whisper(self) -> None:
+        """Only the request that ran Whisper should pay its extra cost."""
+        whisper = {
+            'text': 'text',
+            'summary': None,
+            'source': 'whisper',
+            'partial': False,
+        }
+        charges = []
+        client = TestClient(backend.app)
+        with patch.object(backend, 'TRANSCRIPT_SINGLE_FLIGHT') as mocked:
+            with patch.object(backend, 'load_cache', return_value=None):
+                with patch.object(
+                    backend,
+                    '_charge_transcript_rate_limit',
+                    side_effect=lambda *args, **kwargs: charges.append(
+                        kwargs.get('force', False),
+                    ),
+                ):
+                    for run in (
+                        lambda key, compute, poll, slot: whisper,
+                        lambda key, compute, poll, slot: compute(),
+                    ):
+                        mocked.run.side_effect = run
+                        with patch.object(
+                            backend,
+                            '_compute_transcript_payload',
+                            return_value=whisper,
+                        ):
+                            with patch.object(backend, 'save_cache'):
+                                response = client.post(
+                                    '/transcript',
+                                    json={'video_id': 'abc12345xyz'},
+                                )
+                        self.assertEqual(response.status_code, 200)
+        self.assertEqual(charges, [False, False, False, False, True])
+
+    def test_default_wait_stays_below_request_timeouts(self) -> None:
+        """The slot queue plus the wait should fit the app's 30s timeout."""
+        self.assertLess(
+            TRANSCRIPT_QUEUE_TIMEOUT + TRANSCRIPT_SINGLE_FLIGHT_WAIT_SECONDS,
+            30,
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,552 @@
+"""Unit tests for transcript cache tiers and revalidation."""
+
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault('BACKEND_REQUIRE_AUTH', 'false')
+
+import server.app as backend
+from server import transcript_utils as tu
+from server.cache_codec import (
+    ZLIB_DICT_PREFIX,
+    ZLIB_PREFIX,
+    decode_cached_text,
+    encode_cached_text,
+)
+from server.cache_sweeper import CacheSweeper
+from server.file_cache import (
+    archive_record_path,
+    legacy_archive_path,
+    pack_record,
+    read_record,
+    transcript_record_path,
+    unpack_record,
+)
+from server.memory_cache import ByteBoundedLRUCache
+from server.models import Base, TranscriptCache
+from server.revalidation import CacheRevalidator, is_transient_failure
+from server.shared_cache import (
+    InMemorySharedCache,
+    SharedCacheBackend,
+    SharedCacheError,
+    SharedCacheTier,
+)
+from server.redis_client import RedisConnection, RedisError
+
+
+class TranscriptCacheTestCase(unittest.TestCase):
+    """Base case that points the file cache at a temporary directory."""
+
+    def setUp(self) -> None:
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name)
+        patcher = patch.object(tu, 'CACHE_DIR', self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmpdir.cleanup)
+        tu.TRANSCRIPT_MEMORY_CACHE.clear()
+        self.addCleanup(tu.TRANSCRIPT_MEMORY_CACHE.clear)
+
+    def _write_file_entry(self, key: str, *, age_seconds: float) -> Path:
+        path = self.cache_dir / f'{key}.json'
+        path.write_text(
+            json.dumps({
+                'text': 'cached text',
+                'summary': '요약',
+                'source': 'captions',
+                'partial': False,
+                'created_at': time.time() - age_seconds,
+            }),
+            encoding='utf-8',
+        )
+        return path
+
+
+class StaleWhileRevalidateTest(TranscriptCacheTestCase):
+    """Expired entries should be served stale and refreshed once."""
+
+    def test_expired_file_entry_is_served_stale(self) -> None:
+        """SWR mode should flag expired entries instead of deleting them."""
+        path = self._write_file_entry(
+            'abc12345xyz', age_seconds=tu.TRANSCRIPT_CACHE_TTL + 60,
+        )
+        with patch.object(tu, 'TRANSCRIPT_CACHE_SWR_ENABLED', True):
+            cached = tu.load_cache('abc12345xyz')
+        self.assertIsNotNone(cached)
+        self.assertTrue(cached['stale'])
+        self.assertTrue(path.exists())
+
+        with patch.object(tu, 'TRANSCRIPT_CACHE_SWR_ENABLED', False):
+            self.assertIsNone(tu.load_cache('abc12345xyz'))
+        self.assertFalse(path.exists())
+
+    def test_entry_past_stale_window_is_a_miss(self) -> None:
+        """Entries older than TTL plus the stale window should expire."""
+        self._write_file_entry(
+            'abc12345xyz',
+            age_seconds=(
+                tu.TRANSCRIPT_CACHE_TTL + tu.TRANSCRIPT_CACHE_STALE_TTL + 60
+            ),
+        )
+        with patch.object(tu, 'TRANSCRIPT_CACHE_SWR_ENABLED', True):
+            self.assertIsNone(tu.load_cache('abc12345xyz'))
+
+    def test_stale_hit_schedules_single_refresh(self) -> None:
+        """Concurrent stale hits should trigger one background refresh."""
+        stale = {
+            'text': 'old',
+            'summary': None,
+            'source': 'captions',
+            'partial': False,
+            'stale': True,
+        }
+        release = threading.Event()
+        calls = []
+
+        def _slow_refresh(*_args, **_kwargs):
+            calls.append(1)
+            release.wait(timeout=5)
+            return {'text': 'new'}
+
+        revalidator = CacheRevalidator(max_workers=1)
+        client = TestClient(backend.app)
+        with patch.object(backend, 'TRANSCRIPT_REVALIDATOR', revalidator):
+            with patch.object(backend, 'load_cache', return_value=stale):
+                with patch.object(
+                    backend,
+                    '_recompute_transcript_cache',
+                    side_effect=_slow_refresh,
+                ):
+                    first = client.post(
+                        '/transcript', json={'video_id': 'abc12345xyz'},
+                    )
+                    second = client.post(
+                        '/transcript', json={'video_id': 'abc12345xyz'},
+                    )
+                    release.set()
+                    revalidator.shutdown()
+        self.assertTrue(first.json().get('stale'))
+        self.assertTrue(second.json().get('cached'))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(revalidator.stats()['deduplicated'], 1)
+
+    def test_failed_refresh_enters_grace_window(self) -> None:
+        """A failed refresh should suppress retries during the grace window."""
+        revalidator = CacheRevalidator(max_workers=1, failure_grace_seconds=60)
+        self.assertTrue(revalidator.schedule('key', lambda: None))
+        revalidator.shutdown()
+        self.assertFalse(revalidator.schedule('key', lambda: True))
+        self.assertEqual(revalidator.stats()['in_grace'], 1)
+        self.assertFalse(revalidator.is_rejected('key'))
+
+    def test_definitive_refresh_failure_surfaces_error(self) -> None:
+        """A removed or private video should not keep serving stale data."""
+        stale = {
+            'text': 'old',
+            'summary': None,
+            'source': 'captions',
+            'partial': False,
+            'stale': True,
+        }
+        gone = HTTPException(status_code=404, detail='gone')
+        revalidator = CacheRevalidator(max_workers=1, failure_grace_seconds=60)
+        client = TestClient(backend.app)
+        with patch.object(backend, 'TRANSCRIPT_REVALIDATOR', revalidator):
+            with patch.object(backend, 'load_cache', return_value=stale):
+                with patch.object(
+                    backend,
+                    '_recompute_transcript_cache',
+                    side_effect=gone,
+                ):
+                    first = client.post(
+                        '/transcript', json={'video_id': 'abc12345xyz'},
+                    )
+                    revalidator.shutdown()
+                    second = client.post(
+                        '/transcript', json={'video_id': 'abc12345xyz'},
+                    )
+        self.assertTrue(first.json().get('stale'))
+        self.assertTrue(revalidator.is_rejected(
+            tu.build_transcript_cache_key(
+                video_id='abc12345xyz', max_chars=1200, summarize=True,
+            ),
+        ))
+        self.assertEqual(second.status_code, 404)
+        self.assertEqual(revalidator.stats()['rejected'], 1)
+
+    def test_transient_refresh_failures_are_not_rejections(self) -> None:
+        """Timeouts and upstream 5xx/429 should keep the stale entry."""
+        self.assertTrue(is_transient_failure(TimeoutError()))
+        self.assertTrue(is_transient_failure(HTTPException(status_code=500)))
+        self.assertTrue(is_transient_failure(HTTPException(status_code=429)))
+        self.assertFalse(is_transient_failure(HTTPException(status_code=404)))
+
+    def test_unavailable_video_download_is_a_client_error(self) -> None:
+        """Private or removed videos should map to 4xx statuses."""
+        self.assertEqual(
+            tu.audio_download_error_status('ERROR: Private video'), 404,
+        )
+        self.assertEqual(
+            tu.audio_download_error_status('Join this channel to get access'),
+            403,
+        )
+        self.assertEqual(tu.audio_download_error_status('timed out'), 500)
+
+
+class MemoryTierTest(TranscriptCacheTestCase):
+    """The in-process LRU tier should absorb repeated reads."""
+
+    def test_lru_evicts_by_total_bytes(self) -> None:
+        """Least recently used entries should be evicted to fit the budget."""
+        cache = ByteBoundedLRUCache(
+            max_bytes=1000, max_age_seconds=60, max_entry_bytes=1000,
+        )
+        cache.set('a', {'text': 'x' * 300})
+        cache.set('b', {'text': 'y' * 300})
+        self.assertIsNotNone(cache.get('a'))
+        cache.set('c', {'text': 'z' * 300})
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertLessEqual(stats['bytes'], 1000)
+
+    def test_lru_honors_max_age(self) -> None:
+        """Entries older than the max age should read as misses."""
+        cache = ByteBoundedLRUCache(max_bytes=10000, max_age_seconds=60)
+        cache.set('a', {'text': 'x'}, created_at=time.time() - 120)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_file_hit_fills_memory_tier(self) -> None:
+        """A lower-tier hit should be served from memory afterwards."""
+        path = self._write_file_entry('abc12345xyz', age_seconds=10)
+        self.assertEqual(tu.load_cache('abc12345xyz')['text'], 'cached text')
+        path.unlink()
+        cached = tu.load_cache('abc12345xyz')
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached['text'], 'cached text')
+        self.assertNotIn('created_at', cached)
+        self.assertGreaterEqual(tu.TRANSCRIPT_MEMORY_CACHE.stats()['hits'], 1)
+
+    def test_save_fills_memory_tier(self) -> None:
+        """Writes should populate the memory tier for the next read."""
+        tu.save_cache('abc12345xyz', {'text': 'fresh', 'source': 'captions'})
+        with patch.object(tu, '_load_cache_from_file') as file_loader:
+            cached = tu.load_cache('abc12345xyz')
+        file_loader.assert_not_called()
+        self.assertEqual(cached['text'], 'fresh')
+
+
+class CompressedStorageTest(TranscriptCacheTestCase):
+    """Cached text should be stored compressed and decoded transparently."""
+
+    _TEXT = '오늘은 캐시 압축에 대해 이야기합니다. ' * 40
+
+    def test_round_trip_with_and_without_dictionary(self) -> None:
+        """Encoded values should decode to the original text."""
+        plain = encode_cached_text(self._TEXT, enabled=True, min_bytes=1)
+        self.assertTrue(plain.startswith(ZLIB_PREFIX))
+        self.assertLess(len(plain), len(self._TEXT.encode('utf-8')))
+        self.assertEqual(decode_cached_text(plain), self._TEXT)
+
+        zdict = '캐시 압축 이야기합니다'.encode('utf-8')
+        with_dict = encode_cached_text(
+            self._TEXT, enabled=True, min_bytes=1, zdict=zdict,
+        )
+        self.assertTrue(with_dict.startswith(ZLIB_DICT_PREFIX))
+        self.assertEqual(decode_cached_text(with_dict, zdict=zdict), self._TEXT)
+        self.assertIsNone(decode_cached_text(with_dict, zdict=b'other'))
+
+    def test_small_and_legacy_values_pass_through(self) -> None:
+        """Short values stay plain and legacy plain text reads unchanged."""
+        self.assertEqual(
+            encode_cached_text('short', enabled=True, min_bytes=256), 'short',
+        )
+        self.assertEqual(decode_cached_text('legacy text'), 'legacy text')
+        self.assertIsNone(decode_cached_text(None))
+        self.assertIsNone(decode_cached_text(f'{ZLIB_PREFIX}not-base64!'))
+
+    def test_file_tier_stores_compressed_text(self) -> None:
+        """File records should hold compressed text and read back intact."""
+        tu.save_cache(
+            'abc12345xyz',
+            {'text': self._TEXT, 'summary': '요약', 'source': 'captions'},
+        )
+        raw = transcript_record_path(self.cache_dir, 'abc12345xyz').read_bytes()
+        self.assertLess(len(raw), len(self._TEXT.encode('utf-8')) // 4)
+        self.assertIn('요약'.encode('utf-8'), raw)
+
+        tu.TRANSCRIPT_MEMORY_CACHE.clear()
+        cached = tu.load_cache('abc12345xyz')
+        self.assertEqual(cached['text'], self._TEXT)
+        self.assertEqual(cached['summary'], '요약')
+
+    def test_corrupt_compressed_entry_is_a_miss(self) -> None:
+        """Undecodable entries should fall through to a recompute."""
+        (self.cache_dir / 'abc12345xyz.json').write_text(
+            json.dumps({
+                'text': f'{ZLIB_PREFIX}AAAA',
+                'created_at': time.time(),
+            }),
+            encoding='utf-8',
+        )
+        self.assertIsNone(tu.load_cache('abc12345xyz'))
+
+
+    def test_corrupt_summary_is_a_miss_in_every_tier(self) -> None:
+        """A summary that fails to decode must not be served as None."""
+        corrupt = f'{ZLIB_PREFIX}AAAA'
+        (self.cache_dir / 'abc12345xyz.json').write_text(
+            json.dumps({
+                'text': 'cached text',
+                'summary': corrupt,
+                'created_at': time.time(),
+            }),
+            encoding='utf-8',
+        )
+        self.assertIsNone(tu.load_cache('abc12345xyz'))
+
+        record = bytearray(pack_record({'text': 'text', 'summary': '요약'}))
+        # The record ends with the 7-byte summary (codec byte plus UTF-8)
+        # and the 8-byte source; an unknown codec byte cannot be decoded.
+        record[-(8 + 7)] = 0xFF
+        self.assertIsNone(unpack_record(bytes(record)))
+
+        engine = create_engine('sqlite://', poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        sessions = sessionmaker(bind=engine)
+        with sessions() as session:
+            session.add(TranscriptCache(
+                video_id='abc12345xyz',
+                text='cached text',
+                summary=corrupt,
+                created_at=datetime.now(timezone.utc),
+            ))
+            session.commit()
+        with patch.object(tu, 'is_db_enabled', return_value=True):
+            with patch.object(tu, 'get_session', sessions):
+                self.assertIsNone(tu._load_cache_from_db('abc12345xyz'))
+                tu.save_cache('abc12345xyz', {
+                    'text': 'fresh', 'summary': '요약', 'source': 'captions',
+                })
+                cached = tu._load_cache_from_db('abc12345xyz')
+        self.assertEqual(cached['summary'], '요약')
+
+class ShardedFileLayoutTest(TranscriptCacheTestCase):
+    """The file tier should use sharded binary records."""
+
+    def test_record_round_trip_and_corruption(self) -> None:
+        """Records should decode intact and reject truncated data."""
+        payload = {
+            'text': '자막 ' * 200,
+            'summary': None,
+            'source': 'whisper',
+            'partial': True,
+        }
+        record = pack_record(payload, created_at=123.5)
+        decoded = unpack_record(record)
+        self.assertEqual(decoded['text'], payload['text'])
+        self.assertIsNone(decoded['summary'])
+        self.assertEqual(decoded['source'], 'whisper')
+        self.assertTrue(decoded['partial'])
+        self.assertEqual(decoded['created_at'], 123.5)
+        self.assertIsNone(unpack_record(record[:-1]))
+        self.assertIsNone(unpack_record(b'JUNK' + record[4:]))
+
+    def test_save_writes_sharded_record_through_mmap(self) -> None:
+        """Saves should land in a hash-prefix shard and read via mmap."""
+        tu.save_cache('abc12345xyz', {'text': 'fresh', 'source': 'captions'})
+        path = transcript_record_path(self.cache_dir, 'abc12345xyz')
+        self.assertEqual(path.parent.parent.name, 'transcripts')
+        self.assertEqual(len(path.parent.name), 2)
+        self.assertEqual(read_record(path)['text'], 'fresh')
+        self.assertEqual(list(self.cache_dir.glob('*.json')), [])
+
+    def test_legacy_flat_entry_still_loads(self) -> None:
+        """Flat JSON entries from the old layout should keep reading."""
+        self._write_file_entry('abc12345xyz', age_seconds=10)
+        self.assertEqual(tu.load_cache('abc12345xyz')['text'], 'cached text')
+
+    def test_archives_move_to_sharded_path(self) -> None:
+        """Archive saves should replace the legacy flat archive file."""
+        legacy = legacy_archive_path(self.cache_dir, 'user-1')
+        legacy.write_text(
+            json.dumps([{'video_id': 'abc12345xyz', 'archived_at': 1}]),
+            encoding='utf-8',
+        )
+        items = tu.load_archives_file('user-1')
+        self.assertEqual(len(items), 1)
+        tu.save_archives_file('user-1', items)
+        self.assertFalse(legacy.exists())
+        self.assertTrue(archive_record_path(self.cache_dir, 'user-1').exists())
+        self.assertEqual(tu.load_archives_file('user-1'), items)
+
+
+class _FailingBackend(SharedCacheBackend):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise SharedCacheError('down')
+
+    def set(self, key, value, ttl_seconds):
+        self.calls += 1
+        raise SharedCacheError('down')
+
+    def delete(self, key):
+        self.calls += 1
+        raise SharedCacheError('down')
+
+
+class SharedTierTest(TranscriptCacheTestCase):
+    """The shared tier should serve entries across instances."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.backend = InMemorySharedCache()
+        self.tier = SharedCacheTier(self.backend, key_prefix='test')
+        patcher = patch.object(tu, 'TRANSCRIPT_SHARED_CACHE', self.tier)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entry_saved_elsewhere_is_a_shared_hit(self) -> None:
+        """A cold instance should read what another instance saved."""
+        tu.save_cache('abc12345xyz', {'text': 'shared', 'summary': '요약'})
+        tu.TRANSCRIPT_MEMORY_CACHE.clear()
+        with patch.object(tu, '_load_cache_from_db') as db_loader:
+            with patch.object(tu, '_load_cache_from_file') as file_loader:
+                cached = tu.load_cache('abc12345xyz')
+        db_loader.assert_not_called()
+        file_loader.assert_not_called()
+        self.assertEqual(cached['text'], 'shared')
+        self.assertEqual(cached['summary'], '요약')
+        self.assertEqual(self.tier.stats()['hits'], 1)
+
+    def test_lower_tier_hit_backfills_shared_tier(self) -> None:
+        """File hits should be copied into the shared tier."""
+        self._write_file_entry('abc12345xyz', age_seconds=10)
+        tu.load_cache('abc12345xyz')
+        self.assertIsNotNone(self.tier.get('abc12345xyz'))
+        self.assertIsNotNone(
+            self.backend.get('test:transcript:v1:abc12345xyz'),
+        )
+
+    def test_oversize_values_are_not_stored(self) -> None:
+        """Values above the size limit should be skipped."""
+        tier = SharedCacheTier(self.backend, max_value_bytes=64)
+        self.assertFalse(
+            tier.set('big', {'text': os.urandom(600).hex()}, ttl_seconds=60),
+        )
+        self.assertEqual(tier.stats()['oversize'], 1)
+
+    def test_backend_failure_opens_circuit(self) -> None:
+        """After a failure the tier should bypass the backend for a while."""
+        backend = _FailingBackend()
+        tier = SharedCacheTier(backend, retry_seconds=60)
+        self.assertIsNone(tier.get('abc12345xyz'))
+        self.assertIsNone(tier.get('abc12345xyz'))
+        self.assertEqual(backend.calls, 1)
+        stats = tier.stats()
+        self.assertEqual(stats['errors'], 1)
+        self.assertFalse(stats['available'])
+
+    def test_redis_protocol_round_trip(self) -> None:
+        """The built-in client should frame commands and parse replies."""
+        client_sock, server_sock = socket.socketpair()
+        self.addCleanup(server_sock.close)
+        connection = RedisConnection(client_sock)
+        self.addCleanup(connection.close)
+        server_sock.sendall(b'+OK\r\n$5\r\nhello\r\n$-1\r\n-ERR nope\r\n')
+        self.assertEqual(connection.command('SET', 'k', b'hello'), 'OK')
+        self.assertEqual(connection.command('GET', 'k'), b'hello')
+        self.assertIsNone(connection.command('GET', 'missing'))
+        with self.assertRaises(RedisError):
+            connection.command('BOGUS')
+        sent = server_sock.recv(4096)
+        self.assertTrue(sent.startswith(b'*3\r\n$3\r\nSET\r\n$1\r\nk\r\n'))
+
+
+class CacheSweeperTest(TranscriptCacheTestCase):
+    """The sweeper should expire old files and keep the directory in budget."""
+
+    def _write_sized_file(self, name: str, *, size: int, age: float) -> Path:
+        path = self.cache_dir / name
+        path.write_bytes(b'x' * size)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_expired_and_temp_files_are_removed(self) -> None:
+        """Entries past retention and abandoned temp files should go."""
+        expired = self._write_sized_file('old_video1.json', size=10, age=7200)
+        fresh = self._write_sized_file('new_video1.json', size=10, age=10)
+        temp = self._write_sized_file('new_video2.tmp', size=10, age=7200)
+        archive = self._write_sized_file('archive_user.json', size=10, age=9e6)
+        sweeper = CacheSweeper(cache_dir=self.cache_dir, retention_seconds=3600)
+        sweeper.sweep_files()
+        self.assertFalse(expired.exists())
+        self.assertFalse(temp.exists())
+        self.assertTrue(fresh.exists())
+        self.assertTrue(archive.exists())
+        stats = sweeper.stats()
+        self.assertEqual(stats['files_expired'], 1)
+        self.assertEqual(stats['temp_files_removed'], 1)
+
+    def test_sharded_records_are_swept(self) -> None:
+        """Expired records inside shard directories should be removed."""
+        path = transcript_record_path(self.cache_dir, 'abc12345xyz')
+        path.parent.mkdir(parents=True)
+        path.write_bytes(pack_record({'text': 'old'}))
+        stamp = time.time() - 7200
+        os.utime(path, (stamp, stamp))
+        sweeper = CacheSweeper(cache_dir=self.cache_dir, retention_seconds=3600)
+        self.assertEqual(sweeper.sweep_files(), 1)
+        self.assertFalse(path.exists())
+
+    def test_byte_budget_evicts_least_recently_read(self) -> None:
+        """Over budget, files read least recently should be evicted first."""
+        first = self._write_sized_file('video_0001.json', size=400, age=300)
+        second = self._write_sized_file('video_0002.json', size=400, age=200)
+        third = self._write_sized_file('video_0003.json', size=400, age=100)
+        os.utime(first, (time.time(), first.stat().st_mtime))
+        sweeper = CacheSweeper(
+            cache_dir=self.cache_dir,
+            dir_max_bytes=1000,
+            retention_seconds=3600,
+        )
+        sweeper.sweep_files()
+        self.assertTrue(first.exists())
+        self.assertFalse(second.exists())
+        self.assertTrue(third.exists())
+        stats = sweeper.stats()
+        self.assertEqual(stats['files_evicted'], 1)
+        self.assertEqual(stats['dir_bytes'], 800)
+
+    def test_read_path_leaves_expired_entries_to_sweeper(self) -> None:
+        """With the sweeper on, reads should not delete expired files."""
+        path = self._write_file_entry(
+            'abc12345xyz', age_seconds=tu.TRANSCRIPT_CACHE_TTL + 60,
+        )
+        with patch.object(tu, 'CACHE_SWEEPER_ENABLED', True):
+            self.assertIsNone(tu.load_cache('abc12345xyz'))
+        self.assertTrue(path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,13 +21,19 @@ from yt_dlp.utils import DownloadError
 
 from .config import (
     CACHE_DIR,
+    CACHE_SWEEPER_ENABLED,
     CAPTION_FORMAT_PRIORITY,
     FAIL_CLOSED_WITHOUT_DB,
     OPENAI_SUMMARY_INPUT_CHARS,
     OPENAI_SUMMARY_MAX_TOKENS,
     OPENAI_SUMMARY_MODEL,
+    SUMMARY_DEFAULT_LINES,
+    SUMMARY_MAX_LINES,
+    TRANSCRIPT_CACHE_STALE_TTL,
+    TRANSCRIPT_CACHE_SWR_ENABLED,
     TRANSCRIPT_CACHE_TTL,
     TRANSCRIPT_DEFAULT_MAX_CHARS,
+    TRANSCRIPT_MEMORY_CACHE_MAX_BYTES,
     TRANSCRIPT_MAX_MAX_CHARS,
     TRANSCRIPT_MIN_MAX_CHARS,
     USER_AGENT,
@@ -37,10 +43,29 @@ from .config import (
     YTDLP_PLAYER_CLIENT_LIST,
     YTDLP_SOCKET_TIMEOUT_SECONDS,
 )
+from .cache_codec import decode_cached_text, encode_cached_text
+from .cache_sweeper import default_retention_seconds, touch_cache_file
 from .db import get_session, is_db_enabled
+from .file_cache import (
+    archive_record_path,
+    legacy_archive_path,
+    read_record,
+    transcript_record_path,
+    write_bytes_atomic,
+    write_record,
+)
+from .memory_cache import ByteBoundedLRUCache
 from .models import TranscriptCache
+from .shared_cache import build_shared_cache_tier
 
 DEFAULT_HEADERS = {'User-Agent': USER_AGENT}
+TRANSCRIPT_MEMORY_CACHE = ByteBoundedLRUCache(
+    max_bytes=TRANSCRIPT_MEMORY_CACHE_MAX_BYTES,
+    max_age_seconds=TRANSCRIPT_CACHE_TTL + (
+        TRANSCRIPT_CACHE_STALE_TTL if TRANSCRIPT_CACHE_SWR_ENABLED else 0
+    ),
+)
+TRANSCRIPT_SHARED_CACHE = build_shared_cache_tier()
 
 
 def _allow_file_fallback() -> bool:
@@ -64,20 +89,30 @@ def trim_text(text: str, max_chars: Optional[int]) -> tuple[str, bool]:
     return text[:max_chars].rstrip() + '…', True
 
 
+def sanitize_summary_lines(lines: Optional[int]) -> int:
+    """Clamp the requested summary line count into the supported range."""
+    return max(1, min(SUMMARY_MAX_LINES, lines or SUMMARY_DEFAULT_LINES))
+
+
 def build_summary(
     text: str,
-    lines: Optional[int],
+    lines: Optional[int] = SUMMARY_MAX_LINES,
     *,
     api_key: Optional[str],
     input_chars: int = OPENAI_SUMMARY_INPUT_CHARS,
     model: str = OPENAI_SUMMARY_MODEL,
     max_tokens: int = OPENAI_SUMMARY_MAX_TOKENS,
 ) -> Optional[str]:
-    """Build a normalized summary for the given text."""
+    """Build a normalized, importance-ranked summary for the given text.
+
+    Lines are ordered most important first, so a summary built at
+    ``SUMMARY_MAX_LINES`` can serve any shorter request through
+    ``truncate_summary`` without another model call.
+    """
     if not text.strip() or not api_key:
         return None
 
-    target_lines = max(1, min(5, lines or 3))
+    target_lines = sanitize_summary_lines(lines)
     summary_input = text
     if 0 < input_chars < len(summary_input):
         summary_input = summary_input[:input_chars]
@@ -105,6 +140,7 @@ def summarize_text(
     """Call OpenAI to summarize the text into a fixed number of lines."""
     prompt = (
         f'다음 내용을 한국어로 {lines}줄 요약해줘.\\n'
+        '- 중요한 내용부터 순서대로 배치\\n'
         '- 각 줄은 한 문장\\n'
         "- 각 줄은 '• '로 시작\\n"
         f'- 줄바꿈으로만 {lines}줄 출력\\n'
@@ -178,34 +214,162 @@ def normalize_summary(summary: str, lines: int) -> str:
     return normalized.strip()
 
 
+def truncate_summary(
+    summary: Optional[str],
+    lines: Optional[int],
+) -> Optional[str]:
+    """Serve a shorter summary from a ranked, max-length cached summary."""
+    if summary is None:
+        return None
+    target_lines = sanitize_summary_lines(lines)
+    kept = [line for line in summary.splitlines() if line.strip()]
+    if len(kept) <= target_lines:
+        return summary
+    return '\n'.join(kept[:target_lines])
+
+
+def render_transcript_response(
+    payload: dict,
+    *,
+    summary_lines: int,
+    cached: bool,
+) -> dict:
+    """Shape a cached/computed payload for the requested summary length."""
+    return {
+        **payload,
+        'summary': truncate_summary(payload.get('summary'), summary_lines),
+        'cached': cached,
+        'stale': bool(payload.get('stale')),
+    }
+
+
 def build_transcript_cache_key(
     *,
     video_id: str,
     max_chars: int,
     summarize: bool,
-    summary_lines: Optional[int],
 ) -> str:
-    """Build a stable cache key per transcript request shape."""
-    normalized_lines = max(1, min(5, summary_lines or 3))
+    """Build a stable cache key per transcript request shape.
+
+    ``summary_lines`` is intentionally not part of the key: summaries are
+    cached once at ``SUMMARY_MAX_LINES`` and truncated per request.
+    """
     signature = (
         f'video:{video_id}|chars:{max_chars}|'
-        f'summarize:{int(summarize)}|lines:{normalized_lines}'
+        f'summarize:{int(summarize)}|ranked_lines:{SUMMARY_MAX_LINES}'
     )
     return hashlib.sha256(signature.encode('utf-8')).hexdigest()[:32]
 
 
 def load_cache(video_id: str) -> Optional[dict]:
-    """Load transcript cache from DB or local file."""
-    cached = _load_cache_from_db(video_id)
+    """Load transcript cache from memory, the shared tier, DB or file.
+
+    With ``TRANSCRIPT_CACHE_SWR_ENABLED`` an entry past
+    ``TRANSCRIPT_CACHE_TTL`` but within ``TRANSCRIPT_CACHE_STALE_TTL`` is
+    returned with ``stale=True`` instead of being treated as a miss.
+    """
+    allow_stale = TRANSCRIPT_CACHE_SWR_ENABLED
+    cached = _load_cache_from_memory(video_id, allow_stale=allow_stale)
     if cached:
         return cached
-    if not _allow_file_fallback():
+    cached = _load_cache_from_shared(video_id, allow_stale=allow_stale)
+    from_shared = bool(cached)
+    if not cached:
+        cached = _load_cache_from_db(video_id, allow_stale=allow_stale)
+    if not cached and _allow_file_fallback():
+        cached = _load_cache_from_file(video_id, allow_stale=allow_stale)
+    if not cached:
         return None
-    return _load_cache_from_file(video_id)
+    created_at = cached.pop('created_at', None)
+    TRANSCRIPT_MEMORY_CACHE.set(
+        video_id,
+        _cache_body(cached),
+        created_at,
+    )
+    if not from_shared:
+        _save_cache_to_shared(video_id, cached, created_at)
+    return cached
+
+
+def _cache_body(payload: dict) -> dict:
+    """Return the persisted transcript fields of a cache payload."""
+    return {
+        'text': payload.get('text', ''),
+        'summary': payload.get('summary'),
+        'source': payload.get('source', 'captions'),
+        'partial': bool(payload.get('partial', False)),
+    }
+
+
+def _load_cache_from_memory(
+    video_id: str,
+    *,
+    allow_stale: bool,
+) -> Optional[dict]:
+    entry = TRANSCRIPT_MEMORY_CACHE.get(video_id)
+    if entry is None:
+        return None
+    payload, created_at = entry
+    stale = _cache_age_state(created_at, allow_stale=allow_stale)
+    if stale is None:
+        TRANSCRIPT_MEMORY_CACHE.delete(video_id)
+        return None
+    return {**payload, 'stale': stale}
+
+
+def _load_cache_from_shared(
+    video_id: str,
+    *,
+    allow_stale: bool,
+) -> Optional[dict]:
+    record = TRANSCRIPT_SHARED_CACHE.get(video_id)
+    if record is None:
+        return None
+    stale = _cache_age_state(record.get('created_at'), allow_stale=allow_stale)
+    if stale is None:
+        return None
+    return {**record, 'stale': stale}
+
+
+def _save_cache_to_shared(
+    video_id: str,
+    payload: dict,
+    created_at: Optional[float] = None,
+) -> None:
+    """Copy an entry to the shared tier until it can no longer be served."""
+    if not TRANSCRIPT_SHARED_CACHE.enabled:
+        return
+    ttl_seconds = default_retention_seconds()
+    if created_at:
+        ttl_seconds -= int(time.time() - created_at)
+    TRANSCRIPT_SHARED_CACHE.set(
+        video_id,
+        payload,
+        ttl_seconds=ttl_seconds,
+        created_at=created_at,
+    )
+
+
+def _cache_age_state(
+    created_at: Optional[float],
+    *,
+    allow_stale: bool,
+) -> Optional[bool]:
+    """Return False when fresh, True when stale-servable, None when expired."""
+    if not created_at:
+        return False
+    age = time.time() - created_at
+    if age <= TRANSCRIPT_CACHE_TTL:
+        return False
+    if allow_stale and age <= TRANSCRIPT_CACHE_TTL + TRANSCRIPT_CACHE_STALE_TTL:
+        return True
+    return None
 
 
 def save_cache(video_id: str, payload: dict) -> None:
-    """Persist transcript cache to DB or local file."""
+    """Persist transcript cache to memory, the shared tier and DB or file."""
+    TRANSCRIPT_MEMORY_CACHE.set(video_id, _cache_body(payload))
+    _save_cache_to_shared(video_id, payload)
     if _save_cache_to_db(video_id, payload):
         return
     if not _allow_file_fallback():
@@ -215,7 +379,9 @@ def save_cache(video_id: str, payload: dict) -> None:
 
 def load_archives_file(user_id: str) -> list[dict]:
     """Load archive fallback data from the local cache directory."""
-    path = _archive_cache_path(user_id)
+    path = archive_record_path(CACHE_DIR, user_id)
+    if not path.exists():
+        path = legacy_archive_path(CACHE_DIR, user_id)
     if not path.exists():
         return []
     try:
@@ -248,9 +414,12 @@ def load_archives_file(user_id: str) -> list[dict]:
 
 def save_archives_file(user_id: str, items: list[dict]) -> None:
     """Persist archive fallback data to the local cache directory."""
-    path = _archive_cache_path(user_id)
+    path = archive_record_path(CACHE_DIR, user_id)
+    data = json.dumps(items, ensure_ascii=False).encode('utf-8')
+    if not write_bytes_atomic(path, data):
+        return
     try:
-        path.write_text(json.dumps(items, ensure_ascii=False), encoding='utf-8')
+        legacy_archive_path(CACHE_DIR, user_id).unlink(missing_ok=True)
     except OSError:
         pass
 
@@ -723,6 +892,50 @@ def is_membership_error(message: str) -> bool:
     return any(keyword in lowered for keyword in keywords)
 
 
+def is_unavailable_video_error(message: str) -> bool:
+    """Check if an error message says the video is gone or private."""
+    lowered = message.lower()
+    keywords = [
+        'private video',
+        'video unavailable',
+        'has been removed',
+        'no longer available',
+        'does not exist',
+        'account associated with this video has been terminated',
+    ]
+    return any(keyword in lowered for keyword in keywords)
+
+
+def audio_download_error_status(error: Optional[str]) -> int:
+    """Return the HTTP status for a failed audio download.
+
+    Missing, private and members-only videos will not recover on retry,
+    so they get a 4xx; everything else stays a retryable 500.
+    """
+    if error and is_membership_error(error):
+        return 403
+    if error and is_unavailable_video_error(error):
+        return 404
+    return 500
+
+
+def audio_download_error_detail(error: Optional[str]) -> str:
+    """Return the client-facing detail for a failed audio download."""
+    detail = '음성 다운로드에 실패했습니다.'
+    if not error:
+        return detail
+    if is_membership_error(error):
+        return 'You might not have membership for this video.'
+    if is_unavailable_video_error(error):
+        return '삭제되었거나 비공개인 영상입니다.'
+    if 'HTTP Error 403' in error or 'Forbidden' in error:
+        return (
+            '음성 다운로드가 차단되었습니다. '
+            'YouTube 제한(로그인/연령/지역) 또는 다운로더 업데이트가 필요합니다.'
+        )
+    return detail
+
+
 def transcribe_audio(path: str, *, api_key: Optional[str]) -> Optional[str]:
     """Transcribe audio using OpenAI Whisper API."""
     if not api_key:
@@ -752,7 +965,11 @@ def transcribe_audio(path: str, *, api_key: Optional[str]) -> Optional[str]:
     return payload.get('text')
 
 
-def _load_cache_from_db(video_id: str) -> Optional[dict]:
+def _load_cache_from_db(
+    video_id: str,
+    *,
+    allow_stale: bool = False,
+) -> Optional[dict]:
     if not is_db_enabled():
         return None
     try:
@@ -769,15 +986,24 @@ def _load_cache_from_db(video_id: str) -> Optional[dict]:
             created_at = (
                 cached.created_at.timestamp() if cached.created_at else None
             )
-            if created_at and (time.time() - created_at) > TRANSCRIPT_CACHE_TTL:
-                session.delete(cached)
-                session.commit()
+            stale = _cache_age_state(created_at, allow_stale=allow_stale)
+            if stale is None:
+                if not CACHE_SWEEPER_ENABLED:
+                    session.delete(cached)
+                    session.commit()
+                return None
+            text = decode_cached_text(cached.text or '')
+            summary = decode_cached_text(cached.summary)
+            if text is None or (cached.summary and summary is None):
+                # A miss: the recompute overwrites the corrupt row.
                 return None
             return {
-                'text': cached.text or '',
-                'summary': cached.summary,
+                'text': text,
+                'summary': summary,
                 'source': cached.source or 'captions',
                 'partial': bool(cached.partial),
+                'stale': stale,
+                'created_at': created_at,
             }
     except SQLAlchemyError:
         return None
@@ -797,8 +1023,8 @@ def _save_cache_to_db(video_id: str, payload: dict) -> bool:
             )
             if cached is None:
                 cached = TranscriptCache(video_id=video_id)
-            cached.text = payload.get('text', '')
-            cached.summary = payload.get('summary')
+            cached.text = encode_cached_text(payload.get('text', ''))
+            cached.summary = encode_cached_text(payload.get('summary'))
             cached.source = payload.get('source', 'captions')
             cached.partial = bool(payload.get('partial', False))
             cached.created_at = datetime.now(timezone.utc)
@@ -809,56 +1035,61 @@ def _save_cache_to_db(video_id: str, payload: dict) -> bool:
         return False
 
 
-def _load_cache_from_file(video_id: str) -> Optional[dict]:
+def _load_cache_from_file(
+    video_id: str,
+    *,
+    allow_stale: bool = False,
+) -> Optional[dict]:
     if not VIDEO_ID_PATTERN.fullmatch(video_id):
         return None
-    path = CACHE_DIR / f'{video_id}.json'
-    if not path.exists():
+    path = transcript_record_path(CACHE_DIR, video_id)
+    data = read_record(path)
+    if data is None:
+        path = CACHE_DIR / f'{video_id}.json'
+        data = _read_legacy_cache_file(path)
+    if data is None:
+        return None
+
+    stale = _cache_age_state(data.get('created_at'), allow_stale=allow_stale)
+    if stale is None:
+        if not CACHE_SWEEPER_ENABLED:
+            try:
+                path.unlink()
+            except OSError:
+                pass
         return None
 
+    touch_cache_file(path)
+    return {**data, 'stale': stale}
+
+
+def _read_legacy_cache_file(path: Path) -> Optional[dict]:
+    """Read a flat ``<key>.json`` entry written before the sharded layout."""
+    if not path.exists():
+        return None
     try:
         data = json.loads(path.read_text(encoding='utf-8'))
     except (OSError, json.JSONDecodeError):
         return None
-
-    created_at = data.get('created_at')
-    if created_at and (time.time() - created_at) > TRANSCRIPT_CACHE_TTL:
-        try:
-            path.unlink()
-        except OSError:
-            pass
+    text = decode_cached_text(data.get('text', ''))
+    summary = decode_cached_text(data.get('summary'))
+    if text is None or (data.get('summary') and summary is None):
         return None
-
     return {
-        'text': data.get('text', ''),
-        'summary': data.get('summary'),
+        'text': text,
+        'summary': summary,
         'source': data.get('source', 'captions'),
         'partial': data.get('partial', False),
+        'created_at': data.get('created_at'),
     }
 
 
 def _save_cache_to_file(video_id: str, payload: dict) -> None:
     if not VIDEO_ID_PATTERN.fullmatch(video_id):
         return
-    path = CACHE_DIR / f'{video_id}.json'
-    temp_path = CACHE_DIR / f'{video_id}.tmp'
-    data = {
-        'text': payload.get('text', ''),
-        'summary': payload.get('summary'),
-        'source': payload.get('source', 'captions'),
-        'partial': payload.get('partial', False),
-        'created_at': time.time(),
-    }
+    if not write_record(transcript_record_path(CACHE_DIR, video_id), payload):
+        return
     try:
-        temp_path.write_text(
-            json.dumps(data, ensure_ascii=False),
-            encoding='utf-8',
-        )
-        temp_path.replace(path)
+        (CACHE_DIR / f'{video_id}.json').unlink(missing_ok=True)
     except OSError:
         pass
-
-
-def _archive_cache_path(user_id: str) -> Path:
-    safe = re.sub(r'[^a-zA-Z0-9_-]+', '_', user_id)
-    return CACHE_DIR / f'archive_{safe}.json'
@@ -0,0 +1,283 @@
+"""Request input sanitizers shared by the API endpoints.
+
+Each helper normalizes a raw client value and raises ``HTTPException``
+with a 400/403 status when the value cannot be accepted.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+from .config import (
+    ARCHIVE_BATCH_MAX_ITEMS,
+    ARCHIVE_CALENDAR_MAX_DAYS,
+    ARCHIVE_PAGE_DEFAULT_LIMIT,
+    ARCHIVE_PAGE_MAX_LIMIT,
+    ARCHIVE_VIDEO_ID_PATTERN,
+    CHANNEL_ID_PATTERN,
+    MAX_CHANNEL_THUMBNAIL_LENGTH,
+    MAX_CHANNEL_TITLE_LENGTH,
+    MAX_OPENED_VIDEO_IDS,
+    MAX_SELECTION_CHANGE_DAY,
+    MAX_SELECTION_CHANGES_TODAY,
+    MAX_UTC_OFFSET_MINUTES,
+    PLAN_CHANNEL_LIMITS,
+    PLAN_TIER_PATTERN,
+    USER_ID_PATTERN,
+    VIDEO_ID_PATTERN,
+)
+
+
+def sanitize_user_id(raw_user_id: str) -> str:
+    """Return a trimmed user id or raise 400 when missing/invalid."""
+    user_id = raw_user_id.strip()
+    if not user_id:
+        raise HTTPException(status_code=400, detail='user_id is required')
+    if not USER_ID_PATTERN.fullmatch(user_id):
+        raise HTTPException(status_code=400, detail='user_id is invalid')
+    return user_id
+
+
+def sanitize_video_id(raw_video_id: str) -> str:
+    """Return a trimmed YouTube video id or raise 400."""
+    video_id = raw_video_id.strip()
+    if not video_id:
+        raise HTTPException(status_code=400, detail='video_id is required')
+    if not VIDEO_ID_PATTERN.fullmatch(video_id):
+        raise HTTPException(status_code=400, detail='video_id is invalid')
+    return video_id
+
+
+def sanitize_archive_video_id(raw_video_id: str) -> str:
+    """Return a trimmed archive video id or raise 400."""
+    video_id = raw_video_id.strip()
+    if not video_id:
+        raise HTTPException(status_code=400, detail='video_id is required')
+    if not ARCHIVE_VIDEO_ID_PATTERN.fullmatch(video_id):
+        raise HTTPException(status_code=400, detail='video_id is invalid')
+    return video_id
+
+
+def sanitize_plan_tier(raw_plan_tier: str) -> str:
+    """Return a lower-cased plan tier or raise 400."""
+    plan_tier = raw_plan_tier.strip().lower()
+    if not plan_tier:
+        raise HTTPException(
+            status_code=400,
+            detail='user_id and plan_tier are required',
+        )
+    if not PLAN_TIER_PATTERN.fullmatch(plan_tier):
+        raise HTTPException(status_code=400, detail='plan_tier is invalid')
+    return plan_tier
+
+
+def channel_limit_for_plan_tier(raw_plan_tier: Optional[str]) -> Optional[int]:
+    """Return the selected-channel limit for a plan tier."""
+    if not raw_plan_tier:
+        return PLAN_CHANNEL_LIMITS['free']
+    try:
+        plan_tier = sanitize_plan_tier(raw_plan_tier)
+    except HTTPException:
+        plan_tier = 'free'
+    return PLAN_CHANNEL_LIMITS.get(plan_tier, PLAN_CHANNEL_LIMITS['free'])
+
+
+def enforce_selection_plan_limit(
+    plan_tier: Optional[str],
+    selected_ids: list[str],
+) -> None:
+    """Raise 403 when a selection exceeds the plan limit."""
+    limit = channel_limit_for_plan_tier(plan_tier)
+    if limit is not None and len(selected_ids) > limit:
+        raise HTTPException(
+            status_code=403,
+            detail='selected channel limit exceeded for current plan',
+        )
+
+
+def sanitize_selection_change_day(raw_day: Optional[int]) -> int:
+    """Clamp a selection change day into the accepted range."""
+    if raw_day is None:
+        return 0
+    value = int(raw_day)
+    if value < 0:
+        return 0
+    if value > MAX_SELECTION_CHANGE_DAY:
+        return MAX_SELECTION_CHANGE_DAY
+    return value
+
+
+def sanitize_selection_changes_today(raw_count: Optional[int]) -> int:
+    """Clamp a daily selection change count."""
+    if raw_count is None:
+        return 0
+    value = int(raw_count)
+    if value < 0:
+        return 0
+    if value > MAX_SELECTION_CHANGES_TODAY:
+        return MAX_SELECTION_CHANGES_TODAY
+    return value
+
+
+def normalize_opened_video_ids(raw_ids: list[str]) -> list[str]:
+    """Deduplicate and cap opened video ids, dropping invalid ones."""
+    normalized = []
+    seen = set()
+    for raw in raw_ids:
+        video_id = raw.strip()
+        if not VIDEO_ID_PATTERN.fullmatch(video_id):
+            continue
+        if video_id in seen:
+            continue
+        seen.add(video_id)
+        normalized.append(video_id)
+        if len(normalized) >= MAX_OPENED_VIDEO_IDS:
+            break
+    return normalized
+
+
+def sanitize_archive_title(raw_title: Optional[str]) -> Optional[str]:
+    """Trim an archive title, returning None when empty."""
+    if raw_title is None:
+        return None
+    title = raw_title.strip()[:MAX_CHANNEL_TITLE_LENGTH]
+    return title or None
+
+
+def sanitize_archive_thumbnail_url(raw_url: Optional[str]) -> Optional[str]:
+    """Trim an archive thumbnail URL, returning None when empty."""
+    if raw_url is None:
+        return None
+    url = raw_url.strip()[:MAX_CHANNEL_THUMBNAIL_LENGTH]
+    return url or None
+
+
+def sanitize_archive_channel_id(
+    raw_channel_id: Optional[str],
+) -> Optional[str]:
+    """Return a valid channel id or None."""
+    if raw_channel_id is None:
+        return None
+    channel_id = raw_channel_id.strip()
+    if not channel_id:
+        return None
+    if not CHANNEL_ID_PATTERN.fullmatch(channel_id):
+        return None
+    return channel_id
+
+
+def sanitize_archive_metadata(payload: Any) -> dict[str, Optional[str]]:
+    """Return the sanitized video and channel metadata of an archive change."""
+    return {
+        'title': sanitize_archive_title(payload.title),
+        'thumbnail_url': sanitize_archive_thumbnail_url(payload.thumbnail_url),
+        'channel_id': sanitize_archive_channel_id(payload.channel_id),
+        'channel_title': sanitize_archive_title(payload.channel_title),
+        'channel_thumbnail_url': sanitize_archive_thumbnail_url(
+            payload.channel_thumbnail_url
+        ),
+    }
+
+
+def normalize_archive_batch(
+    items: list[Any],
+) -> list[tuple[str, bool, dict[str, Optional[str]]]]:
+    """Return batch items as ``(video_id, archived, metadata)`` or raise 400.
+
+    A video may appear once per batch, so the outcome does not depend on
+    the order the changes are applied in.
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail='items are required')
+    if len(items) > ARCHIVE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail='too many items')
+    changes = []
+    seen: set[str] = set()
+    for item in items:
+        video_id = sanitize_archive_video_id(item.video_id)
+        if video_id in seen:
+            raise HTTPException(status_code=400, detail='duplicate video_id')
+        seen.add(video_id)
+        changes.append(
+            (video_id, item.archived, sanitize_archive_metadata(item))
+        )
+    return changes
+
+
+def sanitize_email(raw_email: Optional[str]) -> Optional[str]:
+    """Return a trimmed email, None when empty, or raise 400."""
+    if raw_email is None:
+        return None
+    email = raw_email.strip()
+    if not email:
+        return None
+    if len(email) > 255:
+        raise HTTPException(status_code=400, detail='email is too long')
+    if '@' not in email:
+        raise HTTPException(status_code=400, detail='email is invalid')
+    return email
+
+
+def sanitize_archive_page_limit(
+    raw_limit: Optional[int],
+    raw_cursor: Optional[str] = None,
+) -> Optional[int]:
+    """Clamp an archive page size into the supported range.
+
+    Clients that predate paging send neither ``limit`` nor ``cursor`` and
+    never follow ``next_cursor``, so they get the full list (None).
+    """
+    if raw_limit is None:
+        return None if raw_cursor is None else ARCHIVE_PAGE_DEFAULT_LIMIT
+    return max(1, min(ARCHIVE_PAGE_MAX_LIMIT, int(raw_limit)))
+
+
+def sanitize_archive_range(
+    raw_from: Optional[int],
+    raw_to: Optional[int],
+) -> tuple[Optional[datetime], Optional[datetime]]:
+    """Return ``[from, to)`` epoch-millisecond bounds as UTC datetimes."""
+    since = _epoch_millis_to_datetime(raw_from, 'from')
+    until = _epoch_millis_to_datetime(raw_to, 'to')
+    if since is not None and until is not None and until <= since:
+        raise HTTPException(status_code=400, detail='to must be after from')
+    return since, until
+
+
+def sanitize_calendar_range(
+    raw_from: int,
+    raw_to: int,
+) -> tuple[datetime, datetime]:
+    """Return calendar bounds; ranges over the day limit raise 400."""
+    since, until = sanitize_archive_range(raw_from, raw_to)
+    if until - since > timedelta(days=ARCHIVE_CALENDAR_MAX_DAYS):
+        raise HTTPException(status_code=400, detail='range is too long')
+    return since, until
+
+
+def sanitize_utc_offset_minutes(raw_offset: Optional[int]) -> int:
+    """Return a UTC offset in minutes or raise 400 when out of range."""
+    if raw_offset is None:
+        return 0
+    if abs(raw_offset) > MAX_UTC_OFFSET_MINUTES:
+        raise HTTPException(
+            status_code=400, detail='utc_offset_minutes is invalid',
+        )
+    return raw_offset
+
+
+def _epoch_millis_to_datetime(
+    raw_millis: Optional[int],
+    name: str,
+) -> Optional[datetime]:
+    if raw_millis is None:
+        return None
+    try:
+        return datetime.fromtimestamp(raw_millis / 1000, tz=timezone.utc)
+    except (OverflowError, OSError, ValueError) as exc:
+        raise HTTPException(
+            status_code=400, detail=f'{name} is invalid',
+        ) from exc